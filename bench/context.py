@@ -0,0 +1,4 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from data.sqlite3_db import CategorizerData, CategorizerLanguage
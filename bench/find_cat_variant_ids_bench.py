@@ -0,0 +1,113 @@
+#!/usr/bin/python3
+'''
+history
+10/18/26 - created to compare the single statement findCatVariantIds() with the five statement one it replaced
+
+usage: python3 find_cat_variant_ids_bench.py [number of categories] [number of lookups]
+'''
+import sys
+import os
+import time
+import random
+import tempfile
+import multiprocessing
+from context import CategorizerData
+
+def legacyFindCategoryIds(db, name, only_latest = True):
+    '''
+    findCategoryIds() before it was one statement: one SELECT per Double Metaphone column
+    '''
+    dMetaNames = db.getDMetaNames(name, True)
+    catIds = []
+    sqlBegin = f"SELECT {db.columnNames['categories'][0]} FROM categories WHERE "
+    sqlEnd = f" IN ({', '.join(['?'] * len(dMetaNames))})"
+    if only_latest:
+        sqlEnd += f' AND {db.columnNames["categories"][-1]} = 1'
+    for sqlMid in (db.columnNames['categories'][3], db.columnNames['categories'][4]):
+        cursor = db.dbCursor.execute(sqlBegin + sqlMid + sqlEnd, dMetaNames)
+        catIds += cursor.fetchall()
+    catIds = [catIds[x][0] for x in range(len(catIds))]
+    if len(catIds) == 0:
+        catIds = (0,)
+    return tuple(catIds)
+
+def legacyFindCatVariantIds(db, name, only_latest = True):
+    '''
+    findCatVariantIds() before it was one statement: two SELECTs on catVariants, legacyFindCategoryIds(), then a SELECT of the catVariants of the catIds
+    '''
+    dMetaNames = db.getDMetaNames(name)
+    if dMetaNames[1] == '':
+        dMetaNames = (dMetaNames[0],)
+    catVarIdsCatIds = []
+    sqlBegin = f'SELECT {db.columnNames["catVariants"][0]}, {db.columnNames["catVariants"][2]} FROM catVariants WHERE '
+    sqlEnd = f" IN ({', '.join(['?'] * len(dMetaNames))})"
+    if only_latest:
+        sqlEnd += f' AND {db.columnNames["catVariants"][-1]} = 1'
+    for sqlMid in (db.columnNames['catVariants'][4], db.columnNames['catVariants'][5]):
+        cursor = db.dbCursor.execute(sqlBegin + sqlMid + sqlEnd, dMetaNames)
+        catVarIdsCatIds += cursor.fetchall()
+    catVarIds = [catVarIdsCatIds[x][0] for x in range(len(catVarIdsCatIds))]
+    catIdsA = [catVarIdsCatIds[x][1] for x in range(len(catVarIdsCatIds))]
+    catIds = tuple(catIdsA) + legacyFindCategoryIds(db, name, only_latest)
+    sql = f'SELECT {db.columnNames["catVariants"][0]} FROM catVariants WHERE {db.columnNames["catVariants"][2]} IN ({", ".join(["?"] * len(catIds))})'
+    if only_latest:
+        sql += f' AND {db.columnNames["catVariants"][-1]} = 1'
+    cursor = db.dbCursor.execute(sql, catIds)
+    tmpRowIds = cursor.fetchall()
+    catVarIds += [tmpRowIds[x][0] for x in range(len(tmpRowIds))]
+    if len(catVarIds) == 0:
+        catVarIds = (0,)
+    return tuple(catVarIds)
+
+def makeNames(count, seed):
+    '''
+    made up words, about as many of them sound alike as in a real vocabulary
+    '''
+    consonants = 'bcdfghjklmnpqrstvwxz'
+    vowels = 'aeiou'
+    rand = random.Random(seed)
+    names = {}
+    while len(names) < count:
+        syllables = [rand.choice(consonants) + rand.choice(vowels) + rand.choice(('', '', rand.choice(consonants))) for x in range(rand.randint(2, 4))]
+        names[''.join(syllables).capitalize()] = None
+    return list(names.keys())
+
+def timeLookups(find, db, names):
+    startTime = time.perf_counter()
+    for name in names:
+        find(name)
+    return (time.perf_counter() - startTime) / len(names)
+
+def main(num_categories, num_lookups):
+    print(f'findCatVariantIds() with {num_categories} categories, {num_lookups} lookups, catVarId 0 is left out of the comparisons')
+    with tempfile.TemporaryDirectory() as tmpDirName:
+        db = CategorizerData(os.path.join(tmpDirName, 'find_cat_variant_ids_bench.db'), multiprocessing.Lock(), create_new_database = True)
+        names = makeNames(num_categories * 2, 1)
+        db.addCatNodes([(None, name) for name in names[:num_categories]])
+        # about one catVariant for every other category
+        rand = random.Random(2)
+        with db.batch():
+            for name in names[num_categories:num_categories + num_categories // 2]:
+                db._addCatVariant(rand.randint(1, num_categories), name)
+        lookups = [rand.choice(names) for x in range(num_lookups)]
+
+        for onlyLatest in (True, False):
+            legacy = [legacyFindCatVariantIds(db, name, onlyLatest) for name in lookups]
+            single = [db.findCatVariantIds(name, onlyLatest) for name in lookups]
+            # with only_latest False the legacy one also returned catVarId 0 when no category matched,
+            # because it looked for the catVariants of the (0,) that findCategoryIds() returns for no matches
+            legacy = [tuple([catVarId for catVarId in catVarIds if catVarId != 0]) for catVarIds in legacy]
+            single = [tuple([catVarId for catVarId in catVarIds if catVarId != 0]) for catVarIds in single]
+            sameIds = sum([sorted(legacyIds) == sorted(singleIds) for (legacyIds, singleIds) in zip(legacy, single)])
+            sameOrder = sum([legacyIds == singleIds for (legacyIds, singleIds) in zip(legacy, single)])
+            legacyTime = timeLookups(lambda name: legacyFindCatVariantIds(db, name, onlyLatest), db, lookups)
+            singleTime = timeLookups(lambda name: db.findCatVariantIds(name, onlyLatest), db, lookups)
+            print(f'  only_latest {onlyLatest}:')
+            print(f'    legacy {legacyTime * 1e6:8.1f} us per lookup')
+            print(f'    single {singleTime * 1e6:8.1f} us per lookup, {legacyTime / singleTime:.2f} times faster')
+            print(f'    same catVarIds for {sameIds} of {num_lookups} lookups, in the same order for {sameOrder}')
+
+if __name__ == '__main__':
+    numCategories = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    numLookups = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    main(numCategories, numLookups)
@@ -0,0 +1,186 @@
+#!/usr/bin/python3
+'''
+history
+10/18/26 - created to measure how the add, edit and find methods scale with the size of the graph
+
+usage: python3 graph_bench.py [--sizes 1000 100000 1000000] [--seed 1] [--operations 1000] [--output results.json]
+The results are written as JSON, one entry per size and operation, so runs can be compared to find regressions.
+'''
+import sys
+import os
+import time
+import json
+import random
+import sqlite3
+import argparse
+import platform
+import tempfile
+import multiprocessing
+from context import CategorizerData
+from find_cat_variant_ids_bench import makeNames
+
+class GraphGenerator:
+    '''
+    Builds a repeatable synthetic graph with num_categories categories, each with one catNode, in num_path_revs pathRevs:
+      variant_fan_out: the average number of extra catVariants of a category
+      hierarchy_depth: the catNodes are in is-a chains about this deep, with a has-a connection for one in 10 of them
+      edit_fraction: the part of the existing catNodes moved in each pathRev after the first, so rows have old versions
+      num_styles: nodeStyles and connectionStyles made from a few shared fonts, lines and heads, the catNodes and
+        catConnections use them
+    An addNote() closes each pathRev, like taking a note does.
+    '''
+    fontSets = [CategorizerData.FontSet('Liberation Sans', style, size, color) for style in ('Regular', 'Bold') for size in (10, 12) for color in ('Black', 'Blue')]
+    lineSets = [CategorizerData.LineSet(lineType, weight, 'Black') for lineType in ('Solid', 'Dashed') for weight in (1, 2)]
+    headSets = [CategorizerData.HeadSet(headType, 4, 'Black') for headType in ('Filled', 'Open')]
+
+    def __init__(self, seed, num_categories, variant_fan_out = 1, hierarchy_depth = 50, num_path_revs = 10, edit_fraction = 0.01, num_styles = 20):
+        self.seed = seed
+        self.numCategories = num_categories
+        self.variantFanOut = variant_fan_out
+        self.hierarchyDepth = hierarchy_depth
+        self.numPathRevs = num_path_revs
+        self.editFraction = edit_fraction
+        self.numStyles = num_styles
+        # the category names, then the catVariant names, then names never used, for the adds
+        self.names = makeNames(num_categories * (2 + variant_fan_out), seed)
+        self.catVarNames = []
+
+    def build(self, db):
+        '''
+        add the graph to db, which should be a new database
+        '''
+        show = False
+        rand = random.Random(self.seed)
+        nodeStyleIds = [0]
+        connStyleIds = [0]
+        for styleIdx in range(self.numStyles):
+            nodeStyleIds.append(db.addNodeStyle(f'node style {styleIdx}', font_set = rand.choice(self.fontSets), background_color = 'White', transparency = 0))
+            connStyleIds.append(db.addConnectionStyle(f'connection style {styleIdx}', font_set = rand.choice(self.fontSets), line_set = rand.choice(self.lineSets), head_set = rand.choice(self.headSets)))
+
+        # the is-a chains run through every chainCount'th catNode
+        chainCount = max(self.numCategories // self.hierarchyDepth, 1)
+        namesPerPathRev = -(-self.numCategories // self.numPathRevs)
+        nextVariantName = self.numCategories
+        for pathRevIdx in range(self.numPathRevs):
+            firstIdx = pathRevIdx * namesPerPathRev
+            names = self.names[firstIdx:min(firstIdx + namesPerPathRev, self.numCategories)]
+            if not names:
+                break
+            with db.batch():
+                catNodeIds = db.addCatNodes([(None, name, rand.randint(0, 1000), rand.randint(0, 1000), None, rand.choice(nodeStyleIds)) for name in names])
+                # the categories and catNodes have the same ids, the default catVariant is the first one of each category
+                for catId in catNodeIds:
+                    for variantIdx in range(rand.randint(0, 2 * self.variantFanOut)):
+                        name = self.names[nextVariantName]
+                        nextVariantName += 1
+                        db._addCatVariant(catId, name)
+                        self.catVarNames.append(name)
+                connSpecs = []
+                for catNodeId in catNodeIds:
+                    if catNodeId > chainCount:
+                        connSpecs.append( (catNodeId, catNodeId - chainCount, None, 'is-a', rand.choice(connStyleIds)) )
+                    if catNodeId > 1 and rand.random() < 0.1:
+                        connSpecs.append( (catNodeId, rand.randint(1, catNodeId - 1), None, 'has-a', rand.choice(connStyleIds)) )
+                db.addConnections(connSpecs)
+                if pathRevIdx > 0:
+                    for catNodeId in rand.sample(range(1, catNodeIds[0]), int((catNodeIds[0] - 1) * self.editFraction)):
+                        db.editCatNode(catNodeId, dx = rand.randint(0, 1000), dy = rand.randint(0, 1000))
+            db.addNote(f'note {pathRevIdx}')
+            if show: print(f'  pathRev {pathRevIdx} added {len(names)} catNodes')
+        self.unusedNames = self.names[nextVariantName:]
+
+def timeCalls(call, args_list):
+    '''
+    returns the duration of call(*args) for each args in args_list, in seconds
+    '''
+    durations = []
+    for args in args_list:
+        startTime = time.perf_counter()
+        call(*args)
+        durations.append(time.perf_counter() - startTime)
+    return durations
+
+def summarize(size, operation, durations):
+    durations = sorted(durations)
+    count = len(durations)
+    return {
+        'size': size,
+        'operation': operation,
+        'count': count,
+        'meanUs': round(sum(durations) / count * 1e6, 2),
+        'p50Us': round(durations[count // 2] * 1e6, 2),
+        'p95Us': round(durations[min(int(count * 0.95), count - 1)] * 1e6, 2),
+        'maxUs': round(durations[-1] * 1e6, 2),
+    }
+
+def benchSize(size, seed, num_operations, tmp_dir_name):
+    '''
+    build a graph with size categories and time the operations on it, returns a list of results
+    '''
+    rand = random.Random(seed + 1)
+    numOperations = min(num_operations, size)
+    db = CategorizerData(os.path.join(tmp_dir_name, f'graph_bench_{size}.db'), multiprocessing.Lock(), create_new_database = True)
+    generator = GraphGenerator(seed, size)
+    startTime = time.perf_counter()
+    generator.build(db)
+    buildSeconds = time.perf_counter() - startTime
+    results = [{'size': size, 'operation': 'build', 'count': 1, 'seconds': round(buildSeconds, 3),
+                'catNodes': size, 'catVariants': size + len(generator.catVarNames), 'catConnections': len(db.getLatestRows('catConnections'))}]
+    print(f'  {size} categories built in {buildSeconds:.1f} seconds', file = sys.stderr)
+
+    # reads first, so they see the graph as it was built
+    usedNames = generator.names[:size] + generator.catVarNames
+    lookups = [(rand.choice(usedNames),) for x in range(numOperations)]
+    results.append(summarize(size, 'findCatVariantIds', timeCalls(db.findCatVariantIds, lookups)))
+    results.append(summarize(size, 'dumpTable catNodes', timeCalls(db.dumpTable, [('catNodes',)] * 3)))
+    # mostly the shared sets, and some new ones
+    subTableArgs = []
+    for x in range(numOperations):
+        if rand.random() < 0.9:
+            subTableArgs.append( ('fonts', rand.choice(generator.fontSets)) )
+        else:
+            subTableArgs.append( ('fonts', CategorizerData.FontSet('Liberation Serif', 'Regular', rand.randint(6, 72), 'Black')) )
+    results.append(summarize(size, '_getSubTableRowId', timeCalls(db._getSubTableRowId, subTableArgs)))
+
+    # each change is its own transaction, like a user making it
+    newNames = generator.unusedNames[:numOperations]
+    results.append(summarize(size, 'addCatNode', timeCalls(lambda name: db.addCatNode(cat_var_name = name), [(name,) for name in newNames])))
+    db.addNote('before the edits')
+    # the first edit of a catNode in the new pathRev adds a new version of its row, the second changes that row
+    catNodeIds = rand.sample(range(1, size + 1), numOperations)
+    editArgs = [(catNodeId, rand.randint(0, 1000)) for catNodeId in catNodeIds + catNodeIds]
+    durations = timeCalls(lambda catNodeId, dx: db.editCatNode(catNodeId, dx = dx), editArgs)
+    results.append(summarize(size, 'editCatNode new pathRev', durations[:numOperations]))
+    results.append(summarize(size, 'editCatNode same pathRev', durations[numOperations:]))
+    relVarNames = ('is-a', 'has-a', 'part-of', 'likes')
+    connArgs = [(rand.randint(1, size), rand.randint(1, size), rand.choice(relVarNames)) for x in range(numOperations)]
+    results.append(summarize(size, 'addConnection rel_var_name', timeCalls(lambda catNodeId, superCatNodeId, relVarName: db.addConnection(catNodeId, superCatNodeId, rel_var_name = relVarName), connArgs)))
+    db.close()
+    return results
+
+def main(sizes, seed, num_operations, output_path):
+    report = {
+        'seed': seed,
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'results': [],
+    }
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmpDirName:
+            report['results'] += benchSize(size, seed, num_operations, tmpDirName)
+    text = json.dumps(report, indent = 1)
+    if output_path == None:
+        print(text)
+    else:
+        with open(output_path, 'w') as outputFile:
+            outputFile.write(text + '\n')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'time CategorizerData methods on synthetic graphs of several sizes')
+    parser.add_argument('--sizes', type = int, nargs = '+', default = [1000, 100000, 1000000], help = 'the numbers of categories')
+    parser.add_argument('--seed', type = int, default = 1)
+    parser.add_argument('--operations', type = int, default = 1000, help = 'how many times each operation is timed')
+    parser.add_argument('--output', help = 'write the JSON here instead of to stdout')
+    options = parser.parse_args()
+    main(options.sizes, options.seed, options.operations, options.output)
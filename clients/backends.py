@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+'''
+history:
+10/18/26 - created.  Where a GraphReplica gets its changes from, a CategorizerData in the same process or a CategorizerServer.
+'''
+
+import socket
+import json
+import itertools
+
+class LocalBackend:
+    '''
+    Calls a CategorizerData in the same process, e.g. in tests, or in the process which owns the database.
+    '''
+    def __init__(self, categorizer_data):
+        self.categorizerData = categorizer_data
+
+    def getLastChangeSeq(self):
+        return self.categorizerData.getLastChangeSeq()
+
+    def getChangesSince(self, change_seq, limit):
+        return self.categorizerData.getChangesSince(change_seq, limit)
+
+    def getLatestRows(self, table_name, row_ids = None):
+        return self.categorizerData.getLatestRows(table_name, row_ids)
+
+    def close(self):
+        pass
+
+class SocketBackend:
+    '''
+    Calls a CategorizerServer, address is a Unix socket path or (host, port).
+    One call at a time, each waits for its reply.
+    '''
+    ids = itertools.count(1)
+
+    def __init__(self, address):
+        if isinstance(address, str):
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.connect(address)
+        self.file = self.socket.makefile('rwb')
+
+    def _call(self, method_name, *args):
+        requestId = next(self.ids)
+        self.file.write(json.dumps({'id': requestId, 'method': method_name, 'args': args}).encode() + b'\n')
+        self.file.flush()
+        while True:
+            line = self.file.readline()
+            if not line:
+                raise ConnectionError('the CategorizerServer closed the connection')
+            reply = json.loads(line)
+            if reply['id'] == requestId:
+                break
+        if 'error' in reply:
+            raise RuntimeError(reply['error'])
+        return reply['result']
+
+    def getLastChangeSeq(self):
+        return self._call('getLastChangeSeq')
+
+    # the rows come back as lists, the replica keeps them as tuples like CategorizerData returns them
+    def getChangesSince(self, change_seq, limit):
+        return [tuple(change) for change in self._call('getChangesSince', change_seq, limit)]
+
+    def getLatestRows(self, table_name, row_ids = None):
+        return [tuple(row) for row in self._call('getLatestRows', table_name, row_ids)]
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
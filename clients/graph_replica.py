@@ -0,0 +1,100 @@
+#!/usr/bin/python3
+'''
+history:
+10/18/26 - created.  Renderer and search processes read the graph from memory instead of the database file.
+'''
+
+class GraphReplica:
+    '''
+    An in memory copy of the latest rows of the catNodes, catConnections, categories, catVariants, relations, relVariants
+    and the styles, read from a backend, see clients/backends.py.
+
+    The reads only look at the copy, they never do any I/O.  refresh() brings the copy up to date by reading the changes
+    since the last refresh from the changeLog, then the latest version of just the rows which changed, so its cost is
+    O(changes), not O(database).
+
+    The rows are tuples in the same form as CategorizerData.dumpTable().
+    '''
+    tableNames = ('catNodes', 'catConnections', 'categories', 'catVariants', 'relations', 'relVariants',
+                  'nodeStyles', 'connectionStyles', 'fonts', 'lines', 'heads')
+
+    def __init__(self, backend, change_batch_size = 1000):
+        '''
+        change_batch_size is the most changes read from the backend at a time
+        '''
+        self.backend = backend
+        self.changeBatchSize = change_batch_size
+        self.reload()
+
+    def reload(self):
+        '''
+        read all the latest rows again
+        '''
+        show = False
+        # the changes up to changeSeq are in the copy.  It is read first, so a change made while the tables are read is
+        # read again by the next refresh()
+        self.changeSeq = self.backend.getLastChangeSeq()
+        # tableName -> {rowId: row}
+        self.tables = {}
+        for tableName in self.tableNames:
+            self.tables[tableName] = {row[0]: row for row in self.backend.getLatestRows(tableName)}
+        if show: print(f'in GraphReplica.reload() loaded {sum([len(rows) for rows in self.tables.values()])} rows up to changeSeq {self.changeSeq}')
+
+    def refresh(self):
+        '''
+        apply the changes made since the last refresh() and return how many there were
+        '''
+        show = False
+        changeCount = 0
+        while True:
+            changes = self.backend.getChangesSince(self.changeSeq, self.changeBatchSize)
+            if not changes:
+                break
+            changedRowIds = {}
+            for (changeSeq, tableName, rowId, pathRev, operation) in changes:
+                changedRowIds.setdefault(tableName, set()).add(rowId)
+            for (tableName, rowIds) in changedRowIds.items():
+                if tableName not in self.tables:
+                    continue
+                rows = self.tables[tableName]
+                # an edited row keeps its place and a new one goes at the end, so the rows stay in id order
+                for row in self.backend.getLatestRows(tableName, sorted(rowIds)):
+                    rows[row[0]] = row
+                    rowIds.discard(row[0])
+                for rowId in rowIds:
+                    rows.pop(rowId, None)
+            self.changeSeq = changes[-1][0]
+            changeCount += len(changes)
+            if len(changes) < self.changeBatchSize:
+                break
+        if show: print(f'in GraphReplica.refresh() applied {changeCount} changes, changeSeq {self.changeSeq}')
+        return changeCount
+
+    def getRow(self, table_name, row_id):
+        '''
+        returns the latest row of table_name with row_id, or None if there is none
+        '''
+        return self.tables[table_name].get(row_id)
+
+    def getRows(self, table_name):
+        '''
+        returns a list of the latest rows of table_name, ordered by id
+        '''
+        return list(self.tables[table_name].values())
+
+    def getCatNodeName(self, cat_node_id):
+        '''
+        returns the name shown for a catNode, the name of its catVariant, or of its category for a default catVariant.
+        returns None if the catNode is not in the copy.
+        '''
+        catNode = self.tables['catNodes'].get(cat_node_id)
+        if catNode == None:
+            return None
+        catVariant = self.tables['catVariants'].get(catNode[2])
+        if catVariant == None:
+            return None
+        (catVarId, pathRev, catId, catVarName) = catVariant[:4]
+        if catVarName != None:
+            return catVarName
+        category = self.tables['categories'].get(catId)
+        return None if category == None else category[2]
@@ -0,0 +1,156 @@
+#!/usr/bin/python3
+'''
+history:
+10/18/26 - created.  Lets asyncio code use CategorizerData without blocking its event loop on SQLite.
+'''
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from data.sqlite3_db import CategorizerData
+
+class AsyncCategorizerData:
+    '''
+    Awaitable versions of the public methods of CategorizerData, e.g.
+      db = AsyncCategorizerData(path, lock)
+      catNodeId = await db.addCatNode(cat_var_name = 'Horse')
+      catVarIds = await db.findCatVariantIds('horse')
+
+    The CategorizerData is made on, and all the changes are made by, one writer thread, since a sqlite3 connection
+    belongs to the thread which made it.  The readMethodNames run on reader threads, each with a connection from the
+    CategorizerData reader pool, unless the database is in memory, then they run on the writer thread too.
+
+    Calls wait in a bounded asyncio.Queue, one for the writer and one for the readers.  When max_pending calls are
+    already waiting, the next call waits to get into the queue, which slows down the callers instead of letting the
+    backlog grow without bound.
+    find*() calls with the same arguments as a call which has not finished yet share its result instead of running again.
+    A finished change ends the sharing, so a find*() which starts after a change always sees it.
+    '''
+    readMethodNames = ('findCategoryIds', 'findCatVariantIds', 'findByText', 'findAncestors', 'findDescendants', 'dumpTable', 'getGraphAtPathRev', 'getChangesSince', 'getLastChangeSeq', 'getLatestRows', 'getNote')
+    # these hand back objects which must be used on the thread the CategorizerData is on, see runBatch() for batch()
+    syncOnlyMethodNames = ('batch', 'iterTable', 'addListener', 'removeListener', 'close')
+
+    def __init__(self, database_path_and_file_name, lock, reader_threads = 4, max_pending = 1000, **categorizer_data_args):
+        '''
+        categorizer_data_args are passed on to CategorizerData.  Its reader_pool_size is reader_threads unless it is given.
+        '''
+        self.writer = ThreadPoolExecutor(max_workers = 1, thread_name_prefix = 'categorizerWriter')
+        categorizer_data_args.setdefault('reader_pool_size', reader_threads)
+        self.db = self.writer.submit(CategorizerData, database_path_and_file_name, lock, **categorizer_data_args).result()
+        if self.db.readers != None:
+            self.readerThreads = reader_threads
+            self.readers = ThreadPoolExecutor(max_workers = reader_threads, thread_name_prefix = 'categorizerReader')
+        else:
+            self.readerThreads = 0
+            self.readers = None
+        self.maxPending = max_pending
+        # the queues and the tasks which take the calls off them are made by the first call, when there is an event loop
+        self.writeQueue = None
+        self.readQueue = None
+        self.workers = []
+        # (methodName, args, kwargs) -> asyncio.Future of a find*() call which has not finished
+        self.pendingFinds = {}
+
+    def __getattr__(self, name):
+        if name.startswith('_') or name in self.syncOnlyMethodNames or not callable(getattr(CategorizerData, name, None)):
+            raise AttributeError(f'AsyncCategorizerData has no awaitable {name}()')
+        if name in self.readMethodNames:
+            async def method(*args, **kwargs):
+                return await self._read(name, args, kwargs)
+        else:
+            async def method(*args, **kwargs):
+                return await self._write(getattr(self.db, name), args, kwargs)
+        method.__name__ = name
+        return method
+
+    def _start(self):
+        if self.writeQueue != None:
+            return
+        self.writeQueue = asyncio.Queue(maxsize = self.maxPending)
+        self.workers.append(asyncio.ensure_future(self._work(self.writeQueue, self.writer)))
+        if self.readers != None:
+            self.readQueue = asyncio.Queue(maxsize = self.maxPending)
+            for readerIdx in range(self.readerThreads):
+                self.workers.append(asyncio.ensure_future(self._work(self.readQueue, self.readers)))
+        else:
+            self.readQueue = self.writeQueue
+
+    async def _work(self, work_queue, executor):
+        '''
+        run the calls in work_queue on executor, one at a time
+        '''
+        loop = asyncio.get_running_loop()
+        while True:
+            (function, future) = await work_queue.get()
+            try:
+                if not future.done():
+                    result = await loop.run_in_executor(executor, function)
+                    if not future.done():
+                        future.set_result(result)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                work_queue.task_done()
+
+    async def _call(self, work_queue, function):
+        future = asyncio.get_running_loop().create_future()
+        # waits while the queue is full
+        await work_queue.put( (function, future) )
+        return await future
+
+    async def _read(self, method_name, args, kwargs):
+        self._start()
+        function = functools.partial(getattr(self.db, method_name), *args, **kwargs)
+        key = (method_name, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            # e.g. a list of rel_var_ids, the call is not shared
+            key = None
+        if key == None or not method_name.startswith('find'):
+            return await self._call(self.readQueue, function)
+        future = self.pendingFinds.get(key)
+        if future == None:
+            future = asyncio.ensure_future(self._call(self.readQueue, function))
+            self.pendingFinds[key] = future
+            future.add_done_callback(functools.partial(self._findDone, key))
+        # one caller being cancelled does not cancel the call for the others
+        return await asyncio.shield(future)
+
+    def _findDone(self, key, future):
+        if self.pendingFinds.get(key) is future:
+            del self.pendingFinds[key]
+
+    async def _write(self, function, args, kwargs):
+        self._start()
+        try:
+            return await self._call(self.writeQueue, functools.partial(function, *args, **kwargs))
+        finally:
+            # the find*() calls already running may not see this change, so later ones must not share their results
+            self.pendingFinds = {}
+
+    async def runBatch(self, function, *args):
+        '''
+        call function(categorizerData, *args) on the writer thread inside a CategorizerData.batch(), and return what it returns.
+        All of its changes are committed together, or rolled back if it raises an exception.
+        '''
+        def runInBatch():
+            with self.db.batch():
+                return function(self.db, *args)
+        return await self._write(runInBatch, (), {})
+
+    async def close(self):
+        '''
+        finish the calls already in the queues, then close the CategorizerData and stop the threads
+        '''
+        if self.writeQueue != None:
+            await self.writeQueue.join()
+            if self.readQueue is not self.writeQueue:
+                await self.readQueue.join()
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.get_running_loop().run_in_executor(self.writer, self.db.close)
+        self.writer.shutdown()
+        if self.readers != None:
+            self.readers.shutdown()
@@ -0,0 +1,155 @@
+#!/usr/bin/python3
+'''
+history:
+10/18/26 - created.  Answers hierarchy questions from memory instead of dumping catConnections on every query.
+'''
+
+from array import array
+from collections import deque
+
+class CategoryGraph:
+    '''
+    An in memory adjacency index of the validForLatest catConnections of a CategorizerData.
+
+    For each catNode it keeps two arrays of (otherCatNodeId, relVarId, catConnId) triples:
+      parents:  the connections from the catNode to its superCatNodes
+      children: the connections from its sub catNodes to the catNode
+    The index is loaded once and then kept up to date by addConnection(), addConnections() and editConnection() through
+    CategorizerData.addListener(), so the queries never touch SQLite.
+
+    The rel_var_ids argument of the queries limits the connections followed to those relation variants, None follows all of them.
+    '''
+    stride = 3
+
+    def __init__(self, categorizer_data):
+        self.categorizerData = categorizer_data
+        self.reload()
+        categorizer_data.addListener(self)
+
+    def close(self):
+        '''
+        stop following changes to the CategorizerData
+        '''
+        self.categorizerData.removeListener(self)
+
+    def reload(self):
+        show = False
+        # catConnId -> (catNodeId, superCatNodeId)
+        self.connections = {}
+        self.parents = {}
+        self.children = {}
+        for row in self.categorizerData.iterTable('catConnections', only_latest = True):
+            self._addConnection(row)
+        if show: print(f'in CategoryGraph.reload() loaded {len(self.connections)} connections')
+
+    def rowsChanged(self, table_name, rows):
+        if table_name != 'catConnections':
+            return
+        for row in rows:
+            self._removeConnection(row[0])
+            if row[-1]:
+                self._addConnection(row)
+
+    def _addConnection(self, row):
+        (catConnId, pathRev, catNodeId, superCatNodeId, relVarId, connStyleId, validForLatest) = row
+        if catNodeId == None or superCatNodeId == None:
+            return
+        if relVarId == None:
+            relVarId = 0
+        self.connections[catConnId] = (catNodeId, superCatNodeId)
+        self.parents.setdefault(catNodeId, array('q')).extend( (superCatNodeId, relVarId, catConnId) )
+        self.children.setdefault(superCatNodeId, array('q')).extend( (catNodeId, relVarId, catConnId) )
+
+    def _removeConnection(self, cat_conn_id):
+        nodeIds = self.connections.pop(cat_conn_id, None)
+        if nodeIds == None:
+            return
+        (catNodeId, superCatNodeId) = nodeIds
+        for (adjacency, nodeId) in ( (self.parents, catNodeId), (self.children, superCatNodeId) ):
+            triples = adjacency[nodeId]
+            for idx in range(0, len(triples), self.stride):
+                if triples[idx + 2] == cat_conn_id:
+                    del triples[idx:idx + self.stride]
+                    break
+            if len(triples) == 0:
+                del adjacency[nodeId]
+
+    def _neighbors(self, adjacency, cat_node_id, rel_var_ids):
+        '''
+        yields (otherCatNodeId, relVarId, catConnId) for each connection of cat_node_id in adjacency
+        '''
+        triples = adjacency.get(cat_node_id, ())
+        for idx in range(0, len(triples), self.stride):
+            if rel_var_ids == None or triples[idx + 1] in rel_var_ids:
+                yield (triples[idx], triples[idx + 1], triples[idx + 2])
+
+    def _breadthFirst(self, adjacencies, cat_node_id, rel_var_ids, max_depth):
+        '''
+        yields (catNodeId, depth, fromCatNodeId, relVarId, catConnId) for each catNode reachable from cat_node_id,
+        nearest first.  Each catNode is only yielded once, at the shortest depth.
+        '''
+        if rel_var_ids != None:
+            rel_var_ids = frozenset(rel_var_ids)
+        seen = {cat_node_id}
+        queue = deque( [(cat_node_id, 0)] )
+        while queue:
+            (nodeId, depth) = queue.popleft()
+            if max_depth != None and depth >= max_depth:
+                continue
+            for adjacency in adjacencies:
+                for (otherNodeId, relVarId, catConnId) in self._neighbors(adjacency, nodeId, rel_var_ids):
+                    if otherNodeId in seen:
+                        continue
+                    seen.add(otherNodeId)
+                    queue.append( (otherNodeId, depth + 1) )
+                    yield (otherNodeId, depth + 1, nodeId, relVarId, catConnId)
+
+    def findParents(self, cat_node_id, rel_var_ids = None):
+        '''
+        returns a tuple of the superCatNodeIds directly connected to cat_node_id
+        '''
+        return tuple([nodeId for (nodeId, relVarId, catConnId) in self._neighbors(self.parents, cat_node_id, rel_var_ids)])
+
+    def findChildren(self, cat_node_id, rel_var_ids = None):
+        '''
+        returns a tuple of the catNodeIds directly connected to cat_node_id as their superCatNode
+        '''
+        return tuple([nodeId for (nodeId, relVarId, catConnId) in self._neighbors(self.children, cat_node_id, rel_var_ids)])
+
+    def findAncestors(self, cat_node_id, rel_var_ids = None, max_depth = None):
+        '''
+        returns a tuple of all the superCatNodeIds above cat_node_id, nearest first, up to max_depth levels up
+        '''
+        return tuple([step[0] for step in self._breadthFirst( (self.parents,), cat_node_id, rel_var_ids, max_depth)])
+
+    def findDescendants(self, cat_node_id, rel_var_ids = None, max_depth = None):
+        '''
+        returns a tuple of all the catNodeIds below cat_node_id, nearest first, up to max_depth levels down
+        '''
+        return tuple([step[0] for step in self._breadthFirst( (self.children,), cat_node_id, rel_var_ids, max_depth)])
+
+    def findShortestPath(self, from_cat_node_id, to_cat_node_id, rel_var_ids = None, direction = 'both'):
+        '''
+        returns a tuple of the catNodeIds on a shortest path from from_cat_node_id to to_cat_node_id, including both ends.
+        direction is 'up' to only go from catNodes to their superCatNodes, 'down' for the reverse, 'both' to go either way.
+        returns an empty tuple if there is no path.
+        '''
+        adjacencies = {'up': (self.parents,), 'down': (self.children,), 'both': (self.parents, self.children)}[direction]
+        if from_cat_node_id == to_cat_node_id:
+            return (from_cat_node_id,)
+        cameFrom = {}
+        for (nodeId, depth, fromNodeId, relVarId, catConnId) in self._breadthFirst(adjacencies, from_cat_node_id, rel_var_ids, None):
+            cameFrom[nodeId] = fromNodeId
+            if nodeId == to_cat_node_id:
+                path = [nodeId]
+                while path[-1] != from_cat_node_id:
+                    path.append(cameFrom[path[-1]])
+                return tuple(reversed(path))
+        return tuple()
+
+    def getSubtree(self, cat_node_id, rel_var_ids = None, max_depth = None):
+        '''
+        returns the connections below cat_node_id as a tuple of (catConnId, catNodeId, superCatNodeId, relVarId), nearest first.
+        Each catNode is reached by one connection, the first one found.
+        '''
+        return tuple([(catConnId, nodeId, fromNodeId, relVarId) for (nodeId, depth, fromNodeId, relVarId, catConnId) in self._breadthFirst( (self.children,), cat_node_id, rel_var_ids, max_depth)])
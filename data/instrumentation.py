@@ -0,0 +1,158 @@
+#!/usr/bin/python3
+'''
+history:
+10/18/26 - created.  Shows where the time goes inside CategorizerData, without the show = False prints.
+'''
+
+import time
+import inspect
+import threading
+from bisect import bisect_right
+from data.sqlite3_db import CategorizerData
+
+class Instrumentation:
+    '''
+    Counts the calls of the public methods of one CategorizerData, e.g.
+      instrumentation = Instrumentation(db)
+      ... use db as usual ...
+      print(instrumentation.snapshot()['findCatVariantIds'])
+
+    For each method it keeps:
+      calls, errors: how many times it was called, and how many of those raised an exception
+      seconds: the total wall time of the calls
+      histogram: how many calls took less than each of histogramLabels, the last one is the rest
+      statements: the number of SQL statements run during the calls, on the writer connection and the reader pool,
+        seen through sqlite3 set_trace_callback()
+      rows: the total length of the lists, tuples and dicts of lists returned, the rows yielded for iterTable()
+    The time and statements of a call include those of the public methods it calls, e.g. addCatNode() includes getDMetaNames().
+
+    Only enable() changes the CategorizerData: it puts a counting wrapper of each method on the instance, and sets the trace
+    callbacks.  disable() takes them away again, so when it is disabled the methods run with no overhead at all.
+    Other users of set_trace_callback() on the connections, like some tests, are replaced while it is enabled.
+    '''
+    # the upper bounds of the histogram buckets in seconds
+    histogramBounds = (1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1)
+    histogramLabels = ('<10us', '<100us', '<1ms', '<10ms', '<100ms', '<1s', '>=1s')
+    # methods which hand back context managers or take part in keeping the listeners, timing them says nothing
+    excludedMethodNames = ('batch', 'addListener', 'removeListener', 'close')
+
+    def __init__(self, categorizer_data, enabled = True):
+        self.categorizerData = categorizer_data
+        self.methodNames = [name for (name, function) in inspect.getmembers(CategorizerData, inspect.isfunction)
+                            if not name.startswith('_') and name not in self.excludedMethodNames]
+        self.lock = threading.Lock()
+        # statementCount of each thread, counted by the trace callback
+        self.threadState = threading.local()
+        self.enabled = False
+        self.reset()
+        if enabled:
+            self.enable()
+
+    def reset(self):
+        '''
+        set all the counts back to 0
+        '''
+        with self.lock:
+            # methodName -> [calls, errors, seconds, statements, rows, histogram]
+            self.records = {name: [0, 0, 0.0, 0, 0, [0] * len(self.histogramLabels)] for name in self.methodNames}
+
+    def snapshot(self):
+        '''
+        returns a dict of methodName -> dict of the counts, of the methods which have been called since the last reset()
+        '''
+        snapshot = {}
+        with self.lock:
+            for (name, (calls, errors, seconds, statements, rows, histogram)) in self.records.items():
+                if calls == 0:
+                    continue
+                snapshot[name] = {
+                    'calls': calls,
+                    'errors': errors,
+                    'seconds': seconds,
+                    'histogram': dict(zip(self.histogramLabels, histogram)),
+                    'statements': statements,
+                    'rows': rows,
+                }
+        return snapshot
+
+    def enable(self):
+        if self.enabled:
+            return
+        db = self.categorizerData
+        for name in self.methodNames:
+            setattr(db, name, self._wrap(name, getattr(db, name)))
+        for connection in self._getConnections():
+            connection.set_trace_callback(self._countStatement)
+        self.enabled = True
+
+    def disable(self):
+        if not self.enabled:
+            return
+        db = self.categorizerData
+        for name in self.methodNames:
+            delattr(db, name)
+        for connection in self._getConnections():
+            connection.set_trace_callback(None)
+        self.enabled = False
+
+    def _getConnections(self):
+        '''
+        the writer connection and the reader pool connections which are not in use
+        '''
+        db = self.categorizerData
+        connections = [db.db]
+        if db.readers != None:
+            connections += list(db.readers.queue)
+        return connections
+
+    def _countStatement(self, sql):
+        # called by sqlite3 in the thread which runs the statement
+        self.threadState.statementCount = getattr(self.threadState, 'statementCount', 0) + 1
+
+    def _wrap(self, name, method):
+        threadState = self.threadState
+        def wrapper(*args, **kwargs):
+            statementCount = getattr(threadState, 'statementCount', 0)
+            startTime = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            except BaseException:
+                self._record(name, time.perf_counter() - startTime, getattr(threadState, 'statementCount', 0) - statementCount, 0, 1)
+                raise
+            seconds = time.perf_counter() - startTime
+            statements = getattr(threadState, 'statementCount', 0) - statementCount
+            if inspect.isgenerator(result):
+                self._record(name, seconds, statements, 0, 0)
+                return self._countYielded(name, result)
+            self._record(name, seconds, statements, self._countRows(result), 0)
+            return result
+        wrapper.__name__ = name
+        wrapper.__doc__ = method.__doc__
+        return wrapper
+
+    def _countRows(self, result):
+        if isinstance(result, (list, tuple)):
+            return len(result)
+        if isinstance(result, dict):
+            return sum([len(value) for value in result.values() if isinstance(value, (list, tuple))])
+        return 0
+
+    def _countYielded(self, name, rows):
+        count = 0
+        try:
+            for row in rows:
+                count += 1
+                yield row
+        finally:
+            with self.lock:
+                self.records[name][4] += count
+
+    def _record(self, name, seconds, statements, rows, errors):
+        with self.lock:
+            record = self.records[name]
+            record[0] += 1
+            record[1] += errors
+            record[2] += seconds
+            record[3] += statements
+            record[4] += rows
+            record[5][bisect_right(self.histogramBounds, seconds)] += 1
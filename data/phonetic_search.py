@@ -0,0 +1,178 @@
+#!/usr/bin/python3
+'''
+history:
+10/18/26 - created.  Typeahead search of the category and relation names without a query per keystroke.
+'''
+
+from bisect import bisect_left, insort
+import heapq
+
+class PhoneticSearchIndex:
+    '''
+    An in memory search index of the names of the validForLatest categories, catVariants, relations and relVariants of a CategorizerData.
+
+    It keeps two sorted lists of (key, tableName, rowId):
+      names: the lower case names
+      codes: the Double Metaphone codes of the names, dMetaName0 and dMetaName1
+    so the names or codes that start with some text are a contiguous run found with one bisect.
+    The index is loaded once and then kept up to date through CategorizerData.addListener().
+    Rows without a name, like the default catVariants and relVariants, are not in the index.
+    '''
+    def __init__(self, categorizer_data, max_candidates = 32):
+        '''
+        max_candidates is how many names, and how many codes, are looked at for each search.  It bounds the time of a search
+        when the text is short and matches the start of many names.
+        '''
+        self.categorizerData = categorizer_data
+        self.nameColumns = categorizer_data.nameColumns
+        self.maxCandidates = max_candidates
+        self.reload()
+        categorizer_data.addListener(self)
+
+    def close(self):
+        '''
+        stop following changes to the CategorizerData
+        '''
+        self.categorizerData.removeListener(self)
+
+    def reload(self):
+        show = False
+        # (tableName, rowId) -> (name, lowerName, dMetaName0, dMetaName1)
+        self.entries = {}
+        self.names = []
+        self.codes = []
+        for tableName in self.nameColumns:
+            for row in self.categorizerData.iterTable(tableName, only_latest = True):
+                entry = self._getEntry(tableName, row)
+                if entry != None:
+                    self.entries[(tableName, row[0])] = entry
+        for ((tableName, rowId), (name, lowerName, dMetaName0, dMetaName1)) in self.entries.items():
+            self.names.append( (lowerName, tableName, rowId) )
+            for code in (dMetaName0, dMetaName1):
+                if code != '':
+                    self.codes.append( (code, tableName, rowId) )
+        self.names.sort()
+        self.codes.sort()
+        if show: print(f'in PhoneticSearchIndex.reload() loaded {len(self.entries)} names')
+
+    def rowsChanged(self, table_name, rows):
+        if table_name not in self.nameColumns:
+            return
+        for row in rows:
+            self._removeEntry(table_name, row[0])
+            if row[-1]:
+                entry = self._getEntry(table_name, row)
+                if entry != None:
+                    self._addEntry(table_name, row[0], entry)
+
+    def _getEntry(self, table_name, row):
+        nameColumn = self.nameColumns[table_name]
+        (name, dMetaName0, dMetaName1) = row[nameColumn:nameColumn + 3]
+        if name == None:
+            return None
+        return (name, name.lower(), dMetaName0, dMetaName1)
+
+    def _addEntry(self, table_name, row_id, entry):
+        (name, lowerName, dMetaName0, dMetaName1) = entry
+        self.entries[(table_name, row_id)] = entry
+        insort(self.names, (lowerName, table_name, row_id))
+        for code in (dMetaName0, dMetaName1):
+            if code != '':
+                insort(self.codes, (code, table_name, row_id))
+
+    def _removeEntry(self, table_name, row_id):
+        entry = self.entries.pop((table_name, row_id), None)
+        if entry == None:
+            return
+        (name, lowerName, dMetaName0, dMetaName1) = entry
+        for (keys, key) in ( (self.names, lowerName), (self.codes, dMetaName0), (self.codes, dMetaName1) ):
+            if key == '':
+                continue
+            idx = bisect_left(keys, (key, table_name, row_id))
+            if idx < len(keys) and keys[idx] == (key, table_name, row_id):
+                del keys[idx]
+
+    def _findPrefixed(self, keys, text, prefix, table_names):
+        '''
+        yields (key, tableName, rowId) for up to maxCandidates keys which are text, or start with text if prefix is True
+        '''
+        count = 0
+        for idx in range(bisect_left(keys, (text,)), len(keys)):
+            (key, tableName, rowId) = keys[idx]
+            if not (key.startswith(text) if prefix else key == text):
+                return
+            if table_names != None and tableName not in table_names:
+                continue
+            yield keys[idx]
+            count += 1
+            if count == self.maxCandidates:
+                return
+
+    def search(self, text, limit = 10, prefix = True, table_names = None):
+        '''
+        Find the names which start with text, or sound like they do.
+        If prefix is False, only names which are text, or sound like text, are found.
+        table_names limits the search to some of 'categories', 'catVariants', 'relations' and 'relVariants'.
+        returns a tuple of up to limit (tableName, rowId, name), best match first.  The matches are ranked by
+          the edit distance from text to the start of the name, plus 0 if a code of the name is a code of text,
+            1 if a code of the name starts with one, else 2
+          then by how many characters are left over at the end of the name
+        '''
+        show = False
+        if text == None or text == '':
+            return tuple()
+        lowerText = text.lower()
+        textCodes = [code for code in self.categorizerData.getDMetaNames(text) if code != '']
+        if show: print(f'in PhoneticSearchIndex.search() with text {text}, textCodes {textCodes}')
+
+        candidates = set()
+        for (lowerName, tableName, rowId) in self._findPrefixed(self.names, lowerText, prefix, table_names):
+            candidates.add( (tableName, rowId) )
+        for code in textCodes:
+            for (nameCode, tableName, rowId) in self._findPrefixed(self.codes, code, prefix, table_names):
+                candidates.add( (tableName, rowId) )
+
+        # rank best first, the edit distance is only worked out for candidates which could still make the top limit.
+        # Until then a candidate whose name does not start with text is ranked with a distance of 1, the least it can be.
+        ranked = []
+        for (tableName, rowId) in candidates:
+            (name, lowerName, dMetaName0, dMetaName1) = self.entries[(tableName, rowId)]
+            phoneticRank = 2
+            for code in textCodes:
+                if code == dMetaName0 or code == dMetaName1:
+                    phoneticRank = 0
+                    break
+                if dMetaName0.startswith(code) or dMetaName1.startswith(code):
+                    phoneticRank = 1
+            isKnown = lowerName.startswith(lowerText)
+            distance = 0 if isKnown else 1
+            leftOver = max(len(lowerName) - len(lowerText), 0)
+            ranked.append( (distance + phoneticRank, leftOver, lowerName, tableName, rowId, isKnown, phoneticRank, name) )
+        heapq.heapify(ranked)
+        best = []
+        while ranked and len(best) < limit:
+            (score, leftOver, lowerName, tableName, rowId, isKnown, phoneticRank, name) = heapq.heappop(ranked)
+            if isKnown:
+                best.append( (tableName, rowId, name) )
+            else:
+                distance = self._getEditDistance(lowerText, lowerName[:len(lowerText)])
+                heapq.heappush(ranked, (distance + phoneticRank, leftOver, lowerName, tableName, rowId, True, phoneticRank, name))
+        if show: print(f'  {len(candidates)} candidates, best {best}')
+        return tuple(best)
+
+    def _getEditDistance(self, text_a, text_b):
+        '''
+        returns the Levenshtein distance between text_a and text_b
+        '''
+        previous = list(range(len(text_b) + 1))
+        for (idxA, charA) in enumerate(text_a, 1):
+            current = [idxA]
+            left = idxA
+            for (charB, diagonal, above) in zip(text_b, previous, previous[1:]):
+                if charA == charB:
+                    left = diagonal
+                else:
+                    left = 1 + min(diagonal, above, left)
+                current.append(left)
+            previous = current
+        return previous[-1]
@@ -0,0 +1,197 @@
+#!/usr/bin/python3
+'''
+history:
+10/18/26 - created.  Catches the statements which scan whole tables in production, without a debugger.
+'''
+
+import sqlite3
+import time
+import json
+import logging
+import logging.handlers
+from collections import deque
+
+class SlowQueryLog:
+    '''
+    Records the SQL statements of a CategorizerData which take threshold_seconds or longer, e.g.
+      slowQueryLog = SlowQueryLog(threshold_seconds = 0.005)
+      db = CategorizerData(path, lock, slow_query_log = slowQueryLog)
+      ...
+      for entry in slowQueryLog.getEntries():
+          print(entry['seconds'], entry['sql'], entry['plan'])
+
+    Each entry is a dict of
+      time: when the statement finished, as time.time()
+      seconds: how long it took, from execute() until its last row was fetched, or its only row for a fetchone()
+      sql, params: the statement and its bound parameters, the first set of them for an executemany()
+      count: 1, or the number of parameter sets of an executemany()
+      plan: the detail lines of EXPLAIN QUERY PLAN of the statement, e.g. ['SCAN catVariants'] when it reads the whole table
+    The last ring_size entries are kept in memory.  If file_path is given they are also written to it, one JSON object per line,
+    and when it grows past max_bytes it is renamed to file_path.1 and so on, keeping backup_count old files.
+
+    Only the connections of a CategorizerData made with slow_query_log use the timing cursors, the others have no overhead.
+    '''
+    def __init__(self, threshold_seconds = 0.01, ring_size = 1000, file_path = None, max_bytes = 1000000, backup_count = 3, explain = True):
+        '''
+        explain False leaves out the plan, which costs another statement for each slow one
+        '''
+        self.thresholdSeconds = threshold_seconds
+        self.entries = deque(maxlen = ring_size)
+        self.explain = explain
+        self.logger = None
+        if file_path != None:
+            # a logger of our own, so nothing else logged by the application goes in the file
+            self.logger = logging.Logger('slowQueries')
+            self.logger.propagate = False
+            self.logger.addHandler(logging.handlers.RotatingFileHandler(file_path, maxBytes = max_bytes, backupCount = backup_count))
+
+    def connectionFactory(self, *args, **kwargs):
+        '''
+        pass as the factory of sqlite3.connect(), makes a connection whose statements are timed
+        '''
+        connection = TimedConnection(*args, **kwargs)
+        connection.slowQueryLog = self
+        return connection
+
+    def getEntries(self):
+        '''
+        returns a list of the entries in the ring buffer, oldest first
+        '''
+        return list(self.entries)
+
+    def clear(self):
+        self.entries.clear()
+
+    def close(self):
+        if self.logger != None:
+            for handler in list(self.logger.handlers):
+                handler.close()
+                self.logger.removeHandler(handler)
+
+    def record(self, connection, sql, params, count, seconds, finish_time):
+        '''
+        called by the TimedCursor, in the thread using connection, when a statement has finished
+        '''
+        plan = []
+        if self.explain:
+            try:
+                # a plain cursor, so the EXPLAIN is not timed
+                cursor = sqlite3.Cursor(connection)
+                plan = [row[-1] for row in cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()]
+                cursor.close()
+            except sqlite3.Error:
+                # e.g. BEGIN and COMMIT have no plan
+                pass
+        if isinstance(params, dict):
+            params = dict(params)
+        else:
+            params = list(params)
+        entry = {'time': finish_time, 'seconds': seconds, 'sql': sql, 'params': params, 'count': count, 'plan': plan}
+        self.entries.append(entry)
+        if self.logger != None:
+            self.logger.warning(json.dumps(entry, default = repr))
+
+class TimedCursor(sqlite3.Cursor):
+    '''
+    Times each statement from execute() until its last row is fetched, and hands the ones which take too long to the
+    SlowQueryLog of its connection.
+    A fetchone() also ends the timing, CategorizerData only uses it to read a single row, e.g. execute(...).fetchone().
+    A statement whose rows are not all read ends with the next execute(), close(), or when the cursor is garbage collected.
+    '''
+    def __init__(self, *args, **kwargs):
+        sqlite3.Cursor.__init__(self, *args, **kwargs)
+        self.timedSql = None
+
+    def _startStatement(self, sql, params, count, seconds):
+        self.timedSql = sql
+        self.timedParams = params
+        self.timedCount = count
+        self.timedSeconds = seconds
+        self.timedFinishTime = time.time()
+        if self.description == None:
+            # not a query, there is nothing to fetch
+            self._finishStatement()
+
+    def _finishStatement(self):
+        if getattr(self, 'timedSql', None) == None:
+            return
+        sql = self.timedSql
+        self.timedSql = None
+        slowQueryLog = self.connection.slowQueryLog
+        if self.timedSeconds >= slowQueryLog.thresholdSeconds:
+            slowQueryLog.record(self.connection, sql, self.timedParams, self.timedCount, self.timedSeconds, self.timedFinishTime)
+
+    def execute(self, sql, parameters = ()):
+        self._finishStatement()
+        startTime = time.perf_counter()
+        try:
+            return sqlite3.Cursor.execute(self, sql, parameters)
+        finally:
+            self._startStatement(sql, parameters, 1, time.perf_counter() - startTime)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finishStatement()
+        # it may be a generator, and the first set is needed for the log
+        seqOfParameters = list(seq_of_parameters)
+        startTime = time.perf_counter()
+        try:
+            return sqlite3.Cursor.executemany(self, sql, seqOfParameters)
+        finally:
+            self._startStatement(sql, seqOfParameters[0] if seqOfParameters else (), len(seqOfParameters), time.perf_counter() - startTime)
+
+    def _timeFetch(self, fetch, *args):
+        startTime = time.perf_counter()
+        try:
+            return fetch(self, *args)
+        finally:
+            if self.timedSql != None:
+                self.timedSeconds += time.perf_counter() - startTime
+                self.timedFinishTime = time.time()
+
+    def fetchone(self):
+        row = self._timeFetch(sqlite3.Cursor.fetchone)
+        self._finishStatement()
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._timeFetch(sqlite3.Cursor.fetchmany, *args)
+        if not rows:
+            self._finishStatement()
+        return rows
+
+    def fetchall(self):
+        rows = self._timeFetch(sqlite3.Cursor.fetchall)
+        self._finishStatement()
+        return rows
+
+    def __next__(self):
+        try:
+            return self._timeFetch(sqlite3.Cursor.__next__)
+        except StopIteration:
+            self._finishStatement()
+            raise
+
+    def close(self):
+        self._finishStatement()
+        sqlite3.Cursor.close(self)
+
+    def __del__(self):
+        # e.g. a connection.execute() whose cursor was dropped before its rows were read
+        try:
+            self._finishStatement()
+        except Exception:
+            # the connection may already be closed
+            pass
+
+class TimedConnection(sqlite3.Connection):
+    '''
+    a connection whose cursors are TimedCursors, including the ones made by its own execute() and executemany()
+    '''
+    def cursor(self, factory = TimedCursor):
+        return sqlite3.Connection.cursor(self, factory)
+
+    def execute(self, sql, parameters = ()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
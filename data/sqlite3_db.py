@@ -11,7 +11,12 @@ history:
 
 import sqlite3
 import multiprocessing
+import threading
+import queue
+import os
 import time
+from urllib.request import pathname2url
+from contextlib import contextmanager
 from collections import OrderedDict, namedtuple
 import fuzzy
 
@@ -62,10 +67,46 @@ class CategorizerData(CategorizerLanguage):
         'connectionStyles': 'connStyleId INTEGER, pathRev INTEGER, styleName BLOB, fontID INTEGER, headType BLOB, tailType BLOB, tailColor BLOB, transparency INTEGER, validForLatest INTEGER, PRIMARY KEY (connStyleId, pathRev)',
         'lines': 'lineId INTEGER, pathRev INTEGER, lineType BLOB, weight INTEGER, color BLOB, validForLatest INTEGER, PRIMARY KEY (lineId, pathRev)',
         'heads': 'headId INTEGER, pathRev INTEGER, headType BLOB, size INTEGER, color BLOB, validForLatest INTEGER, PRIMARY KEY (headId, pathRev)',
+        # one row per row added or edited by a mutator, see getChangesSince()
+        'changeLog': 'changeSeq INTEGER, tableName BLOB, rowId INTEGER, pathRev INTEGER, operation BLOB, PRIMARY KEY (changeSeq)',
 #    'newIdeas': 'id INTEGER PRIMARY KEY AUTOINCREMENT, noteText BLOB, date BLOB, owner BLOB',
 #    'toDo'    : 'id INTEGER PRIMARY KEY AUTOINCREMENT, noteText BLOB, date BLOB, owner BLOB, completeByDate BLOB'
     }
 
+    # secondary indexes, each entry is the comma separated column list of one index.
+    # They cover the lookups done by the find*() methods, _getMatchingRowIds(), _getRelVarId() and getCatVarId(),
+    # which would otherwise scan the whole table.  The (id, pathRev) primary key already covers lookups by id.
+    indexSpecs = {
+        'categories'    : ('dMetaName0, validForLatest', 'dMetaName1, validForLatest', 'catName, validForLatest'),
+        'catVariants'   : ('dMetaName0, validForLatest', 'dMetaName1, validForLatest', 'catId, validForLatest', 'catVarName, validForLatest'),
+        'catNodes'      : ('catVarId, validForLatest',),
+        'relations'     : ('relName',),
+        'relVariants'   : ('relVarName', 'relId'),
+        'catConnections': ('catNodeId, validForLatest', 'superCatNodeId, validForLatest'),
+        'fonts'         : ('family, validForLatest',),
+        'lines'         : ('lineType, validForLatest',),
+        'heads'         : ('headType, validForLatest',),
+    }
+
+    # the version of the tables and indexes made by this class, kept in the database file as PRAGMA user_version
+    #   0: tables only
+    #   1: indexes from indexSpecs
+    #   2: indexes on catName and catVarName
+    #   3: changeLog table
+    schemaVersion = 3
+
+    # the column of the name in the tables which have names, the two Double Metaphone codes are in the next two columns
+    nameColumns = {'categories': 2, 'catVariants': 3, 'relations': 3, 'relVariants': 4}
+
+    # the optional text index of the names, see findByText().  nameTexts is an FTS5 table which splits the names
+    # into three letter sequences, its rowid is the textId of the row in nameTextRows which says which version of which row
+    # the name is from.
+    textIndexSqls = (
+        'CREATE TABLE IF NOT EXISTS nameTextRows (textId INTEGER PRIMARY KEY, tableName BLOB, rowId INTEGER, pathRev INTEGER, validForLatest INTEGER)',
+        'CREATE INDEX IF NOT EXISTS nameTextRows_tableName_rowId_validForLatest ON nameTextRows (tableName, rowId, validForLatest)',
+        "CREATE VIRTUAL TABLE IF NOT EXISTS nameTexts USING fts5(name, tokenize = 'trigram')",
+    )
+
     tableInits = {
         #             catId, pathRev, catName, dMetaName0, dMetaName1, validForLatest
         'categories'   : (0,       0,    None,         '',         '',            0),
@@ -86,22 +127,78 @@ class CategorizerData(CategorizerLanguage):
         'connectionStyles': (0, 1, 'default', 0, None, 'arrow', 'Black', 0, 1),
         'lines': (0, 1, 'Solid', 2, 'Black', 1),
         'heads': (0, 1, 'Filled', 4, 'Black', 1),
+        #changeSeq, tableName, rowId, pathRev, operation
+        'changeLog': (0, None, 0, 0, None),
     }
     typeInt = type(1)
     typeStr = type('s')
 
-    def __init__(self, database_path_and_file_name, lock, in_memory = False, create_new_database = False):
+    # the tables of FontSets, LineSets and HeadSets shared by the styles, see _getSubTableRowId()
+    subTableNames = ('fonts', 'lines', 'heads')
+
+    # the PRAGMAs set on the connection, select one with the connection_profile argument of __init__()
+    connectionProfiles = {
+        # WAL lets reader processes keep reading while the writer process writes, and a crash cannot corrupt the file.
+        # synchronous NORMAL is durable in WAL mode except for the last transactions before a power loss.
+        # cache_size is in KiB when negative.
+        'default': {
+            'journal_mode': 'WAL',
+            'synchronous' : 'NORMAL',
+            'cache_size'  : -16000,
+            'mmap_size'   : 268435456,
+            'temp_store'  : 'MEMORY',
+            'busy_timeout': 5000,
+        },
+        # the fastest, but readers wait for the writer and a crash in the middle of a transaction can corrupt the file
+        'legacy': {
+            'journal_mode': 'MEMORY',
+        },
+    }
+    # these do not apply to an in memory database
+    fileOnlyPragmas = ('journal_mode', 'mmap_size')
+    # only the writer can change the journal mode
+    writerOnlyPragmas = ('journal_mode',)
+
+    def __init__(self, database_path_and_file_name, lock, in_memory = False, create_new_database = False, connection_profile = 'default', dmeta_cache_size = 10000, text_index = False, reader_pool_size = 0, reader_timeout = 30, slow_query_log = None):
+        '''
+        connection_profile is the name of one of the connectionProfiles, or a dict of PRAGMA names and values
+        which are used instead of the ones in the 'default' profile.
+        dmeta_cache_size is the number of names whose Double Metaphone codes are remembered by getDMetaNames(), 0 turns it off.
+        text_index True adds the text index used by findByText() to the database, if it is not there yet.
+        Once a database has the text index, it is kept up to date whether or not text_index is True.
+        reader_pool_size is the number of read only connections which the find*() methods, dumpTable(), iterTable() and
+        getGraphAtPathRev() use, so they can run in other threads at the same time as each other and as the writer.
+        0 does all the reads with the one connection, like it always was.  It has no effect on an in memory database.
+        reader_timeout is how many seconds a read waits for a free connection of the reader pool before it fails.
+        slow_query_log is a SlowQueryLog from data/slow_query_log.py which gets the statements that take too long, None times nothing.
+        '''
         show = False
         if show: print('in CategorizerData.__init__()')
+        # name -> (dMetaName0, dMetaName1), least recently used first
+        self.dMetaCache = OrderedDict()
+        self.dMetaCacheSize = dmeta_cache_size
+        self.dMetaCacheHits = 0
+        self.dMetaCacheMisses = 0
+        # the reader threads share the cache
+        self.dMetaCacheLock = threading.Lock()
+        # the connections time their statements if there is a slow_query_log
+        self.connectionFactory = sqlite3.Connection if slow_query_log == None else slow_query_log.connectionFactory
         if in_memory:
-            self.db = sqlite3.connect(":memory:")
+            self.db = sqlite3.connect(":memory:", factory = self.connectionFactory)
             self.db.isolation_level = None
         else:
-            self.db = sqlite3.connect(database_path_and_file_name)
+            self.db = sqlite3.connect(database_path_and_file_name, factory = self.connectionFactory)
             self.db.isolation_level = None
-            self.db.execute('PRAGMA journal_mode = MEMORY')
-            self.dbCursor = self.db.cursor()
-            self.lock = lock
+        self.inMemory = in_memory
+        self.dbCursor = self.db.cursor()
+        self.lock = lock
+        # the read only connections of the reader pool, see _readConnection().  They are made at the end of __init__(), until
+        # then the reads use self.db
+        self.readers = None
+        self.readerTimeout = reader_timeout
+        self.readerThreadState = threading.local()
+        self.connectionProfile = self._getConnectionProfile(connection_profile)
+        self._applyConnectionProfile(self.db)
         #todo = 'id INTEGER PRIMARY KEY UNIQUE NOT NULL AUTOINCREMENT, noteText BLOB'
         #newIdea = 'id INTEGER PRIMARY KEY AUTOINCREMENT, noteText BLOB'
         #understanding = 'id INTEGER PRIMARY KEY UNIQUE NOT NULL, noteText BLOB'
@@ -118,6 +215,12 @@ class CategorizerData(CategorizerLanguage):
 
         self.sqlAdds = {}
         self.sqlDumps = {}
+        self.sqlIndexes = {}
+        self.sqlWheres = {}
+        self.sqlGetRowPathRevs = {}
+        self.sqlInvalidates = {}
+        self.sqlSnapshots = {}
+        self.sqlGetLatestRows = {}
         self.columnNames = {}
         for tableName in self.columnSpecs.keys():
             columnSpec = self.columnSpecs[tableName]
@@ -128,10 +231,39 @@ class CategorizerData(CategorizerLanguage):
             self.columnNames[tableName] = names
             self.sqlAdds[tableName] = f'INSERT INTO {tableName} ({", ".join(names)}) VALUES ({", ".join(["?"] * (len(names)))})'
             self.sqlDumps[tableName] = f'SELECT {", ".join(names)} from {tableName}'
+            # the values are always bound to the ? so sqlite3 can reuse the prepared statements, e.g.
+            #   WHERE catId == ? AND validForLatest == 1
+            #   SELECT pathRev FROM categories WHERE catId == ? AND validForLatest == 1
+            #   UPDATE categories SET validForLatest = 0 WHERE catId == ? AND validForLatest == 1
+            self.sqlWheres[tableName] = f' WHERE {names[0]} == ? AND {names[-1]} == 1'
+            self.sqlGetRowPathRevs[tableName] = f'SELECT {names[1]} FROM {tableName}{self.sqlWheres[tableName]}'
+            self.sqlInvalidates[tableName] = f'UPDATE {tableName} SET {names[-1]} = 0{self.sqlWheres[tableName]}'
+            self.sqlGetLatestRows[tableName] = f'{self.sqlDumps[tableName]}{self.sqlWheres[tableName]}'
+            # the latest row of each id with pathRev <= ?, found with a search of the (id, pathRev) primary key index for each
+            # id.  validForLatest is as it was at that pathRev: a row which has a newer version now was still valid then, e.g.
+            #   SELECT catId, pathRev, catName, dMetaName0, dMetaName1,
+            #     CASE WHEN validForLatest == 1 OR pathRev < (SELECT MAX(pathRev) FROM categories AS newer WHERE newer.catId == rows.catId) THEN 1 ELSE 0 END
+            #   FROM categories AS rows
+            #   WHERE pathRev == (SELECT MAX(pathRev) FROM categories AS versions WHERE versions.catId == rows.catId AND versions.pathRev <= ?)
+            #   ORDER BY catId
+            if tableName not in ('pathRevs', 'changeLog'):
+                self.sqlSnapshots[tableName] = (f'SELECT {", ".join(names[:-1])}, '
+                    f'CASE WHEN {names[-1]} == 1 OR {names[1]} < (SELECT MAX({names[1]}) FROM {tableName} AS newer WHERE newer.{names[0]} == rows.{names[0]}) THEN 1 ELSE 0 END '
+                    f'FROM {tableName} AS rows '
+                    f'WHERE {names[1]} == (SELECT MAX({names[1]}) FROM {tableName} AS versions WHERE versions.{names[0]} == rows.{names[0]} AND versions.{names[1]} <= ?) '
+                    f'ORDER BY {names[0]}')
+            # e.g. CREATE INDEX IF NOT EXISTS categories_dMetaName0_validForLatest ON categories (dMetaName0, validForLatest)
+            self.sqlIndexes[tableName] = []
+            for indexSpec in self.indexSpecs.get(tableName, ()):
+                indexColumnNames = [name.strip() for name in indexSpec.split(',')]
+                self.sqlIndexes[tableName].append( (indexColumnNames, f'CREATE INDEX IF NOT EXISTS {tableName}_{"_".join(indexColumnNames)} ON {tableName} ({indexSpec})') )
             if show:
                 print('  tableName', tableName, ': columnSpecs', self.columnSpecs[tableName])
                 print('    sqlAdd', self.sqlAdds[tableName])
                 print('    sqlDump', self.sqlDumps[tableName])
+                print('    sqlIndexes', self.sqlIndexes[tableName])
+                print('    sqlGetRowPathRev', self.sqlGetRowPathRevs[tableName])
+                print('    sqlInvalidate', self.sqlInvalidates[tableName])
                 print('    columnNames', self.columnNames[tableName])
 
         if create_new_database:
@@ -146,24 +278,335 @@ class CategorizerData(CategorizerLanguage):
                     assert False, 'I was asked to create a new database, but there is already a database with something in it'
                 except sqlite3.OperationalError:
                     self._addTable(tableName)
+            self.dbCursor.execute(f'PRAGMA user_version = {self.schemaVersion}')
+        self._upgradeDatabase()
+
+        # relVarName -> (relVarId, tableName) and catVarName -> (catVarId, tableName) of the names looked up by _getRelVarId()
+        # and getCatVarId(), tableName is the table the name was found in.  See _clearNameCaches() for when they are emptied.
+        self.relVarIdCache = {}
+        self.catVarIdCache = {}
+        # tableName -> {FontSet, LineSet or HeadSet as a tuple: rowId} of the subTableNames, see _getSubTableRowId()
+        self.subTableRowIds = None
+        self._loadSubTableRowIds()
+        # the depth of the nested _lockHeld() of each thread, in lockState.depth.  It is per thread, so another thread waits
+        # for the lock instead of running inside the transaction of the thread which holds it
+        self.lockState = threading.local()
+        # the next id of each table is kept here instead of asking the database for MAX(id) on every add.
+        # PRAGMA data_version tells us when another connection has written to the file and the ids must be reloaded.
+        self.nextIds = {}
+        self.dataVersion = None
+        self._loadNextIds()
+        # (pathRev, openForChange) of the latest pathRev, see _getPathRevState()
+        self.pathRevState = None
+        # > 0 while inside batch(), the changes are committed when the outermost batch() ends
+        self.batchDepth = 0
+        # the thread in the outermost batch(), its reads use the writer connection to see its changes before they are committed
+        self.batchThreadId = None
+        # objects which keep their own copy of some of the data, see addListener()
+        self.listeners = []
+        cursor = self.dbCursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'nameTexts'")
+        self.hasTextIndex = cursor.fetchone() != None
+        if text_index and not self.hasTextIndex:
+            self._addTextIndex()
+
+        if reader_pool_size > 0 and not in_memory:
+            uri = f'file:{pathname2url(os.path.abspath(database_path_and_file_name))}?mode=ro'
+            readers = queue.Queue()
+            for readerIdx in range(reader_pool_size):
+                # each connection is only used by one thread at a time, but not always the same one
+                reader = sqlite3.connect(uri, uri = True, check_same_thread = False, factory = self.connectionFactory)
+                reader.isolation_level = None
+                self._applyConnectionProfile(reader, read_only = True)
+                readers.put(reader)
+            self.readers = readers
+
+    def _getConnectionProfile(self, connection_profile):
+        if type(connection_profile) == self.typeStr:
+            return dict(self.connectionProfiles[connection_profile])
+        profile = dict(self.connectionProfiles['default'])
+        profile.update(connection_profile)
+        return profile
+
+    def _applyConnectionProfile(self, db, read_only = False):
+        show = False
+        for (pragmaName, value) in self.connectionProfile.items():
+            if self.inMemory and pragmaName in self.fileOnlyPragmas:
+                continue
+            if read_only and pragmaName in self.writerOnlyPragmas:
+                continue
+            if show: print(f'  PRAGMA {pragmaName} = {value}')
+            db.execute(f'PRAGMA {pragmaName} = {value}')
+
+    def _upgradeDatabase(self):
+        '''
+        bring the tables and indexes of an existing database file up to schemaVersion.
+        Each step only runs if the file was made by an older version of this class.
+        '''
+        show = False
+        (userVersion,) = self.dbCursor.execute('PRAGMA user_version').fetchone()
+        if show: print(f'in _upgradeDatabase() with user_version {userVersion}, schemaVersion {self.schemaVersion}')
+        if userVersion >= self.schemaVersion:
+            return
+        cursor = self.dbCursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        tableNames = [row[0] for row in cursor.fetchall()]
+        if 'pathRevs' not in tableNames:
+            # nothing has been created in this file yet, so there is nothing to upgrade
+            return
+        if userVersion < 1:
+            if show: print('  adding the indexes in indexSpecs')
+            for tableName in self.indexSpecs.keys():
+                if tableName in tableNames:
+                    # files made before a column was added do not have it, so skip the indexes which need it
+                    cursor = self.dbCursor.execute(f'PRAGMA table_info({tableName})')
+                    fileColumnNames = [row[1] for row in cursor.fetchall()]
+                    self._addIndexes(tableName, fileColumnNames)
+        if userVersion < 2:
+            if show: print('  adding the indexes on catName and catVarName')
+            for tableName in ('categories', 'catVariants'):
+                if tableName in tableNames:
+                    cursor = self.dbCursor.execute(f'PRAGMA table_info({tableName})')
+                    fileColumnNames = [row[1] for row in cursor.fetchall()]
+                    self._addIndexes(tableName, fileColumnNames)
+        if userVersion < 3 and 'changeLog' not in tableNames:
+            if show: print('  adding the changeLog table')
+            # the changes made before the upgrade are not in it
+            self._addTable('changeLog')
+        self.dbCursor.execute(f'PRAGMA user_version = {self.schemaVersion}')
+        self.db.commit()
+
+    @contextmanager
+    def _lockHeld(self):
+        '''
+        hold self.lock for the duration of a with statement.
+        Nested uses in the same thread and CategorizerData only acquire the lock once, the multiprocessing.Lock is not reentrant.
+        '''
+        lockDepth = getattr(self.lockState, 'depth', 0)
+        if lockDepth == 0:
+            self.lock.acquire()
+        self.lockState.depth = lockDepth + 1
+        try:
+            yield
+        finally:
+            self.lockState.depth -= 1
+            if self.lockState.depth == 0:
+                self.lock.release()
+
+    def _loadNextIds(self):
+        '''
+        read MAX(id) of every table with an id, pathRevs is handled by _getPathRev()
+        '''
+        show = False
+        (self.dataVersion,) = self.dbCursor.execute('PRAGMA data_version').fetchone()
+        self.nextIds = {}
+        for tableName in self.columnSpecs.keys():
+            if tableName == 'pathRevs':
+                continue
+            try:
+                cursor = self.dbCursor.execute(f'SELECT MAX({self.columnNames[tableName][0]}) FROM {tableName}')
+            except sqlite3.OperationalError:
+                # the table has not been created yet
+                continue
+            (maxId,) = cursor.fetchone()
+            self.nextIds[tableName] = (maxId or 0) + 1
+        if show: print(f'in _loadNextIds() nextIds {self.nextIds}, dataVersion {self.dataVersion}')
+
+    def _checkForOtherWriters(self):
+        '''
+        if another connection has committed changes to the database since we last looked, reload the ids
+        and forget the cached pathRev.
+        Inside a batch() nobody else can write, the outermost batch() looks once when its transaction begins.
+        '''
+        if self.batchDepth > 0:
+            return
+        (dataVersion,) = self.dbCursor.execute('PRAGMA data_version').fetchone()
+        if dataVersion != self.dataVersion:
+            self._loadNextIds()
+            self.pathRevState = None
+            self._clearNameCaches()
+            self._notifyReload()
+
+    def _clearNameCaches(self):
+        '''
+        forget the names looked up by _getRelVarId() and getCatVarId(), e.g. when another connection may have added or
+        changed names, or the rows the names were found in were rolled back
+        '''
+        self.relVarIdCache = {}
+        self.catVarIdCache = {}
+
+    def _getNextIds(self, table_name, count):
+        '''
+        reserve count new ids for table_name and return them as a range.
+        The ids are only ours while the lock is held until they are committed, so this must be called inside a batch(),
+        which every method that adds rows uses.  Another CategorizerData on the same file waits for the lock, then sees
+        the commit in _checkForOtherWriters() when its batch() begins and reloads the ids.
+        '''
+        if self.batchDepth == 0:
+            print(f'ERROR _getNextIds() for {table_name} called outside of a batch()')
+            assert False
+        firstId = self.nextIds[table_name]
+        self.nextIds[table_name] = firstId + count
+        return range(firstId, firstId + count)
+
+    def _getNextId(self, table_name):
+        return self._getNextIds(table_name, 1)[0]
+
+    def _logChanges(self, table_name, row_ids, path_rev, operation):
+        '''
+        append a changeLog row for each of row_ids, operation is 'add' or 'edit'.
+        Like the ids, it must be called inside the batch() of the change, so the rows and their changeLog rows are
+        committed or rolled back together.
+        '''
+        changeSeqs = self._getNextIds('changeLog', len(row_ids))
+        self.dbCursor.executemany(self.sqlAdds['changeLog'], [(changeSeq, table_name, rowId, path_rev, operation) for (changeSeq, rowId) in zip(changeSeqs, row_ids)])
+
+    def _getPathRevState(self):
+        '''
+        return (pathRev, openForChange) of the latest pathRev.
+        It is cached in self.pathRevState, only this class changes it unless another connection has written to the database.
+        '''
+        self._checkForOtherWriters()
+        if self.pathRevState == None:
+            cursor = self.dbCursor.execute(f"SELECT MAX({self.columnNames['pathRevs'][0]}) FROM pathRevs")
+            (pathRev,) = cursor.fetchone()
+            cursor = self.dbCursor.execute(f"SELECT {self.columnNames['pathRevs'][-1]} FROM pathRevs WHERE {self.columnNames['pathRevs'][0]} = ?", (pathRev,))
+            (openForChange,) = cursor.fetchone()
+            self.pathRevState = (pathRev, openForChange)
+        return self.pathRevState
 
     def _getPathRev(self):
         show = False
         if show: print('in _getPathRev()')
-        cursor = self.dbCursor.execute(f"SELECT MAX({self.columnNames['pathRevs'][0]}) FROM pathRevs")
-        (pathRev,) = cursor.fetchone()
-        cursor = self.dbCursor.execute(f"SELECT {self.columnNames['pathRevs'][-1]} FROM pathRevs WHERE {self.columnNames['pathRevs'][0]} = {pathRev}")
-        (openForChange,) = cursor.fetchone()
-        if openForChange:
-            if show: print('  still open for change, do not need a new pathRev')
-        else:
-            # make a new pathRev, add it to pathRevs and mark it open
-            if show: print('  not open for change, make a new path rev')
-            pathRev += 1
-            self.dbCursor.execute(self.sqlAdds['pathRevs'], (pathRev, int(time.time()), 1))
+        with self._lockHeld():
+            (pathRev, openForChange) = self._getPathRevState()
+            if openForChange:
+                if show: print('  still open for change, do not need a new pathRev')
+            else:
+                # make a new pathRev, add it to pathRevs and mark it open
+                if show: print('  not open for change, make a new path rev')
+                pathRev += 1
+                self.dbCursor.execute(self.sqlAdds['pathRevs'], (pathRev, int(time.time()), 1))
+                self.pathRevState = (pathRev, 1)
         if show: print(f'  returning pathRev {pathRev}')
         return pathRev
     
+    @contextmanager
+    def batch(self):
+        '''
+        make all the changes inside a with statement in a single transaction, e.g.
+          with db.batch():
+              catNodeId = db.addCatNode(cat_var_name = 'Horse')
+              db.addConnection(catNodeId, farmCatNodeId, rel_var_name = 'is-a')
+        self.lock is held until the with statement ends.
+        If an exception is raised, all of the changes are rolled back and the exception is passed on.
+        Batches can be nested, only the outermost one commits.
+        '''
+        show = False
+        if show: print(f'in batch() with batchDepth {self.batchDepth}')
+        with self._lockHeld():
+            if self.batchDepth > 0:
+                # already in a transaction, the outermost batch() will commit or roll back
+                self.batchDepth += 1
+                try:
+                    yield self
+                finally:
+                    self.batchDepth -= 1
+                return
+            self.dbCursor.execute('BEGIN IMMEDIATE')
+            self._checkForOtherWriters()
+            self.batchDepth = 1
+            self.batchThreadId = threading.get_ident()
+            try:
+                yield self
+            except BaseException:
+                if show: print('  rolling back')
+                self.batchDepth = 0
+                self.batchThreadId = None
+                self.dbCursor.execute('ROLLBACK')
+                # the ids and pathRev handed out inside the transaction were rolled back with it
+                self._loadNextIds()
+                self.pathRevState = None
+                self._clearNameCaches()
+                self.subTableRowIds = None
+                self._notifyReload()
+                raise
+            self.batchDepth = 0
+            self.batchThreadId = None
+            self.dbCursor.execute('COMMIT')
+
+    @contextmanager
+    def _readConnection(self):
+        '''
+        the connection to read with for the duration of a with statement.
+        With a reader pool it is one of the read only connections, which no other thread uses until the with statement ends,
+        and nested uses in the same thread get the same one.  It sees what was committed when each statement starts.
+        Without a reader pool, or inside a batch() in the same thread, it is the writer connection, which also sees the changes
+        which are not committed yet.
+        '''
+        if self.readers == None or (self.batchDepth > 0 and self.batchThreadId == threading.get_ident()):
+            yield self.db
+            return
+        state = self.readerThreadState
+        if getattr(state, 'depth', 0) == 0:
+            state.reader = self._getReader()
+        state.depth = getattr(state, 'depth', 0) + 1
+        try:
+            yield state.reader
+        finally:
+            state.depth -= 1
+            if state.depth == 0:
+                self.readers.put(state.reader)
+                state.reader = None
+
+    def _getReader(self):
+        '''
+        take a connection from the reader pool, waiting at most readerTimeout seconds for one to be put back
+        '''
+        try:
+            return self.readers.get(timeout = self.readerTimeout)
+        except queue.Empty:
+            print(f'ERROR no connection of the reader pool was free for {self.readerTimeout} seconds, are iterTable() generators left unfinished?')
+            assert False
+
+    def close(self):
+        '''
+        close the connections to the database
+        '''
+        if self.readers != None:
+            while not self.readers.empty():
+                self.readers.get().close()
+        self.db.close()
+
+    def addListener(self, listener):
+        '''
+        listener keeps its own copy of some of the data, e.g. CategoryGraph or PhoneticSearchIndex, and is told about changes with
+          listener.rowsChanged(table_name, rows): rows are the new latest versions of rows which were added or edited,
+            as tuples in the same form as dumpTable().  They are sent as soon as they are written, even inside a batch().
+          listener.reload(): anything may have changed, e.g. a batch() was rolled back or another connection wrote to the database
+        '''
+        self.listeners.append(listener)
+
+    def removeListener(self, listener):
+        self.listeners.remove(listener)
+
+    def _notifyRows(self, table_name, rows):
+        for listener in self.listeners:
+            listener.rowsChanged(table_name, rows)
+
+    def _notifyRowIds(self, table_name, row_ids):
+        '''
+        read the latest version of the rows and send them to the listeners.  Nothing is read if there are no listeners.
+        '''
+        if not self.listeners:
+            return
+        rows = []
+        for rowId in row_ids:
+            rows += self.dbCursor.execute(self.sqlGetLatestRows[table_name], (rowId,)).fetchall()
+        self._notifyRows(table_name, rows)
+
+    def _notifyReload(self):
+        for listener in self.listeners:
+            listener.reload()
+
     def addCatNode(self, cat_var_id = None, cat_var_name = None, dx = None, dy = None, dz = None, nodeStyleId = 0):
         '''
         should the API enforce exclusive or?
@@ -173,15 +616,77 @@ class CategorizerData(CategorizerLanguage):
         If cat_var_name is provided, add a new category, catVariant, then add a catNode with the new catVarId.
         The application code should find the cat_var_id before calling this method.  If it cannot find it, then call this method with a cat_var_name, and a new category and category variant will be created.
         '''
-        if cat_var_id:
-            catNodeId = self._addCatNode(cat_var_id, dx, dy, dz, nodeStyleId)
-        elif cat_var_name:
-            catVarId = self._addCategory(cat_var_name) #adds category and catVariant and returns catVarId
-            catNodeId = self._addCatNode(catVarId, dx, dy, dz, nodeStyleId)
-        else:
-            print('ERROR must provide either cat_var_id or cat_var_name')
-            assert False
-        return catNodeId
+        with self.batch():
+            if cat_var_id:
+                catNodeId = self._addCatNode(cat_var_id, dx, dy, dz, nodeStyleId)
+            elif cat_var_name:
+                catVarId = self._addCategory(cat_var_name) #adds category and catVariant and returns catVarId
+                catNodeId = self._addCatNode(catVarId, dx, dy, dz, nodeStyleId)
+            else:
+                print('ERROR must provide either cat_var_id or cat_var_name')
+                assert False
+            return catNodeId
+
+    def addCatNodes(self, cat_node_specs):
+        '''
+        Add many catNodes at once, e.g. when importing a map.
+        Each spec is a tuple of the arguments of addCatNode(): (cat_var_id, cat_var_name, dx, dy, dz, node_style_id).
+        Trailing arguments can be left off and get the same defaults as addCatNode().
+        Just like addCatNode(), each spec with a cat_var_name and no cat_var_id makes a new category, even when another spec
+        has the same name, so the result does not depend on how the catNodes are split between calls.  Use getCatVarId()
+        to find the catVarId of an existing name instead.
+        All the rows are written in one batch().
+        Returns a list of the new catNodeIds in the same order as cat_node_specs.
+        '''
+        show = False
+        defaults = (None, None, None, None, None, 0)
+        specs = [tuple(spec) + defaults[len(spec):] for spec in cat_node_specs]
+        if show: print(f'in addCatNodes() with {len(specs)} specs')
+
+        # find the names that need a new category before changing anything
+        newCatNames = []
+        for (catVarId, catVarName, dx, dy, dz, nodeStyleId) in specs:
+            if catVarId:
+                continue
+            if catVarName:
+                newCatNames.append(catVarName)
+            else:
+                print('ERROR must provide either cat_var_id or cat_var_name')
+                assert False
+
+        with self.batch():
+            pathRev = self._getPathRev()
+            catIds = self._getNextIds('categories', len(newCatNames))
+            catVarIds = self._getNextIds('catVariants', len(newCatNames))
+            categoryRows = []
+            catVariantRows = []
+            # the double metaphones of a name in more than one spec are only made once
+            dMetaNamess = self.getDMetaNamesBulk(newCatNames)
+            for (catName, catId, catVarId) in zip(newCatNames, catIds, catVarIds):
+                (dMetaName0, dMetaName1) = dMetaNamess[catName]
+                categoryRows.append( (catId, pathRev, catName, dMetaName0, dMetaName1, 1) )
+                # the default catVariant, just like _addCatVariant(catId, None)
+                catVariantRows.append( (catVarId, pathRev, catId, None, '', '', 1) )
+
+            catNodeIds = self._getNextIds('catNodes', len(specs))
+            catNodeRows = []
+            newCatVarIds = iter(catVarIds)
+            for (catNodeId, (catVarId, catVarName, dx, dy, dz, nodeStyleId)) in zip(catNodeIds, specs):
+                if not catVarId:
+                    catVarId = next(newCatVarIds)
+                catNodeRows.append( (catNodeId, pathRev, catVarId, dx, dy, dz, nodeStyleId, 1) )
+
+            self.dbCursor.executemany(self.sqlAdds['categories'], categoryRows)
+            self.dbCursor.executemany(self.sqlAdds['catVariants'], catVariantRows)
+            self.dbCursor.executemany(self.sqlAdds['catNodes'], catNodeRows)
+            self._logChanges('categories', catIds, pathRev, 'add')
+            self._logChanges('catVariants', catVarIds, pathRev, 'add')
+            self._logChanges('catNodes', catNodeIds, pathRev, 'add')
+            self._addNameTexts('categories', categoryRows)
+            self._notifyRows('categories', categoryRows)
+            self._notifyRows('catVariants', catVariantRows)
+        if show: print(f'  added {len(categoryRows)} categories and {len(catNodeRows)} catNodes')
+        return list(catNodeIds)
 
     def editCatNode(self, cat_node_id, cat_var_id = None, cat_var_name = None, dx = None, dy = None, dz = None, node_style_id = None):
         '''
@@ -202,63 +707,63 @@ class CategorizerData(CategorizerLanguage):
         if cat_var_id == None and dx == None and dy == None and dz == None and node_style_id == None:
             return
 
-        # just like addCatNode, we can create a new category by passing a name without a cat_var_id
-        if not cat_var_id and cat_var_name:
-            cat_var_id = self._addCategory(cat_var_name)
-            
-        # get the latest pathRev
-        pathRev = self._getPathRev()
-
-        # get the path rev of the latest version of this catNode and the corresponding sql WHERE statement
-        (rowPathRev, sqlWhere) = self._getRowPathRevAndSQLWhere('catNodes', cat_node_id) 
-
-        if rowPathRev == pathRev:
-            # The pathRevs are the same, so we can just change the existing tuple with what we need to change
-            if show: print('    rowPathRev == pathRev, updating data:')
-            colValPairs = []
-            if cat_var_id != None:
-                colValPairs.append( (self.columnNames['catNodes'][2], cat_var_id) )
-            if dx != None:
-                colValPairs.append( (self.columnNames['catNodes'][3], dx) )
-            if dy != None:
-                colValPairs.append( (self.columnNames['catNodes'][4], dy) )
-            if dz != None:
-                colValPairs.append( (self.columnNames['catNodes'][5], dz) )
-            if node_style_id != None:
-                colValPairs.append( (self.columnNames['catNodes'][6], node_style_id) )
-            if show: print('  colValPairs', colValPairs)
-            self._editRow('catNodes', colValPairs, sqlWhere)
-        else:
-            # The pathRevs are not the same, so we need to make a new tuple in the database
-            if show: print('    rowPathRev != pathRev, marking existing row to not validForLatest and creating new row:')
-            # get all the existing values from the current row
-            (catNodeIdName, pathRevName, catVarIdName, dxName, dyName, dzName, nodeStyleIDName) = self.columnNames['catNodes'][:7]
-            sql = f"SELECT {catNodeIdName}, {pathRevName}, {catVarIdName}, {dxName}, {dyName}, {dzName}, {nodeStyleIDName} FROM catNodes {sqlWhere}"
-            if show: print('    sql:', sql)
-            cursor = self.dbCursor.execute(sql)
-            (catNodeId, rowPathRev, oldCatVarId, oldDx, oldDy, oldDz, oldNodeStyleId) = cursor.fetchone()
-
-            # set validForLatest of the old one to 0
-            columnName, value = self.columnNames['catNodes'][-1], 0
-            sql = f"UPDATE catNodes SET {columnName} = {value} {sqlWhere}"
-            if show: print('      updating validForLatest: sql = \"', sql, '\"')
-            self.dbCursor.execute(sql)
-
-            # create a new version of the catNode which is a new row in the table.  We change one of the primary keys: pathRev
-            if cat_var_id == None:
-                catVarId = oldCatVarId
+        with self.batch():
+            # just like addCatNode, we can create a new category by passing a name without a cat_var_id
+            if not cat_var_id and cat_var_name:
+                cat_var_id = self._addCategory(cat_var_name)
+
+            # get the latest pathRev
+            pathRev = self._getPathRev()
+
+            # get the path rev of the latest version of this catNode and the corresponding sql WHERE statement
+            (rowPathRev, sqlWhere) = self._getRowPathRevAndSQLWhere('catNodes', cat_node_id) 
+
+            if rowPathRev == pathRev:
+                # The pathRevs are the same, so we can just change the existing tuple with what we need to change
+                if show: print('    rowPathRev == pathRev, updating data:')
+                colValPairs = []
+                if cat_var_id != None:
+                    colValPairs.append( (self.columnNames['catNodes'][2], cat_var_id) )
+                if dx != None:
+                    colValPairs.append( (self.columnNames['catNodes'][3], dx) )
+                if dy != None:
+                    colValPairs.append( (self.columnNames['catNodes'][4], dy) )
+                if dz != None:
+                    colValPairs.append( (self.columnNames['catNodes'][5], dz) )
+                if node_style_id != None:
+                    colValPairs.append( (self.columnNames['catNodes'][6], node_style_id) )
+                if show: print('  colValPairs', colValPairs)
+                self._editRow('catNodes', colValPairs, sqlWhere, (cat_node_id,))
             else:
-                catVarId = cat_var_id
-            if dx == None:
-                dx = oldDx
-            if dy == None:
-                dy = oldDy
-            if dz == None:
-                dz = oldDz
-            if node_style_id == None:
-                nodeStyleId = oldNodeStyleId
-            self.dbCursor.execute(self.sqlAdds['catNodes'], (catNodeId, pathRev, catVarId, dx, dy, dz, nodeStyleId, 1))
-        self.db.commit()
+                # The pathRevs are not the same, so we need to make a new tuple in the database
+                if show: print('    rowPathRev != pathRev, marking existing row to not validForLatest and creating new row:')
+                # get all the existing values from the current row
+                (catNodeIdName, pathRevName, catVarIdName, dxName, dyName, dzName, nodeStyleIDName) = self.columnNames['catNodes'][:7]
+                sql = f"SELECT {catNodeIdName}, {pathRevName}, {catVarIdName}, {dxName}, {dyName}, {dzName}, {nodeStyleIDName} FROM catNodes {sqlWhere}"
+                if show: print('    sql:', sql)
+                cursor = self.dbCursor.execute(sql, (cat_node_id,))
+                (catNodeId, rowPathRev, oldCatVarId, oldDx, oldDy, oldDz, oldNodeStyleId) = cursor.fetchone()
+
+                # set validForLatest of the old one to 0
+                sql = self.sqlInvalidates['catNodes']
+                if show: print('      updating validForLatest: sql = \"', sql, '\"')
+                self.dbCursor.execute(sql, (cat_node_id,))
+
+                # create a new version of the catNode which is a new row in the table.  We change one of the primary keys: pathRev
+                if cat_var_id == None:
+                    catVarId = oldCatVarId
+                else:
+                    catVarId = cat_var_id
+                if dx == None:
+                    dx = oldDx
+                if dy == None:
+                    dy = oldDy
+                if dz == None:
+                    dz = oldDz
+                if node_style_id == None:
+                    nodeStyleId = oldNodeStyleId
+                self.dbCursor.execute(self.sqlAdds['catNodes'], (catNodeId, pathRev, catVarId, dx, dy, dz, nodeStyleId, 1))
+            self._logChanges('catNodes', (cat_node_id,), pathRev, 'edit')
 
     def addConnection(self, cat_node_id, super_cat_node_id, rel_var_id = None, rel_var_name = None, conn_style_id = None):
         '''
@@ -273,87 +778,125 @@ class CategorizerData(CategorizerLanguage):
         '''
         show = False
         if show: print("in addConnection() with cat_node_id {cat_node_id}, super_cat_node_id {super_cat_node_id}, rel_var_id {rel_var_id}, rel_var_name {rel_var_name}")
-        pathRev = self._getPathRev()
-        if rel_var_id == None:
-            if rel_var_name == None:
-                rel_var_id = 0
-            else:
-                rel_var_id = self._getRelVarId(rel_var_name)
-                
-        if conn_style_id == None:
-            conn_style_id = 0
-
-        #get the next catConnId
-        cursor = self.dbCursor.execute(f"SELECT MAX({self.columnNames['catConnections'][0]}) FROM catConnections")
-        (catConnId,) = cursor.fetchone()
-        catConnId += 1
-        if show: print(f"  catConnId {catConnId}, pathRev {pathRev}")
-        
-        self.dbCursor.execute(self.sqlAdds['catConnections'], (catConnId, pathRev, cat_node_id, super_cat_node_id, rel_var_id, conn_style_id, 1))
-        self.db.commit()
-        return catConnId
+        with self.batch():
+            pathRev = self._getPathRev()
+            if rel_var_id == None:
+                if rel_var_name == None:
+                    rel_var_id = 0
+                else:
+                    rel_var_id = self._getRelVarId(rel_var_name)
+
+            if conn_style_id == None:
+                conn_style_id = 0
+
+            #get the next catConnId
+            catConnId = self._getNextId('catConnections')
+            if show: print(f"  catConnId {catConnId}, pathRev {pathRev}")
+
+            catConnRow = (catConnId, pathRev, cat_node_id, super_cat_node_id, rel_var_id, conn_style_id, 1)
+            self.dbCursor.execute(self.sqlAdds['catConnections'], catConnRow)
+            self._logChanges('catConnections', (catConnId,), pathRev, 'add')
+            self._notifyRows('catConnections', (catConnRow,))
+            return catConnId
+
+    def addConnections(self, conn_specs):
+        '''
+        Add many connections at once, e.g. when importing a map.
+        Each spec is a tuple of the arguments of addConnection(): (cat_node_id, super_cat_node_id, rel_var_id, rel_var_name, conn_style_id).
+        Trailing arguments can be left off and get the same defaults as addConnection().
+        Each distinct rel_var_name is looked up (or its relation created) only once.
+        All the rows are written in one batch().
+        Returns a list of the new catConnIds in the same order as conn_specs.
+        '''
+        show = False
+        defaults = (None, None, None, None, None)
+        specs = [tuple(spec) + defaults[len(spec):] for spec in conn_specs]
+        if show: print(f'in addConnections() with {len(specs)} specs')
+
+        with self.batch():
+            pathRev = self._getPathRev()
+            relVarIds = {}
+            for (catNodeId, superCatNodeId, relVarId, relVarName, connStyleId) in specs:
+                if relVarId == None and relVarName != None and relVarName not in relVarIds:
+                    relVarIds[relVarName] = self._getRelVarId(relVarName)
+
+            catConnIds = self._getNextIds('catConnections', len(specs))
+            catConnRows = []
+            for (catConnId, (catNodeId, superCatNodeId, relVarId, relVarName, connStyleId)) in zip(catConnIds, specs):
+                if relVarId == None:
+                    if relVarName == None:
+                        relVarId = 0
+                    else:
+                        relVarId = relVarIds[relVarName]
+                if connStyleId == None:
+                    connStyleId = 0
+                catConnRows.append( (catConnId, pathRev, catNodeId, superCatNodeId, relVarId, connStyleId, 1) )
+            self.dbCursor.executemany(self.sqlAdds['catConnections'], catConnRows)
+            self._logChanges('catConnections', catConnIds, pathRev, 'add')
+            self._notifyRows('catConnections', catConnRows)
+        return list(catConnIds)
 
     def editConnection(self, cat_conn_id, cat_node_id = None, super_cat_node_id = None, rel_var_id = None, rel_var_name = None, conn_style_id = None):
         show = False
         if show: print(f"in editConnection() with cat_conn_id {cat_conn_id}, cat_node_id {cat_node_id}, super_cat_node_id {super_cat_node_id}, rel_var_id {rel_var_id}, rel_var_name {rel_var_name}")
         
-        pathRev = self._getPathRev()
-
-        # if we got a rel_var_name, convert it to a rel_var_id
-        if rel_var_id == None:
-            if rel_var_name == None:
-                pass
-            else:
-                rel_var_id = self._getRelVarId(rel_var_name)
-        # note: if we were passed both a rel_var_id and a rel_var_name, we ignore the rel_var_name
-        
-        (rowPathRev, sqlWhere) = self._getRowPathRevAndSQLWhere('catConnections', cat_conn_id)
-        if rowPathRev == pathRev:
-            # edit the existing row
-            if show: print('  rowPathRev == pathRev, updating data:')
-            colValPairs = []
-            if cat_node_id != None:
-                colValPairs.append( (self.columnNames['catConnections'][2], cat_node_id) )
-            if super_cat_node_id != None:
-                colValPairs.append( (self.columnNames['catConnections'][3], super_cat_node_id) )
-            if rel_var_id != None:
-                colValPairs.append( (self.columnNames['catConnections'][4], rel_var_id) )
-            if conn_style_id != None:
-                colValPairs.append( (self.columnNames['catConnections'][5], conn_style_id) )
-            self._editRow('catConnections', colValPairs, sqlWhere)
-        else:
-            if show: print('  rowPathRev != pathRev, marking existing row to not validForLatest and creating new row:')
-            # get all the existing values from the current row
-            (pathRevName, catNodeIdName, superCatNodeIdName, relVarIdName, connStyleIdName) = self.columnNames['catConnections'][1:6]
-            sql = f"SELECT {pathRevName}, {catNodeIdName}, {superCatNodeIdName}, {relVarIdName}, {connStyleIdName} FROM catConnections {sqlWhere}"
-            if show: print('  sql', sql)
-            cursor = self.dbCursor.execute(sql)
-            (rowPathRev, oldCatNodeId, oldSuperCatNodeId, oldRelVarId, oldConnStyleId) = cursor.fetchone()
-
-            # mark the old row as no longer the latest
-            name, value = self.columnNames['catConnections'][-1], 0
-            sql = f"UPDATE catConnections set {name} = {value} {sqlWhere}"
-            self.dbCursor.execute(sql)
+        with self.batch():
+            pathRev = self._getPathRev()
 
-            # create a new version of the catConnection which is a new row in the table.  We change one of the primary keys: pathRev
-            if cat_node_id == None:
-                catNodeId = oldCatNodeId
-            else:
-                catNodeId = cat_node_id
-            if super_cat_node_id == None:
-                superCatNodeId = oldSuperCatNodeId
-            else:
-                superCatNodeId = super_cat_node_id
+            # if we got a rel_var_name, convert it to a rel_var_id
             if rel_var_id == None:
-                relVarId = oldRelVarId
-            else:
-                relVarId = rel_var_id
-            if conn_style_id == None:
-                connStyleId = oldConnStyleId
+                if rel_var_name == None:
+                    pass
+                else:
+                    rel_var_id = self._getRelVarId(rel_var_name)
+            # note: if we were passed both a rel_var_id and a rel_var_name, we ignore the rel_var_name
+
+            (rowPathRev, sqlWhere) = self._getRowPathRevAndSQLWhere('catConnections', cat_conn_id)
+            if rowPathRev == pathRev:
+                # edit the existing row
+                if show: print('  rowPathRev == pathRev, updating data:')
+                colValPairs = []
+                if cat_node_id != None:
+                    colValPairs.append( (self.columnNames['catConnections'][2], cat_node_id) )
+                if super_cat_node_id != None:
+                    colValPairs.append( (self.columnNames['catConnections'][3], super_cat_node_id) )
+                if rel_var_id != None:
+                    colValPairs.append( (self.columnNames['catConnections'][4], rel_var_id) )
+                if conn_style_id != None:
+                    colValPairs.append( (self.columnNames['catConnections'][5], conn_style_id) )
+                self._editRow('catConnections', colValPairs, sqlWhere, (cat_conn_id,))
             else:
-                connStyleId = conn_style_id
-            self.dbCursor.execute(self.sqlAdds['catConnections'], (cat_conn_id, pathRev, catNodeId, superCatNodeId, relVarId, connStyleId, 1))
-        self.db.commit()
+                if show: print('  rowPathRev != pathRev, marking existing row to not validForLatest and creating new row:')
+                # get all the existing values from the current row
+                (pathRevName, catNodeIdName, superCatNodeIdName, relVarIdName, connStyleIdName) = self.columnNames['catConnections'][1:6]
+                sql = f"SELECT {pathRevName}, {catNodeIdName}, {superCatNodeIdName}, {relVarIdName}, {connStyleIdName} FROM catConnections {sqlWhere}"
+                if show: print('  sql', sql)
+                cursor = self.dbCursor.execute(sql, (cat_conn_id,))
+                (rowPathRev, oldCatNodeId, oldSuperCatNodeId, oldRelVarId, oldConnStyleId) = cursor.fetchone()
+
+                # mark the old row as no longer the latest
+                self.dbCursor.execute(self.sqlInvalidates['catConnections'], (cat_conn_id,))
+
+                # create a new version of the catConnection which is a new row in the table.  We change one of the primary keys: pathRev
+                if cat_node_id == None:
+                    catNodeId = oldCatNodeId
+                else:
+                    catNodeId = cat_node_id
+                if super_cat_node_id == None:
+                    superCatNodeId = oldSuperCatNodeId
+                else:
+                    superCatNodeId = super_cat_node_id
+                if rel_var_id == None:
+                    relVarId = oldRelVarId
+                else:
+                    relVarId = rel_var_id
+                if conn_style_id == None:
+                    connStyleId = oldConnStyleId
+                else:
+                    connStyleId = conn_style_id
+                self.dbCursor.execute(self.sqlAdds['catConnections'], (cat_conn_id, pathRev, catNodeId, superCatNodeId, relVarId, connStyleId, 1))
+            self._logChanges('catConnections', (cat_conn_id,), pathRev, 'edit')
+            self._notifyRowIds('catConnections', (cat_conn_id,))
 
     def _addCatNode(self, cat_var_id, dx, dy, dz, node_style_id):
         show = False
@@ -361,13 +904,12 @@ class CategorizerData(CategorizerLanguage):
 
         pathRev = self._getPathRev()
 
-        # get the next catId
-        cursor = self.dbCursor.execute(f"SELECT MAX({self.columnNames['catNodes'][0]}) FROM catNodes")
-        (catNodeId,) = cursor.fetchone()
-        catNodeId += 1
+        # get the next catNodeId
+        catNodeId = self._getNextId('catNodes')
         if show: print(f"  catNodeId {catNodeId}, pathRev {pathRev}")
 
         self.dbCursor.execute(self.sqlAdds['catNodes'], (catNodeId, pathRev, cat_var_id, dx, dy, dz, node_style_id, 1))
+        self._logChanges('catNodes', (catNodeId,), pathRev, 'add')
         if show:
             print('    added new catNode:', (catNodeId, pathRev, cat_var_id, dx, dy, dz, node_style_id, 1))
         return catNodeId
@@ -390,33 +932,82 @@ class CategorizerData(CategorizerLanguage):
         '''
         show = False
         if show: print(f"in _getRelVarId() with rel_var_name {rel_var_name}")
-        sql = f'SELECT {self.columnNames["relVariants"][0]} FROM relVariants WHERE {self.columnNames["relVariants"][4]} = "{rel_var_name}"'
-        if show: print(f'  sql {sql}')
-        cursor = self.dbCursor.execute(sql)
-        data = cursor.fetchone()
-        if data:
-            #found an exact match of the name
-            (relVarId,) = data
-        else:
-            sql = f'SELECT {self.columnNames["relations"][0]} FROM relations WHERE {self.columnNames["relations"][3]} = "{rel_var_name}"'
+        # a cached name is found without waiting for the lock
+        self._checkForOtherWriters()
+        relVarIdTableName = self.relVarIdCache.get(rel_var_name)
+        if relVarIdTableName != None:
+            (relVarId, tableName) = relVarIdTableName
+            if show: print(f'  returning cached relVarId {relVarId}')
+            return relVarId
+        # the lock keeps another connection from adding the same relation between looking for the name and adding it
+        with self._lockHeld():
+            self._checkForOtherWriters()
+            sql = f'SELECT {self.columnNames["relVariants"][0]} FROM relVariants WHERE {self.columnNames["relVariants"][4]} = ?'
             if show: print(f'  sql {sql}')
-            cursor = self.dbCursor.execute(sql)
+            cursor = self.dbCursor.execute(sql, (rel_var_name,))
             data = cursor.fetchone()
             if data:
-                # found an exact match of the name in the relations table
-                (relId,) = data
-                # find the default relVarId for this relation
-                sql = f'SELECT {self.columnNames["relVariants"][0]} FROM relVariants WHERE {self.columnNames["relVariants"][2]} = {str(relId)}'
-                if show: print(f'  sql {sql}')
-                cursor = self.dbCursor.execute(sql)
-                (relVarId,) = cursor.fetchone()
+                #found an exact match of the name
+                (relVarId,) = data
+                tableName = 'relVariants'
             else:
-                # did not find the relation name anywhere, create a new relation
-                relVarId = self._addRelation(None, rel_var_name, None)
-                
+                sql = f'SELECT {self.columnNames["relations"][0]} FROM relations WHERE {self.columnNames["relations"][3]} = ?'
+                if show: print(f'  sql {sql}')
+                cursor = self.dbCursor.execute(sql, (rel_var_name,))
+                data = cursor.fetchone()
+                if data:
+                    # found an exact match of the name in the relations table
+                    (relId,) = data
+                    # find the default relVarId for this relation
+                    sql = f'SELECT {self.columnNames["relVariants"][0]} FROM relVariants WHERE {self.columnNames["relVariants"][2]} = ?'
+                    if show: print(f'  sql {sql}')
+                    cursor = self.dbCursor.execute(sql, (relId,))
+                    (relVarId,) = cursor.fetchone()
+                else:
+                    # did not find the relation name anywhere, create a new relation
+                    relVarId = self._addRelation(None, rel_var_name, None)
+                tableName = 'relations'
+            self.relVarIdCache[rel_var_name] = (relVarId, tableName)
+
         if show: print(f'  returning relVarId {relVarId}')
         return relVarId
-    
+
+    def getCatVarId(self, cat_var_name):
+        '''
+        given an exact name, find the catVarId to use for it, e.g. to pass to addCatNode() instead of making a new category.
+        if the name is the name of a latest catVariant, return the catVarId of the first one.
+        else if it is the name of a latest category, return the catVarId of the default catVariant of the first one.
+        else return 0
+        It only reads, so it does not wait for the lock, not even when the name is not in catVarIdCache.
+        '''
+        show = False
+        if show: print(f'in getCatVarId() with cat_var_name {cat_var_name}')
+        self._checkForOtherWriters()
+        catVarIdTableName = self.catVarIdCache.get(cat_var_name)
+        if catVarIdTableName != None:
+            (catVarId, tableName) = catVarIdTableName
+            if show: print(f'  returning cached catVarId {catVarId}')
+            return catVarId
+        (catVarIdName, pathRevName, catIdName, catVarName) = self.columnNames['catVariants'][0:4]
+        validName = self.columnNames['catVariants'][-1]
+        sql = f'SELECT {catVarIdName} FROM catVariants WHERE {catVarName} = ? AND {validName} = 1 ORDER BY {catVarIdName} LIMIT 1'
+        data = self.dbCursor.execute(sql, (cat_var_name,)).fetchone()
+        tableName = 'catVariants'
+        if data == None:
+            # the default catVariant of the category, it has no name of its own
+            sql = f'SELECT {catVarIdName} FROM catVariants WHERE {catIdName} = (' \
+                  f'SELECT {self.columnNames["categories"][0]} FROM categories WHERE {self.columnNames["categories"][2]} = ? AND {validName} = 1 ' \
+                  f'ORDER BY {self.columnNames["categories"][0]} LIMIT 1) AND {catVarName} IS NULL AND {validName} = 1 ORDER BY {catVarIdName} LIMIT 1'
+            data = self.dbCursor.execute(sql, (cat_var_name,)).fetchone()
+            tableName = 'categories'
+        if data == None:
+            if show: print('  not found')
+            return 0
+        (catVarId,) = data
+        self.catVarIdCache[cat_var_name] = (catVarId, tableName)
+        if show: print(f'  returning catVarId {catVarId}')
+        return catVarId
+
     def _addCategory(self, cat_name):
         '''
         Add a single category.  This is called when user is adding nodes using addCatNode() and providing a category name and not a category id.  
@@ -426,23 +1017,26 @@ class CategorizerData(CategorizerLanguage):
         show = False
         if show: print(f'in _addCategory() with cat_name {cat_name}')        
 
-        pathRev = self._getPathRev()
+        with self.batch():
+            pathRev = self._getPathRev()
 
-        # get the next catId
-        cursor = self.dbCursor.execute(f'SELECT MAX({self.columnNames["categories"][0]}) FROM categories')
-        (catId,) = cursor.fetchone()
-        catId += 1
-        if show: print(f'  catId {catId}, pathRev {pathRev}')
-        (dMetaName0, dMetaName1) = self.getDMetaNames(cat_name)
-        # add the category
-        self.dbCursor.execute(self.sqlAdds['categories'], (catId, pathRev, cat_name, dMetaName0, dMetaName1, 1))
-        if show:
-            print('    added new category:', (catId, pathRev, cat_name, dMetaName0, dMetaName1, 1))
+            # get the next catId
+            catId = self._getNextId('categories')
+            if show: print(f'  catId {catId}, pathRev {pathRev}')
+            (dMetaName0, dMetaName1) = self.getDMetaNames(cat_name)
+            # add the category
+            categoryRow = (catId, pathRev, cat_name, dMetaName0, dMetaName1, 1)
+            self.dbCursor.execute(self.sqlAdds['categories'], categoryRow)
+            if show:
+                print('    added new category:', categoryRow)
+            self._logChanges('categories', (catId,), pathRev, 'add')
+            self._addNameTexts('categories', (categoryRow,))
+            self._notifyRows('categories', (categoryRow,))
 
-        # add the default catVariant for the category
-        catVarId = self._addCatVariant(catId, None) # does self.db.commit()
+            # add the default catVariant for the category
+            catVarId = self._addCatVariant(catId, None)
 
-        return catVarId
+            return catVarId
     
     def _addCatVariant(self, cat_id, cat_var_name):
         '''
@@ -454,38 +1048,46 @@ class CategorizerData(CategorizerLanguage):
         show = False
         if show: print(f'in _addCatVariant() with cat_id {cat_id}, cat_var_name {cat_var_name}')
 
-        pathRev = self._getPathRev()
-
-        # add the catVariant for the category
-        cursor = self.dbCursor.execute(f'SELECT MAX({self.columnNames["catVariants"][0]}) FROM catVariants')
-        (catVarId,) = cursor.fetchone()
-        catVarId += 1
-        (dMetaName0, dMetaName1) = self.getDMetaNames(cat_var_name)
-        self.dbCursor.execute(self.sqlAdds['catVariants'], (catVarId, pathRev, cat_id, cat_var_name, dMetaName0, dMetaName1, 1))
-        self.db.commit()
-        return catVarId
+        with self.batch():
+            pathRev = self._getPathRev()
+
+            # add the catVariant for the category
+            catVarId = self._getNextId('catVariants')
+            (dMetaName0, dMetaName1) = self.getDMetaNames(cat_var_name)
+            catVariantRow = (catVarId, pathRev, cat_id, cat_var_name, dMetaName0, dMetaName1, 1)
+            self.dbCursor.execute(self.sqlAdds['catVariants'], catVariantRow)
+            self._logChanges('catVariants', (catVarId,), pathRev, 'add')
+            self._addNameTexts('catVariants', (catVariantRow,))
+            # a catVariant with the name is found before a category with it
+            if cat_var_name != None and self.catVarIdCache.get(cat_var_name, (None, 'catVariants'))[1] == 'categories':
+                self.catVarIdCache[cat_var_name] = (catVarId, 'catVariants')
+            self._notifyRows('catVariants', (catVariantRow,))
+            return catVarId
 
     def _addRelation(self, rel_prefix, rel_name, direction):
         show = False
         if show: print(f'in _addRelation() with rel_prefix {rel_prefix}, rel_name {rel_name}, direction {direction}')
-        pathRev = self._getPathRev()
+        with self.batch():
+            pathRev = self._getPathRev()
 
-        # get the next relId
-        cursor = self.dbCursor.execute(f'SELECT MAX({self.columnNames["relations"][0]}) FROM relations')
-        (relId,) = cursor.fetchone()
-        relId += 1
-        if show: print('  relId', relId, ', pathRev', pathRev)
+            # get the next relId
+            relId = self._getNextId('relations')
+            if show: print('  relId', relId, ', pathRev', pathRev)
 
-        # get the double metaphone code for rel_name
-        (dMetaName0, dMetaName1) = self.getDMetaNames(rel_name)
-        self.dbCursor.execute(self.sqlAdds['relations'], (relId, pathRev, rel_prefix, rel_name, dMetaName0, dMetaName1, direction, 1))
-        if show:
-            print('    added new relation:', (relId, pathRev, rel_prefix, rel_name, dMetaName0, dMetaName1, direction, 1))
+            # get the double metaphone code for rel_name
+            (dMetaName0, dMetaName1) = self.getDMetaNames(rel_name)
+            relationRow = (relId, pathRev, rel_prefix, rel_name, dMetaName0, dMetaName1, direction, 1)
+            self.dbCursor.execute(self.sqlAdds['relations'], relationRow)
+            if show:
+                print('    added new relation:', relationRow)
+            self._logChanges('relations', (relId,), pathRev, 'add')
+            self._addNameTexts('relations', (relationRow,))
+            self._notifyRows('relations', (relationRow,))
 
-        # add the default relVariant for the category
-        relVarId = self._addRelVariant(relId)
+            # add the default relVariant for the category
+            relVarId = self._addRelVariant(relId)
 
-        return relVarId
+            return relVarId
         
     def _addRelVariant(self, rel_id, rel_var_prefix = None, rel_var_name = None, var_direction = None):
         '''
@@ -495,36 +1097,73 @@ class CategorizerData(CategorizerLanguage):
         show = False
         if show: print(f'in _addRelVariant() with rel_id {rel_id}, rel_var_prefix {rel_var_prefix}, rel_var_name {rel_var_name}, var_direction {var_direction}')        
 
-        pathRev = self._getPathRev()
+        with self.batch():
+            pathRev = self._getPathRev()
 
-        # add the relation variant for the relation
-        cursor = self.dbCursor.execute(f'SELECT MAX({self.columnNames["relVariants"][0]}) FROM relVariants')
-        (relVarId,) = cursor.fetchone()
-        relVarId += 1
+            # add the relation variant for the relation
+            relVarId = self._getNextId('relVariants')
 
-        # get the double metaphone names
-        (dMetaName0, dMetaName1) = self.getDMetaNames(rel_var_name)
-        self.dbCursor.execute(self.sqlAdds['relVariants'], (relVarId, pathRev, rel_id, rel_var_prefix, rel_var_name, dMetaName0, dMetaName1, var_direction, 1))
-        
-        self.db.commit()
-        return relVarId
+            # get the double metaphone names
+            (dMetaName0, dMetaName1) = self.getDMetaNames(rel_var_name)
+            relVariantRow = (relVarId, pathRev, rel_id, rel_var_prefix, rel_var_name, dMetaName0, dMetaName1, var_direction, 1)
+            self.dbCursor.execute(self.sqlAdds['relVariants'], relVariantRow)
+            self._logChanges('relVariants', (relVarId,), pathRev, 'add')
+            self._addNameTexts('relVariants', (relVariantRow,))
+            # a relVariant with the name is found before a relation with it
+            if rel_var_name != None and self.relVarIdCache.get(rel_var_name, (None, 'relVariants'))[1] == 'relations':
+                self.relVarIdCache[rel_var_name] = (relVarId, 'relVariants')
+            self._notifyRows('relVariants', (relVariantRow,))
+            return relVarId
 
     def getDMetaNames(self, name, skip_blanks = False):
         if name == None:
             dMetaName0 = ''
             dMetaName1 = ''
         else:
-            dMetaNames = self.dMeta(name)
-            dMetaName0 = dMetaNames[0].decode()
-            if dMetaNames[1] == None:
-                dMetaName1 = ''
-            else:
-                dMetaName1 = dMetaNames[1].decode()
+            with self.dMetaCacheLock:
+                dMetaNames = self.dMetaCache.get(name)
+                if dMetaNames == None:
+                    self.dMetaCacheMisses += 1
+                    dMetaNames = self.dMeta(name)
+                    # names with no sounds dMeta can code, e.g. 'h', get no codes at all
+                    if dMetaNames[0] == None:
+                        dMetaName0 = ''
+                    else:
+                        dMetaName0 = dMetaNames[0].decode()
+                    if dMetaNames[1] == None:
+                        dMetaName1 = ''
+                    else:
+                        dMetaName1 = dMetaNames[1].decode()
+                    if self.dMetaCacheSize > 0:
+                        self.dMetaCache[name] = (dMetaName0, dMetaName1)
+                        if len(self.dMetaCache) > self.dMetaCacheSize:
+                            self.dMetaCache.popitem(last = False)
+                else:
+                    self.dMetaCacheHits += 1
+                    self.dMetaCache.move_to_end(name)
+                    (dMetaName0, dMetaName1) = dMetaNames
         if skip_blanks == True:
             if dMetaName1 == '':
                 return (dMetaName0,)
         return (dMetaName0, dMetaName1)
-    
+
+    def getDMetaNamesBulk(self, names):
+        '''
+        returns a dict of each distinct name in names to its (dMetaName0, dMetaName1).
+        Each name is encoded at most once, and only if it is not already in the cache.
+        '''
+        dMetaNamess = {}
+        for name in names:
+            if name not in dMetaNamess:
+                dMetaNamess[name] = self.getDMetaNames(name)
+        return dMetaNamess
+
+    def getDMetaCacheStats(self):
+        '''
+        returns a dict with the hits, misses, current size and maximum size of the Double Metaphone cache
+        '''
+        return {'hits': self.dMetaCacheHits, 'misses': self.dMetaCacheMisses, 'size': len(self.dMetaCache), 'maxSize': self.dMetaCacheSize}
+
     def editCategory(self, cat_id, cat_name):
         '''
         Change the name of a category.  This is typically a small change, like capitalization, plural, or a more general term.
@@ -532,24 +1171,28 @@ class CategorizerData(CategorizerLanguage):
         '''
         show = False
         if show: print(f'in editCategory() with cat_id {cat_id}, cat_name {cat_name}')
-        pathRev = self._getPathRev()
-        (rowPathRev, sqlWhere) = self._getRowPathRevAndSQLWhere('categories', cat_id)
-        (dMetaName0, dMetaName1) = self.getDMetaNames(cat_name)
-        if rowPathRev == pathRev:
-            if show: print('  rowPathRev == pathRev, updating data:')
-            colValPairs = [
-                (self.columnNames['categories'][2], cat_name), 
-                (self.columnNames['categories'][3], dMetaName0), 
-                (self.columnNames['categories'][4], dMetaName1), 
-            ]
-            self._editRow('categories', colValPairs, sqlWhere)
-            #do I need to change the default catVariant (the one with None for a name also?) 
-        else:
-            if show: print('  rowPathRev != pathRev, marking existing row to not validForLatest and creating new row:')
-            sql = f'UPDATE categories set {self.columnNames["categories"][-1]} = 0 {sqlWhere}'
-            self.dbCursor.execute(sql)
-            self.dbCursor.execute(self.sqlAdds['categories'], (cat_id, pathRev, cat_name, dMetaName0, dMetaName1, 1))
-        self.db.commit()
+        with self.batch():
+            pathRev = self._getPathRev()
+            (rowPathRev, sqlWhere) = self._getRowPathRevAndSQLWhere('categories', cat_id)
+            (dMetaName0, dMetaName1) = self.getDMetaNames(cat_name)
+            if rowPathRev == pathRev:
+                if show: print('  rowPathRev == pathRev, updating data:')
+                colValPairs = [
+                    (self.columnNames['categories'][2], cat_name), 
+                    (self.columnNames['categories'][3], dMetaName0), 
+                    (self.columnNames['categories'][4], dMetaName1), 
+                ]
+                self._editRow('categories', colValPairs, sqlWhere, (cat_id,))
+                #do I need to change the default catVariant (the one with None for a name also?) 
+            else:
+                if show: print('  rowPathRev != pathRev, marking existing row to not validForLatest and creating new row:')
+                self.dbCursor.execute(self.sqlInvalidates['categories'], (cat_id,))
+                self.dbCursor.execute(self.sqlAdds['categories'], (cat_id, pathRev, cat_name, dMetaName0, dMetaName1, 1))
+            self._logChanges('categories', (cat_id,), pathRev, 'edit')
+            self._editNameText('categories', cat_id, pathRev, cat_name)
+            # the old name is no longer found, and the new one may be found first
+            self.catVarIdCache = {}
+            self._notifyRowIds('categories', (cat_id,))
         
     def editCatVariant(self, cat_var_id, cat_var_name):
         '''
@@ -558,30 +1201,33 @@ class CategorizerData(CategorizerLanguage):
         '''
         show = False
         if show: print(f'in editCatVariant() with cat_var_id {cat_var_id}, cat_var_name {cat_var_name}')
-        pathRev = self._getPathRev()
-        (rowPathRev, sqlWhere) = self._getRowPathRevAndSQLWhere('catVariants', cat_var_id)
-        (dMetaName0, dMetaName1) = self.getDMetaNames(cat_var_name)
-        if rowPathRev == pathRev:
-            if show: print('  rowPathRev == pathRev, updating data:')
-            colValPairs = [
-                (self.columnNames['catVariants'][3], cat_var_name),
-                (self.columnNames['catVariants'][4], dMetaName0),
-                (self.columnNames['catVariants'][5], dMetaName1),
-            ]
-            self._editRow('catVariants', colValPairs, sqlWhere)
-            #do I need to change the default catVariant (the one with None for a name also?) 
-        else:
-            if show: print('  rowPathRev != pathRev, marking existing row to not validForLatest and creating new row:')
-            # get the catId from the existing catVariant
-            sql = f'SELECT {self.columnNames["catVariants"][2]} FROM catVariants {sqlWhere}'
-            cursor = self.dbCursor.execute(sql)
-            (catId,) = cursor.fetchone()
-            
-            sql = f'UPDATE catVariants set {self.columnNames["categories"][-1]} = 0 {sqlWhere}'
-            self.dbCursor.execute(sql)
-
-            self.dbCursor.execute(self.sqlAdds['catVariants'], (cat_var_id, pathRev, catId, cat_var_name, dMetaName0, dMetaName1, 1))
-        self.db.commit()
+        with self.batch():
+            pathRev = self._getPathRev()
+            (rowPathRev, sqlWhere) = self._getRowPathRevAndSQLWhere('catVariants', cat_var_id)
+            (dMetaName0, dMetaName1) = self.getDMetaNames(cat_var_name)
+            if rowPathRev == pathRev:
+                if show: print('  rowPathRev == pathRev, updating data:')
+                colValPairs = [
+                    (self.columnNames['catVariants'][3], cat_var_name),
+                    (self.columnNames['catVariants'][4], dMetaName0),
+                    (self.columnNames['catVariants'][5], dMetaName1),
+                ]
+                self._editRow('catVariants', colValPairs, sqlWhere, (cat_var_id,))
+                #do I need to change the default catVariant (the one with None for a name also?) 
+            else:
+                if show: print('  rowPathRev != pathRev, marking existing row to not validForLatest and creating new row:')
+                # get the catId from the existing catVariant
+                sql = f'SELECT {self.columnNames["catVariants"][2]} FROM catVariants {sqlWhere}'
+                cursor = self.dbCursor.execute(sql, (cat_var_id,))
+                (catId,) = cursor.fetchone()
+
+                self.dbCursor.execute(self.sqlInvalidates['catVariants'], (cat_var_id,))
+
+                self.dbCursor.execute(self.sqlAdds['catVariants'], (cat_var_id, pathRev, catId, cat_var_name, dMetaName0, dMetaName1, 1))
+            self._logChanges('catVariants', (cat_var_id,), pathRev, 'edit')
+            self._editNameText('catVariants', cat_var_id, pathRev, cat_var_name)
+            self.catVarIdCache = {}
+            self._notifyRowIds('catVariants', (cat_var_id,))
         
     def addNodeStyle(self, style_name, font_id = None, font_set = None, background_color = None, transparency = None):
         '''
@@ -592,21 +1238,20 @@ class CategorizerData(CategorizerLanguage):
         '''
         show = False
         if show: print('in addNodeStyle() with style_name {style_name}, font_id {font_id}, font_set {font_set}, background_color {background_color}, transparency {transparency}')
-        pathRev = self._getPathRev()
-        cursor = self.dbCursor.execute(f'SELECT MAX({self.columnNames["nodeStyles"][0]}) FROM nodeStyles')
-        (nodeStyleId,) = cursor.fetchone()
-        nodeStyleId += 1
-        if show: print(f'  nodeStyleId {nodeStyleId}, pathRev {pathRev}')
-
-        # if we do not have a font_id, and we have other font info, create a new font
-        if font_id == None:
-            fontId = self._getSubTableRowId('fonts', font_set)
-        else:
-            fontId = font_id
-        (dMetaName0, dMetaName1) = self.getDMetaNames(style_name)
-        self.dbCursor.execute(self.sqlAdds['nodeStyles'], (nodeStyleId, pathRev, style_name, dMetaName0, dMetaName1, fontId, background_color, transparency, 1))
-        self.db.commit()
-        return nodeStyleId
+        with self.batch():
+            pathRev = self._getPathRev()
+            nodeStyleId = self._getNextId('nodeStyles')
+            if show: print(f'  nodeStyleId {nodeStyleId}, pathRev {pathRev}')
+
+            # if we do not have a font_id, and we have other font info, create a new font
+            if font_id == None:
+                fontId = self._getSubTableRowId('fonts', font_set)
+            else:
+                fontId = font_id
+            (dMetaName0, dMetaName1) = self.getDMetaNames(style_name)
+            self.dbCursor.execute(self.sqlAdds['nodeStyles'], (nodeStyleId, pathRev, style_name, dMetaName0, dMetaName1, fontId, background_color, transparency, 1))
+            self._logChanges('nodeStyles', (nodeStyleId,), pathRev, 'add')
+            return nodeStyleId
 
     def editNodeStyle(self, node_style_id, name = None, font_id = None, font_set = None, background_color = None, transparency = None):
         '''
@@ -616,57 +1261,58 @@ class CategorizerData(CategorizerLanguage):
         '''
         show = False
         if show: print(f'in editNodeStyle() with nodeStyleId {node_style_id}, font_id {font_id}, font_set {font_set}, background_color {background_color}, transparency {transparency}')
-        pathRev = self._getPathRev()
-        (rowPathRev, sqlWhere) = self._getRowPathRevAndSQLWhere('nodeStyles', node_style_id)
-        newName, newDMetaName0, newDMetaName1, newFontId, newBackgroundColor, newTransparency = None, None, None, None, None, None
-        newValues = [None] * len(self.columnNames['nodeStyles'])
-        newIdxs = []
-        if name != None:
-            (dMetaName0, dMetaName1) = self.getDMetaNames(name)
-            newValues[2], newValues[3], newValues[4] = f'{name}', f'{dMetaName0}', f'{dMetaName1}'
-            newIdxs += [2,3,4]
-        if font_id != None:
-            #change the font_id if different
-            newValues[5] = font_id
-            newIdxs.append(5)
-        elif font_set != None and font_set.count(None) < len(font_set):
-            #the font_set exists and there is not a font_id
-            # see if the font_set exists, if it does get the fontId, if it doesn't create a new font and get the id
-            fontId = self._getSubTableRowId('fonts', font_set)
-            newValues[5] = fontId
-            newIdxs.append(5)
-        if background_color != None:
-            newValues[6] = f'{background_color}'
-            newIdxs.append(6)
-        if transparency != None:
-            newValues[7] = transparency
-            newIdxs.append(7)
-
-        if rowPathRev == pathRev:
-            if show: print('  rowPathRev == pathRev, updating data:')
-            colValPairs = [ (self.columnNames['nodeStyles'][x], newValues[x]) for x in newIdxs ]
-            self._editRow('nodeStyles', colValPairs, sqlWhere)
-        else:
-            if show: print('  rowPathRev != pathRev, create a new row')
-            # get the data for the existing row which was not specified in the arguments of this method
-            oldIdxs = []
-            for i in range(1, len(self.columnNames['nodeStyles']) - 1):
-                if newValues[i] == None:
-                    oldIdxs.append(i)
-            sql = f"SELECT {', '.join([self.columnNames['nodeStyles'][x] for x in oldIdxs])} FROM nodeStyles {sqlWhere}"
-            if show: print('    sql:', sql)
-            cursor = self.dbCursor.execute(sql)
-            oldRowData = cursor.fetchone()
-            if show: print('    oldRowData:', oldRowData, ', oldIdxs', oldIdxs)
-
-            # mark the old row not valid for latest
-            sql = f'UPDATE nodeStyles set {self.columnNames["nodeStyles"][-1]} = 0 {sqlWhere}'
-            self.dbCursor.execute(sql)
-
-            # combine the old and new data and write a new row
-            for (oldIdx, oldRowDatum) in zip(oldIdxs, oldRowData):
-                newValues[oldIdx] = oldRowDatum
-            self.dbCursor.execute(self.sqlAdds['nodeStyles'], (node_style_id, pathRev) + tuple(newValues[2:-1]) + (1,))
+        with self.batch():
+            pathRev = self._getPathRev()
+            (rowPathRev, sqlWhere) = self._getRowPathRevAndSQLWhere('nodeStyles', node_style_id)
+            newName, newDMetaName0, newDMetaName1, newFontId, newBackgroundColor, newTransparency = None, None, None, None, None, None
+            newValues = [None] * len(self.columnNames['nodeStyles'])
+            newIdxs = []
+            if name != None:
+                (dMetaName0, dMetaName1) = self.getDMetaNames(name)
+                newValues[2], newValues[3], newValues[4] = f'{name}', f'{dMetaName0}', f'{dMetaName1}'
+                newIdxs += [2,3,4]
+            if font_id != None:
+                #change the font_id if different
+                newValues[5] = font_id
+                newIdxs.append(5)
+            elif font_set != None and font_set.count(None) < len(font_set):
+                #the font_set exists and there is not a font_id
+                # see if the font_set exists, if it does get the fontId, if it doesn't create a new font and get the id
+                fontId = self._getSubTableRowId('fonts', font_set)
+                newValues[5] = fontId
+                newIdxs.append(5)
+            if background_color != None:
+                newValues[6] = f'{background_color}'
+                newIdxs.append(6)
+            if transparency != None:
+                newValues[7] = transparency
+                newIdxs.append(7)
+
+            if rowPathRev == pathRev:
+                if show: print('  rowPathRev == pathRev, updating data:')
+                colValPairs = [ (self.columnNames['nodeStyles'][x], newValues[x]) for x in newIdxs ]
+                self._editRow('nodeStyles', colValPairs, sqlWhere, (node_style_id,))
+            else:
+                if show: print('  rowPathRev != pathRev, create a new row')
+                # get the data for the existing row which was not specified in the arguments of this method
+                oldIdxs = []
+                for i in range(1, len(self.columnNames['nodeStyles']) - 1):
+                    if newValues[i] == None:
+                        oldIdxs.append(i)
+                sql = f"SELECT {', '.join([self.columnNames['nodeStyles'][x] for x in oldIdxs])} FROM nodeStyles {sqlWhere}"
+                if show: print('    sql:', sql)
+                cursor = self.dbCursor.execute(sql, (node_style_id,))
+                oldRowData = cursor.fetchone()
+                if show: print('    oldRowData:', oldRowData, ', oldIdxs', oldIdxs)
+
+                # mark the old row not valid for latest
+                self.dbCursor.execute(self.sqlInvalidates['nodeStyles'], (node_style_id,))
+
+                # combine the old and new data and write a new row
+                for (oldIdx, oldRowDatum) in zip(oldIdxs, oldRowData):
+                    newValues[oldIdx] = oldRowDatum
+                self.dbCursor.execute(self.sqlAdds['nodeStyles'], (node_style_id, pathRev) + tuple(newValues[2:-1]) + (1,))
+            self._logChanges('nodeStyles', (node_style_id,), pathRev, 'edit')
 
     def editConnectionStyle(self, connection_style_id, name = None, font_id = None, font_set = None, line_id = None, line_set = None, head_id = None, head_set = None):
         '''
@@ -676,70 +1322,71 @@ class CategorizerData(CategorizerLanguage):
         '''
         show = False
         if show: print(f'in editConnectionStyle() with connection_style_id {connection_style_id}, name {name}, font_id {font_id}, font_set {font_set}, line_id {line_id}, line_set {line_set}, head_id {head_id}, head_set {head_set}')
-        pathRev = self._getPathRev()
-        (rowPathRev, sqlWhere) = self._getRowPathRevAndSQLWhere('connectionStyles', connection_style_id)
-        newName, newDMetaName0, newDMetaName1, newFontId, newLineId, newHeadId = None, None, None, None, None, None
-        newValues = [None] * len(self.columnNames['connectionStyles'])
-        newIdxs = []
-        if name != None:
-            (dMetaName0, dMetaName1) = self.getDMetaNames(name)
-            newValues[2], newValues[3], newValues[4] = f'{name}', f'{dMetaName0}', f'{dMetaName1}'
-            newIdxs += [2,3,4]
-        if font_id != None:
-            #change the font_id if different
-            newValues[5] = font_id
-            newIdxs.append(5)
-        elif font_set != None and font_set.count(None) < len(font_set):
-            #the font_set exists and there is not a font_id
-            # see if the font_set exists, if it does get the fontId, if it doesn't create a new font and get the id
-            fontId = self._getSubTableRowId('fonts', font_set)
-            newValues[5] = fontId
-            newIdxs.append(5)
-        if line_id != None:
-            newValues[6] = line_id
-            newIdxs.append(6)
-        elif line_set != None and line_set.count(None) < len(line_set):
-            lineId = self._getSubTableRowId('lines', line_set)
-            newValues[6] = lineId
-            newIdxs.append(6)
-        if head_id != None:
-            newValues[7] = head_id
-            newIdxs.append(7)
-        elif head_set != None and head_set.count(None) < len(head_set):
-            headId = self._getSubTableRowId('heads', head_set)
-            newValues[7] = headId
-            newIdxs.append(7)
-
-        if show: print('  newValues', newValues, ', newIdxs', newIdxs)
-        if len(newIdxs) == 0:
-            # this method was called, but no changes were asked for
-            return
-        
-        if rowPathRev == pathRev:
-            if show: print('  rowPathRev == pathRev, updating data:')
-            colValPairs = [ (self.columnNames['connectionStyles'][x], newValues[x]) for x in newIdxs ]
-            self._editRow('connectionStyles', colValPairs, sqlWhere)
-        else:
-            if show: print('  rowPathRev != pathRev, create a new row')
-            # get the data for the existing row which was not specified in the arguments of this method
-            oldIdxs = []
-            for i in range(1, len(self.columnNames['connectionStyles']) - 1):
-                if newValues[i] == None:
-                    oldIdxs.append(i)
-            sql = f"SELECT {', '.join([self.columnNames['connectionStyles'][x] for x in oldIdxs])} FROM connectionStyles {sqlWhere}"
-            if show: print('    sql:', sql)
-            cursor = self.dbCursor.execute(sql)
-            oldRowData = cursor.fetchone()
-            if show: print('    oldRowData:', oldRowData, ', oldIdxs', oldIdxs)
-
-            # mark the old row not valid for latest
-            sql = f'UPDATE connectionStyles set {self.columnNames["connectionStyles"][-1]} = 0 {sqlWhere}'
-            self.dbCursor.execute(sql)
-
-            # combine the old and new data and write a new row
-            for (oldIdx, oldRowDatum) in zip(oldIdxs, oldRowData):
-                newValues[oldIdx] = oldRowDatum
-            self.dbCursor.execute(self.sqlAdds['connectionStyles'], (connection_style_id, pathRev) + tuple(newValues[2:-1]) + (1,))
+        with self.batch():
+            pathRev = self._getPathRev()
+            (rowPathRev, sqlWhere) = self._getRowPathRevAndSQLWhere('connectionStyles', connection_style_id)
+            newName, newDMetaName0, newDMetaName1, newFontId, newLineId, newHeadId = None, None, None, None, None, None
+            newValues = [None] * len(self.columnNames['connectionStyles'])
+            newIdxs = []
+            if name != None:
+                (dMetaName0, dMetaName1) = self.getDMetaNames(name)
+                newValues[2], newValues[3], newValues[4] = f'{name}', f'{dMetaName0}', f'{dMetaName1}'
+                newIdxs += [2,3,4]
+            if font_id != None:
+                #change the font_id if different
+                newValues[5] = font_id
+                newIdxs.append(5)
+            elif font_set != None and font_set.count(None) < len(font_set):
+                #the font_set exists and there is not a font_id
+                # see if the font_set exists, if it does get the fontId, if it doesn't create a new font and get the id
+                fontId = self._getSubTableRowId('fonts', font_set)
+                newValues[5] = fontId
+                newIdxs.append(5)
+            if line_id != None:
+                newValues[6] = line_id
+                newIdxs.append(6)
+            elif line_set != None and line_set.count(None) < len(line_set):
+                lineId = self._getSubTableRowId('lines', line_set)
+                newValues[6] = lineId
+                newIdxs.append(6)
+            if head_id != None:
+                newValues[7] = head_id
+                newIdxs.append(7)
+            elif head_set != None and head_set.count(None) < len(head_set):
+                headId = self._getSubTableRowId('heads', head_set)
+                newValues[7] = headId
+                newIdxs.append(7)
+
+            if show: print('  newValues', newValues, ', newIdxs', newIdxs)
+            if len(newIdxs) == 0:
+                # this method was called, but no changes were asked for
+                return
+
+            if rowPathRev == pathRev:
+                if show: print('  rowPathRev == pathRev, updating data:')
+                colValPairs = [ (self.columnNames['connectionStyles'][x], newValues[x]) for x in newIdxs ]
+                self._editRow('connectionStyles', colValPairs, sqlWhere, (connection_style_id,))
+            else:
+                if show: print('  rowPathRev != pathRev, create a new row')
+                # get the data for the existing row which was not specified in the arguments of this method
+                oldIdxs = []
+                for i in range(1, len(self.columnNames['connectionStyles']) - 1):
+                    if newValues[i] == None:
+                        oldIdxs.append(i)
+                sql = f"SELECT {', '.join([self.columnNames['connectionStyles'][x] for x in oldIdxs])} FROM connectionStyles {sqlWhere}"
+                if show: print('    sql:', sql)
+                cursor = self.dbCursor.execute(sql, (connection_style_id,))
+                oldRowData = cursor.fetchone()
+                if show: print('    oldRowData:', oldRowData, ', oldIdxs', oldIdxs)
+
+                # mark the old row not valid for latest
+                self.dbCursor.execute(self.sqlInvalidates['connectionStyles'], (connection_style_id,))
+
+                # combine the old and new data and write a new row
+                for (oldIdx, oldRowDatum) in zip(oldIdxs, oldRowData):
+                    newValues[oldIdx] = oldRowDatum
+                self.dbCursor.execute(self.sqlAdds['connectionStyles'], (connection_style_id, pathRev) + tuple(newValues[2:-1]) + (1,))
+            self._logChanges('connectionStyles', (connection_style_id,), pathRev, 'edit')
 
     def addConnectionStyle(self, style_name, font_id = None, font_set = None, line_id = None, line_set = None, head_id = None, head_set = None):
         '''
@@ -751,53 +1398,85 @@ class CategorizerData(CategorizerLanguage):
         '''
         show = False
         if show: print(f'in addConnectionStyle() with style_name {style_name}, font_id {font_id}, font_set {font_set}, line_id {line_id}, line_set {line_set}, head_id {head_id}, head_set {head_set}')
-        pathRev = self._getPathRev()
-        cursor = self.dbCursor.execute(f'SELECT MAX({self.columnNames["connectionStyles"][0]}) FROM connectionStyles')
-        (connectionStyleId,) = cursor.fetchone()
-        connectionStyleId += 1
-        if show: print('  connectionStyleId {connectionStyleId}, pathRev {pathRev}')
-
-        # if we do not have a font_id, and we have other font info, create a new font
-        if font_id == None:
-            fontId = self._getSubTableRowId('fonts', font_set)
-        else:
-            fontId = font_id
-        if line_id == None:
-            lineId = self._getSubTableRowId('lines', line_set)
-        else:
-            lineId = line_id
-        if head_id == None:
-            headId = self._getSubTableRowId('heads', head_set)
-        else:
-            headId = head_id
-            
-        (dMetaName0, dMetaName1) = self.getDMetaNames(style_name)
-        self.dbCursor.execute(self.sqlAdds['connectionStyles'], (connectionStyleId, pathRev, style_name, dMetaName0, dMetaName1, fontId, lineId, headId, 1))
-        self.db.commit()
-        return connectionStyleId
+        with self.batch():
+            pathRev = self._getPathRev()
+            connectionStyleId = self._getNextId('connectionStyles')
+            if show: print('  connectionStyleId {connectionStyleId}, pathRev {pathRev}')
+
+            # if we do not have a font_id, and we have other font info, create a new font
+            if font_id == None:
+                fontId = self._getSubTableRowId('fonts', font_set)
+            else:
+                fontId = font_id
+            if line_id == None:
+                lineId = self._getSubTableRowId('lines', line_set)
+            else:
+                lineId = line_id
+            if head_id == None:
+                headId = self._getSubTableRowId('heads', head_set)
+            else:
+                headId = head_id
+
+            (dMetaName0, dMetaName1) = self.getDMetaNames(style_name)
+            self.dbCursor.execute(self.sqlAdds['connectionStyles'], (connectionStyleId, pathRev, style_name, dMetaName0, dMetaName1, fontId, lineId, headId, 1))
+            self._logChanges('connectionStyles', (connectionStyleId,), pathRev, 'add')
+            return connectionStyleId
+
+    def _loadSubTableRowIds(self):
+        '''
+        read the data of the latest rows of the subTableNames into subTableRowIds.
+        When more than one row has the same data, the last one is used, like _getSubTableRowId() always did.
+        '''
+        show = False
+        self.subTableRowIds = {}
+        for tableName in self.subTableNames:
+            rowIds = {}
+            try:
+                cursor = self.dbCursor.execute(f'{self.sqlDumps[tableName]} WHERE {self.columnNames[tableName][-1]} == 1')
+            except sqlite3.OperationalError:
+                # the table has not been created yet
+                cursor = ()
+            for row in cursor:
+                data = row[2:-1]
+                # a None never matches in SQL, so a row with one is never reused
+                if None not in data:
+                    rowIds[data] = row[0]
+            self.subTableRowIds[tableName] = rowIds
+            if show: print(f'in _loadSubTableRowIds() {len(rowIds)} {tableName}')
 
     def _getSubTableRowId(self, sub_table_name, data_set):
+        '''
+        return the rowId of the row of sub_table_name with the data in data_set, e.g. a FontSet, adding the row if there is none.
+        The rowIds are looked up in subTableRowIds, the database is only read for rows another connection may have added.
+        '''
         show = False
         if show: print(f'in _getSubTableRowId() with sub_table_name {sub_table_name}, data_set {data_set}')
-        data = data_set[0:]
-        if data_set and data.count(None) < len(data):
-            # see if we have an exact match already in the fonts table
-            colValPairs = []
-            for colName, datum in zip(self.columnNames[sub_table_name][2:2+len(data)], data):
-                colValPairs.append( (colName, datum) )
-            rowIds = self._getMatchingRowIds(sub_table_name, colValPairs)
-            if rowIds:
-                if show: print('    found an exact match for the data_set')
-                # found an exact match, use that fontId
-                rowId = rowIds[-1]
-            else:
-                # create a new row for the data_set
-                if show: print('   did not find a match for the data, creating a new row for the data_set')
-                rowId = self._addSubTableRow(sub_table_name, data_set)
+        if not data_set or data_set.count(None) == len(data_set):
+            return 0
+        if self.subTableRowIds == None:
+            self._loadSubTableRowIds()
+        rowIds = self.subTableRowIds[sub_table_name]
+        data = tuple(data_set)
+        rowId = rowIds.get(data)
+        if rowId != None:
+            if show: print('    found an exact match for the data_set')
+            return rowId
+        # see if we have an exact match already in the table, e.g. added by another connection
+        colValPairs = []
+        for colName, datum in zip(self.columnNames[sub_table_name][2:2+len(data)], data):
+            colValPairs.append( (colName, datum) )
+        matchingRowIds = self._getMatchingRowIds(sub_table_name, colValPairs)
+        if matchingRowIds:
+            if show: print('    found an exact match for the data_set in the table')
+            rowId = matchingRowIds[-1]
         else:
-            rowId = 0
+            # create a new row for the data_set
+            if show: print('   did not find a match for the data, creating a new row for the data_set')
+            rowId = self._addSubTableRow(sub_table_name, data_set)
+        if None not in data:
+            rowIds[data] = rowId
         return rowId
-        
+
     def _addSubTableRow(self, sub_table_name, data_set):
         '''
         add a row to a subTable, e.g. fonts, lines, heads
@@ -805,17 +1484,17 @@ class CategorizerData(CategorizerLanguage):
         show = False
         if show: print(f'in _addSubTableRow() with data_set {data_set}')
 
-        pathRev = self._getPathRev()
+        with self.batch():
+            pathRev = self._getPathRev()
 
-        # get the next rowId
-        cursor = self.dbCursor.execute(f'SELECT MAX({self.columnNames[sub_table_name][0]}) FROM {sub_table_name}')
-        (rowId,) = cursor.fetchone()
-        rowId += 1
-        if show: print(f'  rowId {rowId}, pathRev {pathRev}')
-        self.dbCursor.execute(self.sqlAdds[sub_table_name], (rowId, pathRev) + data_set[0:] + (1,) )
-        if show:
-            print('    added new line:', (rowId, pathRev, data_set[0:], 1))
-        return rowId
+            # get the next rowId
+            rowId = self._getNextId(sub_table_name)
+            if show: print(f'  rowId {rowId}, pathRev {pathRev}')
+            self.dbCursor.execute(self.sqlAdds[sub_table_name], (rowId, pathRev) + data_set[0:] + (1,) )
+            self._logChanges(sub_table_name, (rowId,), pathRev, 'add')
+            if show:
+                print('    added new line:', (rowId, pathRev, data_set[0:], 1))
+            return rowId
 
     def findCategoryIds(self, name, only_latest = True):
         '''
@@ -827,138 +1506,228 @@ class CategorizerData(CategorizerLanguage):
         if show: print(f'in findCategoryIds() with name {name}, and only_latest {only_latest}')
         skipBlanks = True
         dMetaNames = self.getDMetaNames(name, skipBlanks)
-        dMetaNamesStr = '("' + '", "'.join(dMetaNames) + '")'
-        if show: print('  dMetaNames', dMetaNames, ', dMetaNamesStr', dMetaNamesStr)
-
-        # find the matches in categories, then find the categories catVarIds in catVariants
-        catIds = []
-        sqlBegin = f"SELECT {self.columnNames['categories'][0]} FROM categories WHERE "
-        sqlEnd = f" IN {dMetaNamesStr}"
-        if only_latest:
-            sqlEnd += f' AND {self.columnNames["categories"][-1]} = 1'
-        for sqlMid in (self.columnNames['categories'][3], self.columnNames['categories'][4]):
-            if show: print('  sql:', sqlBegin + sqlMid + sqlEnd)
-            cursor = self.dbCursor.execute(sqlBegin + sqlMid + sqlEnd)
-            catIds += cursor.fetchall()
-        catIds = [catIds[x][0] for x in range(len(catIds))]
+        if show: print('  dMetaNames', dMetaNames)
+
+        # the matches on dMetaName0, then the matches on dMetaName1, in one statement
+        (catIdName, validName) = (self.columnNames['categories'][0], self.columnNames['categories'][-1])
+        sqlCodes = f"IN ({', '.join(['?'] * len(dMetaNames))})"
+        sqlLatest = f' AND {validName} = 1' if only_latest else ''
+        sql = ' UNION ALL '.join([f'SELECT {catIdName} FROM categories WHERE {columnName} {sqlCodes}{sqlLatest}' for columnName in self._getDMetaColumnNames('categories')])
+        if show: print('  sql:', sql)
+        with self._readConnection() as connection:
+            catIds = [row[0] for row in connection.execute(sql, dMetaNames * 2).fetchall()]
         if len(catIds) == 0:
             catIds = (0,)
         return tuple(catIds)
 
+    def _getDMetaColumnNames(self, table_name):
+        '''
+        returns the names of the dMetaName0 and dMetaName1 columns of a table in nameColumns
+        '''
+        nameColumn = self.nameColumns[table_name]
+        return self.columnNames[table_name][nameColumn + 1:nameColumn + 3]
+
     def findCatVariantIds(self, name, only_latest = True):
         '''
         Based on the sound of the name, search the categories and catVariants for matches.  
         If the name is found in the categories, get the catId and find all the catVariants which have the catId and record the catVarId.
         If the name is found in the catVariants, get the catId and find all the catVariants which have the catId and record the catVarId.
         if only_latest is False, skip any catVarIds which do not exist with a latest flag.
-        return a tuple of catVarIds
+        return a tuple of catVarIds:
+          the catVariants which match on dMetaName0, then the ones which match on dMetaName1,
+          then all the catVariants of the categories of those catVariants and of the categories which match.
         '''
         show = False
         if show: print(f'in findCatVariantIds() with name {name}, only_latest {only_latest}')
-        dMetaNames = self.getDMetaNames(name)
-        if dMetaNames[1] == '':
-            dMetaNames = (dMetaNames[0],)
-        dMetaNamesStr = '("' + '", "'.join(dMetaNames) + '")'
-        if show: print(f'  dMetaNames {dMetaNames}, dMetaNamesStr {dMetaNamesStr}')
-
-        catVarIds = []
-        catVarIdsCatIds = []
-        # find the catVarId and catId for matches in catVariants
-        sqlBegin = f'SELECT {self.columnNames["catVariants"][0]} {self.columnNames["catVariants"][2]} FROM catVariants WHERE '
-        sqlEnd = f' IN {dMetaNamesStr}'
-        if only_latest:
-            sqlEnd += f' AND {self.columnNames["catVariants"][-1]} = 1'
-        for sqlMid in (self.columnNames['catVariants'][4], self.columnNames['catVariants'][5]):
-            if show: print('  sql:', sqlBegin + sqlMid + sqlEnd)
-            cursor = self.dbCursor.execute(sqlBegin + sqlMid + sqlEnd)
-            catVarIdsCatIds += cursor.fetchall()
-        catVarIds = [catVarIdsCatIds[x][0] for x in range(len(catVarIdsCatIds))]
-        catIdsA = [catVarIdsCatIds[x][1] for x in range(len(catVarIdsCatIds))]
-        if show: print('  catVariant catVarIds', catVarIds, ', catIdsA', catIdsA)
-
-        # find the matches in categories, then find the categories catVarIds in catVariants
-        catIds = tuple(catIdsA) + self.findCategoryIds(name, only_latest)
-        catIdsStr = str(catIds)
-        if len(catIds) == 1:
-            # get rid of the trailing comma because
-            catIdsStr = catIdsStr[0:len(catIdsStr)-2] + ')'
-        if show: print(f'  categories catIdsStr {catIdsStr}')
-
-        # find the categories catVarIds in catVariants
-        sql = f'SELECT {self.columnNames["catVariants"][0]} FROM catVariants WHERE {self.columnNames["catVariants"][2]} IN {catIdsStr}'
-        if only_latest:
-            sql += f' AND {self.columnNames["catVariants"][-1]} = 1'
-        if show: print(f'  find categories catVarIds in catVariants sql: {sql}')
-        cursor = self.dbCursor.execute(sql)
-        tmpRowIds = cursor.fetchall()
-        catVarIds += [tmpRowIds[x][0] for x in range(len(tmpRowIds))]
+        skipBlanks = True
+        dMetaNames = self.getDMetaNames(name, skipBlanks)
+        if show: print(f'  dMetaNames {dMetaNames}')
+
+        # one statement, so one trip through sqlite, e.g. for dMetaNames ('HRS',) and only_latest:
+        #   SELECT catVarId FROM catVariants WHERE dMetaName0 IN (?) AND validForLatest = 1
+        #   UNION ALL SELECT catVarId FROM catVariants WHERE dMetaName1 IN (?) AND validForLatest = 1
+        #   UNION ALL SELECT catVarId FROM catVariants WHERE catId IN (
+        #     SELECT catId FROM catVariants WHERE (dMetaName0 IN (?) OR dMetaName1 IN (?)) AND validForLatest = 1
+        #     UNION SELECT catId FROM categories WHERE (dMetaName0 IN (?) OR dMetaName1 IN (?)) AND validForLatest = 1
+        #   ) AND validForLatest = 1
+        # UNION ALL returns the rows of each SELECT in turn, and each SELECT returns its rows in the order of the index it
+        # searches, which is the order the separate statements used to return them in.  An ORDER BY would cost a sort.
+        (catVarIdName, pathRevName, catIdName) = self.columnNames['catVariants'][0:3]
+        validName = self.columnNames['catVariants'][-1]
+        sqlCodes = f"IN ({', '.join(['?'] * len(dMetaNames))})"
+        sqlLatest = f' AND {validName} = 1' if only_latest else ''
+        sqlMatches = []
+        for tableName in ('catVariants', 'categories'):
+            (dMetaName0, dMetaName1) = self._getDMetaColumnNames(tableName)
+            sqlMatches.append(f'SELECT {catIdName} FROM {tableName} WHERE ({dMetaName0} {sqlCodes} OR {dMetaName1} {sqlCodes}){sqlLatest}')
+        sqlParts = [f'SELECT {catVarIdName} FROM catVariants WHERE {columnName} {sqlCodes}{sqlLatest}' for columnName in self._getDMetaColumnNames('catVariants')]
+        sqlParts.append(f'SELECT {catVarIdName} FROM catVariants WHERE {catIdName} IN ({" UNION ".join(sqlMatches)}){sqlLatest}')
+        sql = ' UNION ALL '.join(sqlParts)
+        if show: print(f'  sql: {sql}')
+        with self._readConnection() as connection:
+            catVarIds = [row[0] for row in connection.execute(sql, dMetaNames * 6).fetchall()]
         if show: print(f'  categories and catVariant catVarIds {catVarIds}')
         if len(catVarIds) == 0:
             catVarIds = (0,)
         return tuple(catVarIds)
 
+    def findByText(self, text, limit = 10, only_latest = True):
+        '''
+        Search the names of the categories, catVariants, relations and relVariants for names which have text in them,
+        or which share many of the three letter sequences of text, so misspelled names are found too.  Case is ignored.
+        Text shorter than three letters only finds the names which have it in them.
+        if only_latest is True, only search the names which are valid for latest, else also the names of older versions.
+        Needs the text index, see __init__().
+        returns a tuple of up to limit (tableName, rowId, name), best match first.
+        '''
+        show = False
+        if show: print(f'in findByText() with text {text}, limit {limit}, only_latest {only_latest}')
+        assert self.hasTextIndex, 'findByText() needs the text index, make the CategorizerData with text_index = True'
+        if text == None or text == '':
+            return tuple()
+        sqlLatest = ' AND nameTextRows.validForLatest = 1' if only_latest else ''
+        if len(text) < 3:
+            # too short for any three letter sequence, so look at every name
+            sqlMatch = "nameTexts.name LIKE ? ESCAPE '\\'"
+            sqlRank = 'length(nameTexts.name)'
+            match = '%' + text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        else:
+            # a name with all of the sequences of text in it has text in it, and the FTS5 rank puts it first
+            sqlMatch = 'nameTexts MATCH ?'
+            sqlRank = 'nameTexts.rank'
+            trigrams = OrderedDict.fromkeys([text[idx:idx + 3].lower() for idx in range(len(text) - 2)])
+            match = ' OR '.join(['"' + trigram.replace('"', '""') + '"' for trigram in trigrams])
+        # an older version of a row can have the same name as another version, so only keep its best match
+        sql = f'SELECT tableName, rowId, name FROM (' \
+              f'SELECT nameTextRows.tableName, nameTextRows.rowId, nameTexts.name, {sqlRank} AS textRank FROM nameTexts ' \
+              f'JOIN nameTextRows ON nameTextRows.textId = nameTexts.rowid WHERE {sqlMatch}{sqlLatest}) ' \
+              f'GROUP BY tableName, rowId, name ORDER BY MIN(textRank), name, tableName, rowId LIMIT ?'
+        if show: print(f'  sql: {sql}, match {match}')
+        with self._readConnection() as connection:
+            return tuple(connection.execute(sql, (match, limit)).fetchall())
+
+    def findAncestors(self, cat_node_id, rel_var_ids = None, max_depth = None, path_rev = None):
+        '''
+        returns a tuple of the superCatNodeIds above cat_node_id, nearest first, found with one recursive query in sqlite.
+        rel_var_ids limits the catConnections followed to those relation variants, None follows all of them.
+        max_depth limits how many levels up to go.
+        path_rev uses the catConnections as they were at that pathRev (see getGraphAtPathRev()), None uses the latest ones.
+        '''
+        (catNodeIdName, superCatNodeIdName) = self.columnNames['catConnections'][2:4]
+        return self._findConnectedCatNodeIds(cat_node_id, catNodeIdName, superCatNodeIdName, rel_var_ids, max_depth, path_rev)
+
+    def findDescendants(self, cat_node_id, rel_var_ids = None, max_depth = None, path_rev = None):
+        '''
+        returns a tuple of the catNodeIds below cat_node_id, nearest first.  The arguments are the same as findAncestors().
+        '''
+        (catNodeIdName, superCatNodeIdName) = self.columnNames['catConnections'][2:4]
+        return self._findConnectedCatNodeIds(cat_node_id, superCatNodeIdName, catNodeIdName, rel_var_ids, max_depth, path_rev)
+
+    def _findConnectedCatNodeIds(self, cat_node_id, from_column_name, to_column_name, rel_var_ids, max_depth, path_rev):
+        '''
+        walk the catConnections from from_column_name to to_column_name with a WITH RECURSIVE query, e.g. for findAncestors():
+          WITH RECURSIVE connected(catNodeId) AS (
+            SELECT ?
+            UNION
+            SELECT conns.superCatNodeId FROM connected JOIN catConnections AS conns ON conns.catNodeId == connected.catNodeId
+              WHERE conns.validForLatest == 1)
+          SELECT catNodeId FROM connected WHERE catNodeId != ?
+        UNION only drops a row which is the same as one already found, so each catNode is in connected once and is only
+        walked from once.  Without an ORDER BY sqlite walks the rows in the order they are found, breadth first, so they
+        are nearest first.
+        With a max_depth the rows are (catNodeId, depth), a catNode can be found again at each depth up to max_depth:
+          WITH RECURSIVE connected(catNodeId, depth) AS (
+            SELECT ?, 0
+            UNION
+            SELECT conns.superCatNodeId, connected.depth + 1 FROM connected JOIN catConnections AS conns ON conns.catNodeId == connected.catNodeId
+              WHERE conns.validForLatest == 1 AND connected.depth < ?)
+          SELECT catNodeId, MIN(depth) FROM connected WHERE catNodeId != ? GROUP BY catNodeId ORDER BY MIN(depth), catNodeId
+        '''
+        show = False
+        if show: print(f'in _findConnectedCatNodeIds() with cat_node_id {cat_node_id}, from {from_column_name}, to {to_column_name}, rel_var_ids {rel_var_ids}, max_depth {max_depth}, path_rev {path_rev}')
+        columnNames = self.columnNames['catConnections']
+        values = []
+        if path_rev == None:
+            conns = 'catConnections'
+            conditions = [f'conns.{columnNames[-1]} == 1']
+        else:
+            conns = f'({self.sqlSnapshots["catConnections"]})'
+            conditions = []
+            values.append(path_rev)
+        if rel_var_ids != None:
+            rel_var_ids = tuple(rel_var_ids)
+            conditions.append(f'conns.{columnNames[4]} IN ({", ".join(["?"] * len(rel_var_ids))})')
+            values += rel_var_ids
+        if max_depth != None:
+            conditions.append('connected.depth < ?')
+            values.append(max_depth)
+        sqlWhere = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+        if max_depth == None:
+            sql = (f'WITH RECURSIVE connected(catNodeId) AS ('
+                f'SELECT ? '
+                f'UNION '
+                f'SELECT conns.{to_column_name} FROM connected JOIN {conns} AS conns ON conns.{from_column_name} == connected.catNodeId '
+                f'{sqlWhere}) '
+                f'SELECT catNodeId FROM connected WHERE catNodeId != ?')
+        else:
+            sql = (f'WITH RECURSIVE connected(catNodeId, depth) AS ('
+                f'SELECT ?, 0 '
+                f'UNION '
+                f'SELECT conns.{to_column_name}, connected.depth + 1 FROM connected JOIN {conns} AS conns ON conns.{from_column_name} == connected.catNodeId '
+                f'{sqlWhere}) '
+                f'SELECT catNodeId, MIN(depth) FROM connected WHERE catNodeId != ? GROUP BY catNodeId ORDER BY MIN(depth), catNodeId')
+        values = [cat_node_id] + values + [cat_node_id]
+        if show: print(f'  sql: {sql}, values {values}')
+        with self._readConnection() as connection:
+            return tuple([row[0] for row in connection.execute(sql, values).fetchall()])
+
     def _getMatchingRowIds(self, table_name, col_val_pairs, only_valid_for_latest = True):
         show = False
         if show: print(f'in _getMatchingRowIds() with table_name {table_name}, col_val_pairs {col_val_pairs}, only_valid_for_latest {only_valid_for_latest}')
-        sqlWhere = ' WHERE '
-        for (colName, colVal) in col_val_pairs:
-            if type(colVal) == self.typeStr:
-                sqlWhere += f'{colName} == "{colVal}" AND '
-            else:
-                sqlWhere += f'{colName} ==  {colVal} AND '
+        conditions = [f'{colName} == ?' for (colName, colVal) in col_val_pairs]
+        values = tuple([colVal for (colName, colVal) in col_val_pairs])
         if only_valid_for_latest:
-            sqlWhere += 'validForLatest == 1'
-        else:
-            sqlWhere = sqlWhere[:-5]
-        if show: print('  sqlWhere', sqlWhere)
+            conditions.append(f'{self.columnNames[table_name][-1]} == 1')
+        sqlWhere = ' WHERE ' + ' AND '.join(conditions)
+        if show: print('  sqlWhere', sqlWhere, ', values', values)
         sql = f'SELECT {self.columnNames[table_name][0]} FROM {table_name} {sqlWhere}'
         if show: print(f'  sql: {sql}')
         try:
-            cursor = self.dbCursor.execute(sql)
+            cursor = self.dbCursor.execute(sql, values)
         except sqlite3.OperationalError as e:
             if show: print('  row not found, returning')
             return tuple()
 
-        rowIds = []
-        while True:
-            data = cursor.fetchone()
-            if data:
-                rowIds.append(data[0])
-            else:
-                break
-        return tuple(rowIds)
+        return tuple([row[0] for row in cursor.fetchall()])
 
     def _getRowPathRevAndSQLWhere(self, table_name, row_id):
         '''
         the 1st  column of all tables must be an id
         the 2nd  column of all tables must be pathRev
         the last column of all tables must be validForLatest
+        the returned sqlWhere has a ? for the row_id, so it must be executed with (row_id,)
         '''
         show = False
         if show: print(f'in _getRowPathRevAndSQLWhere() with table_name {table_name}, row_id {row_id}')
-        columnNames = self.columnNames[table_name]
-        sqlWhere = f' WHERE {columnNames[0]} == {row_id} AND {columnNames[-1]} == 1'
-#        sqlWhere = f' WHERE {columnNames[0]} = {row_id} AND {columnNames[-1]} = 1'
-        sql = f'SELECT {columnNames[1]} FROM {table_name} {sqlWhere}'
+        sqlWhere = self.sqlWheres[table_name]
+        sql = self.sqlGetRowPathRevs[table_name]
         if show: print(f'  sql: {sql}')
-        cursor = self.dbCursor.execute(sql)
+        cursor = self.dbCursor.execute(sql, (row_id,))
         (rowPathRev,) = cursor.fetchone()
         if show: print(f'  returning (rowPathRev {rowPathRev}, sqlWhere {sqlWhere})')
         return (rowPathRev, sqlWhere)
     
-    def _editRow(self, table_name, column_value_pairs, sql_where):
+    def _editRow(self, table_name, column_value_pairs, sql_where, where_values):
+        '''
+        where_values are the values for the ? in sql_where
+        '''
         show = False
-        if show: print(f'in _editRow() with table_name {table_name}, column_value_pairs {column_value_pairs}, sql_where {sql_where}')
-        sql = f'UPDATE {table_name} SET'
-        for (columnName, value) in column_value_pairs:
-            if type(value) == self.typeStr:
-                sql += f' {columnName} = "{value}",'
-            else:
-                sql += f' {columnName} = {value},'
-        sql = sql[:-1] + sql_where #get rid of the last comma and append the 'WHERE' statement
-#        sql = f'{", ".join( (column_value_pairs[x][0], column_value_pairs[x][1]) for x in range(len(column_value_pairs)))}'
-        if show: print('  updating row with sql = \"', sql, '\"')
-        self.dbCursor.execute(sql)
+        if show: print(f'in _editRow() with table_name {table_name}, column_value_pairs {column_value_pairs}, sql_where {sql_where}, where_values {where_values}')
+        sqlSet = ', '.join([f'{columnName} = ?' for (columnName, value) in column_value_pairs])
+        values = tuple([value for (columnName, value) in column_value_pairs]) + tuple(where_values)
+        sql = f'UPDATE {table_name} SET {sqlSet}{sql_where}'
+        if show: print('  updating row with sql = \"', sql, '\", values', values)
+        self.dbCursor.execute(sql, values)
 
 #    def moveCatNode(self, cat_node_id, dx = None, dy = None):
 #        '''
@@ -966,15 +1735,117 @@ class CategorizerData(CategorizerLanguage):
 #        '''
 #        pass
 
+    def getGraphAtPathRev(self, path_rev):
+        '''
+        returns the catNodes, catConnections, categories, relations, their variants and the styles as they were at path_rev.
+        The result is a dict of table name to a list of tuples in the same form as dumpTable(), with the latest version of each
+        row whose pathRev <= path_rev, ordered by id.
+        The validForLatest column is as it was at path_rev, so a row which has been changed since then is still 1.
+        '''
+        show = False
+        if show: print(f'in getGraphAtPathRev() with path_rev {path_rev}')
+        graph = {}
+        with self._readConnection() as connection:
+            for tableName in self.sqlSnapshots.keys():
+                graph[tableName] = connection.execute(self.sqlSnapshots[tableName], (path_rev,)).fetchall()
+        return graph
+
+    def getChangesSince(self, change_seq, limit = 1000):
+        '''
+        returns a list of up to limit (changeSeq, tableName, rowId, pathRev, operation) from the changeLog with changeSeq > change_seq,
+        in the order the changes were made.  operation is 'add' or 'edit'.
+        To follow the changes, start with change_seq 0 and pass the changeSeq of the last one returned to the next call.
+        A row may be in the list more than once, the latest version of it is the one to use.
+        '''
+        (changeSeqName, tableName, rowIdName, pathRevName, operationName) = self.columnNames['changeLog']
+        sql = f'{self.sqlDumps["changeLog"]} WHERE {changeSeqName} > ? ORDER BY {changeSeqName} LIMIT ?'
+        with self._readConnection() as connection:
+            return connection.execute(sql, (change_seq, limit)).fetchall()
+
+    def getLastChangeSeq(self):
+        '''
+        returns the changeSeq of the latest change, 0 if there are none
+        '''
+        with self._readConnection() as connection:
+            (changeSeq,) = connection.execute(f'SELECT MAX({self.columnNames["changeLog"][0]}) FROM changeLog').fetchone()
+        return changeSeq or 0
+
+    def getLatestRows(self, table_name, row_ids = None):
+        '''
+        returns a list of the latest version of the rows of table_name with row_ids, in the same form as dumpTable(), ordered by id.
+        Ids of rows which have no latest version are left out.  If row_ids is None, all the latest rows are returned.
+        '''
+        columnNames = self.columnNames[table_name]
+        sql = f'{self.sqlDumps[table_name]} WHERE {columnNames[-1]} == 1'
+        rows = []
+        with self._readConnection() as connection:
+            if row_ids == None:
+                return connection.execute(f'{sql} ORDER BY {columnNames[0]}').fetchall()
+            rowIds = sorted(set(row_ids))
+            # a few hundred at a time, sqlite limits the number of ? in a statement
+            for idx in range(0, len(rowIds), 500):
+                chunk = rowIds[idx:idx + 500]
+                rows += connection.execute(f'{sql} AND {columnNames[0]} IN ({", ".join(["?"] * len(chunk))}) ORDER BY {columnNames[0]}', chunk).fetchall()
+        return rows
+
     def dumpTable(self, table_name):
         '''
         returns all of the data in a table as a list of tuples
         '''
-        dataTuples = []
-        cursor = self.dbCursor.execute(self.sqlDumps[table_name])
-        dataTuples = cursor.fetchall()
+        with self._readConnection() as connection:
+            dataTuples = connection.execute(self.sqlDumps[table_name]).fetchall()
         return dataTuples
 
+    def iterTable(self, table_name, array_size = 1000, min_path_rev = None, max_path_rev = None, only_latest = False):
+        '''
+        a generator version of dumpTable(), it yields one tuple at a time and only holds array_size rows in memory.
+        min_path_rev and max_path_rev limit the rows to that range of pathRevs, inclusive.
+        if only_latest is True, only the rows which are valid for latest are returned.
+        The rows come from their own cursor, so other methods can be called while iterating.
+        With a reader pool the generator has a connection of its own until it is finished or closed, so a generator which
+        is not read to the end should be closed, e.g. with contextlib.closing().
+        '''
+        show = False
+        if show: print(f'in iterTable() with table_name {table_name}, array_size {array_size}, min_path_rev {min_path_rev}, max_path_rev {max_path_rev}, only_latest {only_latest}')
+        columnNames = self.columnNames[table_name]
+        conditions = []
+        values = []
+        if min_path_rev != None:
+            conditions.append(f'{columnNames[1]} >= ?')
+            values.append(min_path_rev)
+        if max_path_rev != None:
+            conditions.append(f'{columnNames[1]} <= ?')
+            values.append(max_path_rev)
+        if only_latest:
+            conditions.append(f'{columnNames[-1]} == 1')
+        sql = self.sqlDumps[table_name]
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        if show: print(f'  sql: {sql}, values {values}')
+        # not _readConnection(), the generator may be resumed or closed by another thread than the one which started it
+        if self.readers == None or (self.batchDepth > 0 and self.batchThreadId == threading.get_ident()):
+            reader = None
+            connection = self.db
+        else:
+            reader = self._getReader()
+            connection = reader
+        cursor = None
+        try:
+            cursor = connection.cursor()
+            cursor.arraysize = array_size
+            cursor.execute(sql, values)
+            while True:
+                dataTuples = cursor.fetchmany()
+                if not dataTuples:
+                    break
+                yield from dataTuples
+        finally:
+            # also when the generator is closed before its last row, which raises GeneratorExit at the yield
+            if cursor != None:
+                cursor.close()
+            if reader != None:
+                self.readers.put(reader)
+
     def _addTable(self, table_name):
         show = False
         if show: print(f'in _addTable() with table_name {table_name}')
@@ -985,16 +1856,83 @@ class CategorizerData(CategorizerLanguage):
             print('sqlAdds', self.sqlAdds[table_name])
             print('tableInits', self.tableInits[table_name])
         self.dbCursor.execute(self.sqlAdds[table_name], self.tableInits[table_name])
+        self._addIndexes(table_name)
         self.db.commit()
 
+    def _addIndexes(self, table_name, file_column_names = None):
+        '''
+        add the indexes in indexSpecs for one table.
+        if file_column_names is given, only add the indexes whose columns are all in it.
+        '''
+        show = False
+        if show: print(f'in _addIndexes() with table_name {table_name}, file_column_names {file_column_names}')
+        for (indexColumnNames, sql) in self.sqlIndexes[table_name]:
+            if file_column_names != None and not set(indexColumnNames).issubset(file_column_names):
+                if show: print(f'  skipping index on {indexColumnNames}')
+                continue
+            if show: print(f'  sql: {sql}')
+            self.dbCursor.execute(sql)
+
+    def _addTextIndex(self):
+        '''
+        add the text index to the database, with the names of all the versions of the rows already in it
+        '''
+        show = False
+        with self.batch():
+            for sql in self.textIndexSqls:
+                self.dbCursor.execute(sql)
+            self.hasTextIndex = True
+            for tableName in self.nameColumns.keys():
+                rows = self.dbCursor.execute(self.sqlDumps[tableName]).fetchall()
+                if show: print(f'in _addTextIndex() adding the names of {len(rows)} {tableName} rows')
+                self._addNameTexts(tableName, rows)
+
+    def _addNameTexts(self, table_name, rows):
+        '''
+        add the names of new rows, as tuples in the same form as dumpTable(), to the text index.  Rows without a name are skipped.
+        '''
+        if not self.hasTextIndex:
+            return
+        nameColumn = self.nameColumns[table_name]
+        for row in rows:
+            if row[nameColumn] == None:
+                continue
+            cursor = self.dbCursor.execute('INSERT INTO nameTextRows (tableName, rowId, pathRev, validForLatest) VALUES (?, ?, ?, ?)', (table_name, row[0], row[1], row[-1]))
+            self.dbCursor.execute('INSERT INTO nameTexts (rowid, name) VALUES (?, ?)', (cursor.lastrowid, row[nameColumn]))
+
+    def _editNameText(self, table_name, row_id, path_rev, name):
+        '''
+        the name of row_id was changed in path_rev.  If the name in the text index is from the same pathRev it is replaced,
+        else it is kept for the older version of the row and the new name is added.
+        '''
+        if not self.hasTextIndex:
+            return
+        cursor = self.dbCursor.execute('SELECT textId, pathRev FROM nameTextRows WHERE tableName = ? AND rowId = ? AND validForLatest = 1', (table_name, row_id))
+        textIdPathRev = cursor.fetchone()
+        if textIdPathRev != None:
+            (textId, rowPathRev) = textIdPathRev
+            if rowPathRev != path_rev:
+                self.dbCursor.execute('UPDATE nameTextRows SET validForLatest = 0 WHERE textId = ?', (textId,))
+            elif name == None:
+                self.dbCursor.execute('DELETE FROM nameTexts WHERE rowid = ?', (textId,))
+                self.dbCursor.execute('DELETE FROM nameTextRows WHERE textId = ?', (textId,))
+                return
+            else:
+                self.dbCursor.execute('UPDATE nameTexts SET name = ? WHERE rowid = ?', (name, textId))
+                return
+        if name != None:
+            nameColumn = self.nameColumns[table_name]
+            row = (row_id, path_rev) + (None,) * (nameColumn - 2) + (name, 1)
+            self._addNameTexts(table_name, (row,))
+
     def _closePathRev(self):
         show = False
         if show: print('in _closePathRev()')
-        sql = f'SELECT MAX({self.columnNames["pathRevs"][0]}) FROM pathRevs'
-        cursor = self.dbCursor.execute(sql)
-        (maxPathRev, ) = cursor.fetchone()
-        sql = f'UPDATE pathRevs SET {self.columnNames["pathRevs"][-1]} = 0 WHERE {self.columnNames["pathRevs"][0]} = {maxPathRev}'
-        self.dbCursor.execute(sql)
+        with self._lockHeld():
+            (maxPathRev, openForChange) = self._getPathRevState()
+            sql = f'UPDATE pathRevs SET {self.columnNames["pathRevs"][-1]} = 0 WHERE {self.columnNames["pathRevs"][0]} = ?'
+            self.dbCursor.execute(sql, (maxPathRev,))
+            self.pathRevState = (maxPathRev, 0)
         
     def addNote(self, note):
         '''
@@ -1002,10 +1940,9 @@ class CategorizerData(CategorizerLanguage):
         add new notes to the database
         '''
         show = True
-        self.lock.acquire()
-
-        # close the pathRev
-        self._closePathRev()
+        with self.batch():
+            # close the pathRev
+            self._closePathRev()
         
 #        # add the table if necessary
 #        try:
@@ -1032,7 +1969,6 @@ class CategorizerData(CategorizerLanguage):
 #        #for addition in additions:
 #        self.dbCursor.executemany(sqlAdd, additions)
 #        self.db.commit()
-        self.lock.release()
         return True
 
     def modifyNotes(self, table_name, notes):
@@ -1041,31 +1977,29 @@ class CategorizerData(CategorizerLanguage):
         modify existing notes already in the database
         not implemented
         '''
-        self.lock.acquire()
-
-        # add the table if necessary
-        try:
-            self.dbCursor.execute(f'select MAX(id) FROM {table_name}')
-        except sqlite3.OperationalError:
-            self.addTable(table_name)
-
-        # modify data in the table
-        changes = []
-        sqlChange = 'UPDATE ' + table_name + ' SET noteText = ?, date = ?, owner = ?'
-        for i in range(len(notes)):
-            (noteText, date, owner) = notes[i]
+        with self._lockHeld():
+            # add the table if necessary
             try:
-                addition.append(
-                    str(noteText),
-                    str(date),
-                    str(owner),
-                )
-            except:
-                print('  ERROR in add note for note', notes[i])
-        if show: print('  making changes to the database')
-        self.dbCursor.executemany(sqlChange, additions)
-        self.db.commit()
-        self.lock.release()
+                self.dbCursor.execute(f'select MAX(id) FROM {table_name}')
+            except sqlite3.OperationalError:
+                self.addTable(table_name)
+
+            # modify data in the table
+            changes = []
+            sqlChange = 'UPDATE ' + table_name + ' SET noteText = ?, date = ?, owner = ?'
+            for i in range(len(notes)):
+                (noteText, date, owner) = notes[i]
+                try:
+                    addition.append(
+                        str(noteText),
+                        str(date),
+                        str(owner),
+                    )
+                except:
+                    print('  ERROR in add note for note', notes[i])
+            if show: print('  making changes to the database')
+            self.dbCursor.executemany(sqlChange, additions)
+            self.db.commit()
         return True
         
     def getNote(self, table_name, row_id):
@@ -1073,8 +2007,13 @@ class CategorizerData(CategorizerLanguage):
         not implemented
         '''
         show = False
-        cursor = self.dbCursor.execute('SELECT noteText, date, owner FROM ' + table_name + ' WHERE id == ' + str(row_id))
-        (noteText, date, owner) = cursor.fetchone()
+        # the name is put in the SQL, it must not be able to change the statement
+        if not table_name.isidentifier():
+            print(f'ERROR getNote() with table_name {table_name!r}')
+            assert False
+        with self._readConnection() as connection:
+            cursor = connection.execute('SELECT noteText, date, owner FROM ' + table_name + ' WHERE id == ?', (row_id,))
+            (noteText, date, owner) = cursor.fetchone()
         if show: print('  for row', row_id, 'got', (noteText, date, owner))
         return (noteText, date, owner)
     
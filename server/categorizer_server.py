@@ -0,0 +1,227 @@
+#!/usr/bin/python3
+'''
+history:
+10/18/26 - created.  One process owns the CategorizerData writer and the app processes call it over a socket,
+           instead of each of them opening the SQLite file and contending on its locks.
+
+usage, from the directory above server/ so the data package can be imported:
+  python3 -m server.categorizer_server database.db [--create] [--host 127.0.0.1] [--port 8765] [--unix path]
+'''
+
+import asyncio
+import json
+import argparse
+import multiprocessing
+from collections import OrderedDict
+from data.sqlite3_db import AmbiguousNameException
+from data.async_categorizer_data import AsyncCategorizerData
+
+class CategorizerServer:
+    '''
+    Serves the public methods of a CategorizerData over a local TCP or Unix socket with JSON lines.  Each request is one line
+      {"id": 7, "method": "addCatNode", "args": [], "kwargs": {"cat_var_name": "Horse"}}
+    and gets one reply line with the same id
+      {"id": 7, "result": 4}   or   {"id": 7, "error": "AssertionError: ..."}
+    Tuples in the results come back as lists.
+
+    Requests are pipelined: a client may send many before reading the replies, and the replies are sent as each call
+    finishes, so they may come back in a different order than the requests.  Up to max_in_flight requests of a connection
+    run at once, after that the server stops reading it until some of them finish.
+
+    Changes (the changeMethodNames) are group committed.  The changes which arrive while a group is being
+    committed make up the next group, of up to max_group_size calls, which is run in one CategorizerData.batch().
+    If any call in a group fails, the batch is rolled back and the calls of the group are run again one at a time,
+    so only the failing call gets an error.
+
+    The results of the readMethodNames calls are cached, up to read_cache_size of them, until the next change.
+    The server must be the only writer to the database for the cache to be right.
+
+    Only the changeMethodNames, readMethodNames and otherMethodNames are served, a request for any other method, e.g.
+    close() or modifyNotes(), gets an AttributeError.
+    '''
+    # the methods which write to the database and can run inside a batch()
+    changeMethodNames = ('addCatNode', 'addCatNodes', 'addConnection', 'addConnections', 'editCatNode', 'editConnection',
+                         'editCategory', 'editCatVariant', 'addNodeStyle', 'editNodeStyle', 'addConnectionStyle',
+                         'editConnectionStyle', 'addNote')
+    # the AsyncCategorizerData.readMethodNames, except getNote() which is not implemented yet
+    readMethodNames = ('findCategoryIds', 'findCatVariantIds', 'findByText', 'findAncestors', 'findDescendants', 'dumpTable',
+                       'getGraphAtPathRev', 'getChangesSince', 'getLastChangeSeq', 'getLatestRows')
+    # reads which are not cached, they do not read the graph
+    otherMethodNames = ('getDMetaNames', 'getDMetaNamesBulk', 'getDMetaCacheStats')
+
+    def __init__(self, database_path_and_file_name, lock, max_group_size = 100, max_in_flight = 100, read_cache_size = 1000, **async_categorizer_data_args):
+        '''
+        async_categorizer_data_args are passed on to AsyncCategorizerData, and from it to CategorizerData
+        '''
+        self.db = AsyncCategorizerData(database_path_and_file_name, lock, **async_categorizer_data_args)
+        self.maxGroupSize = max_group_size
+        self.maxInFlight = max_in_flight
+        self.readCacheSize = read_cache_size
+        # json of (methodName, args, kwargs) -> result, least recently used first
+        self.readCache = OrderedDict()
+        # counts the groups of changes committed, so a read which started before a change does not put its result in the cache
+        self.changeCount = 0
+        # (methodName, args, kwargs, future) of the changes waiting for the next group
+        self.pendingChanges = []
+        self.committer = None
+        self.server = None
+        self.connections = set()
+
+    async def start(self, host = '127.0.0.1', port = 0, unix_path = None):
+        '''
+        start listening on unix_path if it is given, else on host and port.  port 0 picks a free port.
+        returns the address listened on, unix_path or (host, port)
+        '''
+        # a line can hold a large addCatNodes() or getGraphAtPathRev() reply
+        limit = 2 ** 26
+        if unix_path != None:
+            self.server = await asyncio.start_unix_server(self._serveConnection, path = unix_path, limit = limit)
+            return unix_path
+        self.server = await asyncio.start_server(self._serveConnection, host = host, port = port, limit = limit)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def serveForever(self):
+        await self.server.serve_forever()
+
+    async def close(self):
+        '''
+        stop listening, close the connections, then finish the calls already made and close the CategorizerData
+        '''
+        if self.server != None:
+            self.server.close()
+            for writer in list(self.connections):
+                writer.close()
+            await self.server.wait_closed()
+        if self.committer != None:
+            await self.committer
+        await self.db.close()
+
+    async def _serveConnection(self, reader, writer):
+        show = False
+        self.connections.add(writer)
+        inFlight = asyncio.Semaphore(self.maxInFlight)
+        # only one reply at a time waits for the socket to drain
+        writeLock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                await inFlight.acquire()
+                line = await reader.readline()
+                if not line:
+                    break
+                if show: print(f'in CategorizerServer._serveConnection() got {line}')
+                task = asyncio.ensure_future(self._handleRequest(line, writer, writeLock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                task.add_done_callback(lambda task: inFlight.release())
+            if tasks:
+                await asyncio.gather(*tasks)
+        except (ConnectionError, ValueError):
+            # the client went away, or sent a line longer than the limit
+            pass
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+
+    async def _handleRequest(self, line, writer, write_lock):
+        requestId = None
+        try:
+            request = json.loads(line)
+            requestId = request.get('id')
+            reply = {'id': requestId, 'result': await self.call(request['method'], request.get('args', []), request.get('kwargs', {}))}
+        except (Exception, AmbiguousNameException) as e:
+            reply = {'id': requestId, 'error': f'{type(e).__name__}: {e}'}
+        if writer.is_closing():
+            return
+        writer.write(json.dumps(reply).encode() + b'\n')
+        async with write_lock:
+            await writer.drain()
+
+    async def call(self, method_name, args = (), kwargs = {}):
+        '''
+        run the CategorizerData method method_name the way a request for it is run, and return its result
+        '''
+        if method_name in self.changeMethodNames:
+            return await self._change(method_name, args, kwargs)
+        if method_name in self.otherMethodNames:
+            return await getattr(self.db, method_name)(*args, **kwargs)
+        if method_name not in self.readMethodNames:
+            raise AttributeError(f'CategorizerServer does not serve {method_name}()')
+        key = json.dumps( (method_name, args, kwargs), sort_keys = True)
+        if key in self.readCache:
+            self.readCache.move_to_end(key)
+            return self.readCache[key]
+        changeCount = self.changeCount
+        result = await getattr(self.db, method_name)(*args, **kwargs)
+        if changeCount == self.changeCount and self.readCacheSize > 0:
+            self.readCache[key] = result
+            if len(self.readCache) > self.readCacheSize:
+                self.readCache.popitem(last = False)
+        return result
+
+    async def _change(self, method_name, args, kwargs):
+        future = asyncio.get_running_loop().create_future()
+        self.pendingChanges.append( (method_name, args, kwargs, future) )
+        if self.committer == None or self.committer.done():
+            self.committer = asyncio.ensure_future(self._commitChanges())
+        return await future
+
+    async def _commitChanges(self):
+        '''
+        commit the pendingChanges a group at a time until there are none left
+        '''
+        show = False
+        while self.pendingChanges:
+            group = self.pendingChanges[:self.maxGroupSize]
+            del self.pendingChanges[:self.maxGroupSize]
+            if show: print(f'in CategorizerServer._commitChanges() with a group of {len(group)}')
+            try:
+                results = await self.db.runBatch(self._runGroup, [change[:3] for change in group])
+                for (change, result) in zip(group, results):
+                    self._setResult(change[3], result)
+            except (Exception, AmbiguousNameException) as e:
+                if len(group) == 1:
+                    self._setResult(group[0][3], exception = e)
+                else:
+                    # the group was rolled back, find which calls failed
+                    for (methodName, args, kwargs, future) in group:
+                        try:
+                            self._setResult(future, await getattr(self.db, methodName)(*args, **kwargs))
+                        except (Exception, AmbiguousNameException) as e:
+                            self._setResult(future, exception = e)
+            finally:
+                self.changeCount += 1
+                self.readCache.clear()
+
+    def _setResult(self, future, result = None, exception = None):
+        # the caller may have been cancelled, e.g. its connection closed
+        if future.done():
+            return
+        if exception != None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+    def _runGroup(self, categorizer_data, changes):
+        '''
+        runs on the writer thread inside a batch()
+        '''
+        return [getattr(categorizer_data, methodName)(*args, **kwargs) for (methodName, args, kwargs) in changes]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog = 'python3 -m server.categorizer_server', description = 'serve a CategorizerData database')
+    parser.add_argument('path', help = 'the database file')
+    parser.add_argument('--host', default = '127.0.0.1')
+    parser.add_argument('--port', type = int, default = 8765)
+    parser.add_argument('--unix', help = 'listen on this Unix socket instead of host and port')
+    parser.add_argument('--create', action = 'store_true', help = 'make a new database')
+    options = parser.parse_args()
+
+    async def serve():
+        server = CategorizerServer(options.path, multiprocessing.Lock(), create_new_database = options.create)
+        print('listening on', await server.start(options.host, options.port, options.unix))
+        try:
+            await server.serveForever()
+        finally:
+            await server.close()
+    asyncio.run(serve())
@@ -0,0 +1,76 @@
+'''
+history
+10/18/26 - created, covers AsyncCategorizerData: awaited calls, finds shared by concurrent callers, and back pressure when the queue is full
+'''
+import unittest
+import asyncio
+import multiprocessing
+import threading
+from context import AsyncCategorizerData
+from test_utils import TestUtils
+
+class AsyncCategorizerDataTest(unittest.IsolatedAsyncioTestCase, TestUtils):
+    lock = multiprocessing.Lock()
+
+    def setUp(self):
+        self.setUpTest('async_test.db')
+        self.db = AsyncCategorizerData(self.path, self.lock, reader_threads = 2, max_pending = 4, create_new_database = True)
+
+    async def asyncTearDown(self):
+        await self.db.close()
+
+
+    async def test_00_calls(self):
+        db = self.db
+        (farm, horse) = await asyncio.gather(db.addCatNode(cat_var_name = 'Farm'), db.addCatNode(cat_var_name = 'Horse'))
+        self.assertEqual({1, 2}, {farm, horse})
+        await db.addConnection(horse, farm, rel_var_name = 'lives-on')
+        self.assertEqual((farm,), await db.findAncestors(horse))
+        self.assertEqual((horse,), await db.findCatVariantIds('Horse'))
+        self.assertEqual(3, len(await db.dumpTable('catNodes')))
+
+        def addAnimals(categorizerData, names):
+            return categorizerData.addCatNodes([(None, name) for name in names])
+        self.assertEqual([3, 4], await db.runBatch(addAnimals, ('Pig', 'Dog')))
+        with self.assertRaises(AttributeError):
+            db.iterTable('catNodes')
+        with self.assertRaises(AssertionError):
+            await db.addCatNode()
+
+    async def test_01_sharedFinds(self):
+        db = self.db
+        await db.addCatNode(cat_var_name = 'Horse')
+        findCount = [0]
+        findCatVariantIds = db.db.findCatVariantIds
+        def countedFindCatVariantIds(*args, **kwargs):
+            findCount[0] += 1
+            return findCatVariantIds(*args, **kwargs)
+        db.db.findCatVariantIds = countedFindCatVariantIds
+
+        results = await asyncio.gather(*[db.findCatVariantIds('horse') for x in range(10)], db.findCatVariantIds('pig'))
+        self.assertEqual([(1,)] * 10 + [(0,)], results)
+        self.assertEqual(2, findCount[0])
+
+        # a find which starts after a change sees it
+        pending = asyncio.ensure_future(db.findCatVariantIds('pig'))
+        await db.addCatNode(cat_var_name = 'Pig')
+        self.assertEqual((2,), await db.findCatVariantIds('pig'))
+        await pending
+
+    async def test_02_backpressure(self):
+        db = self.db
+        release = threading.Event()
+        def waitForRelease(categorizerData):
+            release.wait()
+        blocker = asyncio.ensure_future(db.runBatch(waitForRelease))
+        adds = [asyncio.ensure_future(db.addCatNode(cat_var_name = f'Horse {idx}')) for idx in range(8)]
+        await asyncio.sleep(0.1)
+        # the writer is busy, so max_pending calls wait in the queue and the rest wait to get into it
+        self.assertEqual(4, db.writeQueue.qsize())
+        self.assertFalse(any([add.done() for add in adds]))
+        release.set()
+        await blocker
+        self.assertEqual(list(range(1, 9)), sorted(await asyncio.gather(*adds)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+'''
+history
+10/18/26 - created, covers CategorizerServer over tcp and unix sockets: pipelined calls, group commit, the read cache, and refusing names it does not serve
+'''
+import unittest
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import threading
+from context import CategorizerServer
+from test_utils import TestUtils
+
+class LoopbackClient:
+    '''
+    stands in for an app process, it pipelines requests to a CategorizerServer and matches the replies to them by id
+    '''
+    ids = itertools.count(1)
+
+    async def connect(self, address):
+        if isinstance(address, str):
+            (self.reader, self.writer) = await asyncio.open_unix_connection(address)
+        else:
+            (self.reader, self.writer) = await asyncio.open_connection(*address)
+        self.replies = {}
+        self.replyReader = asyncio.ensure_future(self._readReplies())
+        return self
+
+    async def _readReplies(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                return
+            reply = json.loads(line)
+            self.replies.pop(reply['id']).set_result(reply)
+
+    async def call(self, method_name, *args, **kwargs):
+        reply = await self.send(method_name, *args, **kwargs)
+        if 'error' in reply:
+            raise RuntimeError(reply['error'])
+        return reply['result']
+
+    async def send(self, method_name, *args, **kwargs):
+        requestId = next(self.ids)
+        self.replies[requestId] = asyncio.get_running_loop().create_future()
+        self.writer.write(json.dumps({'id': requestId, 'method': method_name, 'args': args, 'kwargs': kwargs}).encode() + b'\n')
+        return await self.replies[requestId]
+
+    async def close(self):
+        self.writer.close()
+        await self.replyReader
+
+class CategorizerServerTest(unittest.IsolatedAsyncioTestCase, TestUtils):
+    lock = multiprocessing.Lock()
+
+    async def asyncSetUp(self):
+        self.setUpTest('server_test.db')
+        self.server = CategorizerServer(self.path, self.lock, create_new_database = True)
+        self.address = await self.server.start()
+        self.clients = [await LoopbackClient().connect(self.address) for x in range(3)]
+
+    async def asyncTearDown(self):
+        for client in self.clients:
+            await client.close()
+        await self.server.close()
+
+    async def test_00_calls(self):
+        (client, otherClient) = self.clients[:2]
+        (farm, horse) = await client.call('addCatNodes', ((None, 'Farm'), (None, 'Horse')))
+        await client.call('addConnection', horse, farm, rel_var_name = 'lives-on')
+        self.assertEqual([farm], await otherClient.call('findAncestors', horse))
+        self.assertEqual([horse], await otherClient.call('findCatVariantIds', 'Horse'))
+        self.assertEqual(3, len(await otherClient.call('dumpTable', 'catNodes')))
+        self.assertEqual(['HRS', ''], await client.call('getDMetaNames', 'Horse'))
+        self.assertEqual(3, len((await client.call('getGraphAtPathRev', 1))['catNodes']))
+        for (methodName, expError) in (('addCatNode', 'AssertionError'), ('iterTable', 'AttributeError'), ('_commit', 'AttributeError')):
+            reply = await client.send(methodName)
+            self.assertTrue(reply['error'].startswith(expError), reply['error'])
+
+    async def test_01_groupCommit(self):
+        db = self.server.db
+        release = threading.Event()
+        def waitForRelease(categorizerData):
+            release.wait()
+        blocker = asyncio.ensure_future(db.runBatch(waitForRelease))
+        await asyncio.sleep(0.05)
+        # the first change is put in a group of its own, then while the writer is busy the changes from all the clients
+        # collect into the next group, one of which fails
+        first = asyncio.ensure_future(self.clients[1].call('addCatNode', cat_var_name = 'First'))
+        await asyncio.sleep(0.05)
+        adds = []
+        for (clientIdx, client) in enumerate(self.clients):
+            adds += [asyncio.ensure_future(client.send('addCatNode', cat_var_name = f'Horse {clientIdx} {idx}')) for idx in range(5)]
+        adds.append(asyncio.ensure_future(self.clients[0].send('addCatNode')))
+        await asyncio.sleep(0.05)
+        self.assertEqual(16, len(self.server.pendingChanges))
+        release.set()
+        await blocker
+        self.assertEqual(1, await first)
+        replies = await asyncio.gather(*adds)
+        self.assertEqual(list(range(2, 17)), sorted([reply['result'] for reply in replies[:-1]]))
+        self.assertIn('AssertionError', replies[-1]['error'])
+        self.assertEqual(17, len(await self.clients[2].call('dumpTable', 'catNodes')))
+
+    async def test_02_readCache(self):
+        client = self.clients[0]
+        await client.call('addCatNode', cat_var_name = 'Horse')
+        self.assertEqual([1], await client.call('findCatVariantIds', 'horse'))
+        self.assertEqual([1], await self.clients[1].call('findCatVariantIds', 'horse'))
+        self.assertEqual(1, len(self.server.readCache))
+        # the cached result is sent back without calling the CategorizerData
+        findCatVariantIds = self.server.db.db.findCatVariantIds
+        self.server.db.db.findCatVariantIds = None
+        self.assertEqual([1], await client.call('findCatVariantIds', 'horse'))
+        self.server.db.db.findCatVariantIds = findCatVariantIds
+        # a change empties the cache
+        await client.call('editCategory', 1, 'Pony')
+        self.assertEqual(0, len(self.server.readCache))
+        self.assertEqual([0], await client.call('findCatVariantIds', 'horse'))
+
+    async def test_03_unixSocket(self):
+        server = CategorizerServer(os.path.join(self.tmpDir.name, 'unix_test.db'), self.lock, create_new_database = True)
+        address = await server.start(unix_path = os.path.join(self.tmpDir.name, 'server.sock'))
+        client = await LoopbackClient().connect(address)
+        # pipelined, all the requests are sent before any reply is read
+        replies = await asyncio.gather(*[client.send('addCatNode', cat_var_name = f'Horse {idx}') for idx in range(20)])
+        self.assertEqual(list(range(1, 21)), sorted([reply['result'] for reply in replies]))
+        await client.close()
+        await server.close()
+
+    async def test_04_onlyServedMethods(self):
+        client = self.clients[0]
+        # the methods of the AsyncCategorizerData itself, private ones, and the note methods which are not implemented yet
+        for methodName in ('close', 'runBatch', '_start', '_write', 'modifyNotes', 'getNote'):
+            reply = await asyncio.wait_for(client.send(methodName, 'notes', 1), 5)
+            self.assertTrue(reply['error'].startswith('AttributeError'), reply['error'])
+        # the database is still open
+        self.assertEqual(1, await asyncio.wait_for(client.call('addCatNode', cat_var_name = 'Horse'), 5))
+        self.assertEqual([1], await client.call('findCatVariantIds', 'horse'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+'''
+history
+10/18/26 - created, covers CategoryGraph: parents, children, ancestors, descendants, shortest paths and subtrees, and keeping up with edits
+'''
+import unittest
+import multiprocessing
+from context import CategorizerData, CategoryGraph
+from test_utils import TestUtils
+
+class CategoryGraphTest(unittest.TestCase, TestUtils):
+    lock = multiprocessing.Lock()
+
+    def setUp(self):
+        '''
+        catNodes: 1 Animal, 2 Mammal, 3 Horse, 4 Dog, 5 Farm, 6 Pony
+        Pony -is-a-> Horse -is-a-> Mammal -is-a-> Animal
+        Dog -is-a-> Mammal
+        Horse -lives-on-> Farm
+        '''
+        self.setUpTest()
+        self.db = CategorizerData(None, self.lock, in_memory = True, create_new_database = True)
+        self.db.addCatNodes([(None, name) for name in ('Animal', 'Mammal', 'Horse', 'Dog', 'Farm', 'Pony')])
+        self.db.addConnections((
+            (2, 1, None, 'is-a'),
+            (3, 2, None, 'is-a'),
+            (4, 2, None, 'is-a'),
+            (3, 5, None, 'lives-on'),
+            (6, 3, None, 'is-a'),
+        ))
+        self.isA = (1,)
+        self.graph = CategoryGraph(self.db)
+
+    def test_00_ancestorsAndDescendants(self):
+        self.assertEqual((2, 5), self.graph.findParents(3))
+        self.assertEqual((3, 4), self.graph.findChildren(2))
+        self.assertEqual((3, 2, 5, 1), self.graph.findAncestors(6))
+        self.assertEqual((3, 2, 1), self.graph.findAncestors(6, rel_var_ids = self.isA))
+        self.assertEqual((3, 2, 5), self.graph.findAncestors(6, max_depth = 2))
+        self.assertEqual((3,), self.graph.findAncestors(6, max_depth = 1))
+        self.assertEqual((2, 3, 4, 6), self.graph.findDescendants(1))
+        self.assertEqual((3, 6), self.graph.findDescendants(5))
+        self.assertEqual((), self.graph.findDescendants(6))
+
+    def test_01_shortestPathAndSubtree(self):
+        self.assertEqual((6, 3, 2, 1), self.graph.findShortestPath(6, 1, direction = 'up'))
+        self.assertEqual((), self.graph.findShortestPath(1, 6, direction = 'up'))
+        self.assertEqual((4, 2, 3, 6), self.graph.findShortestPath(4, 6))
+        self.assertEqual((5, 3), self.graph.findShortestPath(5, 3, direction = 'down'))
+        #catConnId, catNodeId, superCatNodeId, relVarId
+        self.assertEqual(((2, 3, 2, 1), (3, 4, 2, 1), (5, 6, 3, 1)), self.graph.getSubtree(2))
+
+    def test_02_followsChanges(self):
+        # Dog moves from Mammal to Farm, in the same pathRev and then in a new one
+        self.db.editConnection(3, super_cat_node_id = 5)
+        self.assertEqual((3, 4, 6), self.graph.findDescendants(5))
+        self.db.addNote('note 1')
+        self.db.editConnection(3, super_cat_node_id = 2, rel_var_name = 'lives-on')
+        self.assertEqual((3, 6), self.graph.findDescendants(5))
+        self.assertEqual((3, 6), self.graph.findDescendants(2, rel_var_ids = self.isA))
+        catConnId = self.db.addConnection(4, 6)
+        self.assertEqual((6,), self.graph.findParents(4, rel_var_ids = (0,)))
+
+        # a rolled back batch leaves the graph as it was
+        try:
+            with self.db.batch():
+                self.db.addConnection(1, 4)
+                self.assertEqual((4,), self.graph.findParents(1))
+                raise ValueError('undo the batch')
+        except ValueError:
+            pass
+        self.assertEqual((), self.graph.findParents(1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,3 +2,11 @@ import os
 import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from data.sqlite3_db import CategorizerData, CategorizerLanguage
+from data.category_graph import CategoryGraph
+from data.phonetic_search import PhoneticSearchIndex
+from data.async_categorizer_data import AsyncCategorizerData
+from server.categorizer_server import CategorizerServer
+from clients.graph_replica import GraphReplica
+from clients.backends import LocalBackend, SocketBackend
+from data.instrumentation import Instrumentation
+from data.slow_query_log import SlowQueryLog
@@ -0,0 +1,104 @@
+'''
+history
+10/18/26 - created, covers the changeLog rows written by the mutators, getChangesSince(), adding the table on upgrade, and rollback with the change
+'''
+import unittest
+import multiprocessing
+from context import CategorizerData
+from test_utils import TestUtils
+
+class DataStorageChangeLogTest(unittest.TestCase, TestUtils):
+    lock = multiprocessing.Lock()
+
+    def setUp(self):
+        self.setUpTest('change_log_test.db')
+
+
+    def getChanges(self, db, change_seq = 0):
+        return [change[1:] for change in db.getChangesSince(change_seq)]
+
+    def test_00_mutatorsLogChanges(self):
+        show = False
+        db = CategorizerData(self.path, self.lock, create_new_database = True)
+        self.assertEqual([], db.getChangesSince(0))
+        (farm, horse) = db.addCatNodes(((None, 'Farm'), (None, 'Horse')))
+        db.addConnection(horse, farm, rel_var_name = 'is-a')
+        db.addNote('note 1')
+        db.editCatNode(horse, dx = 10)
+        db.editCategory(2, 'Pony')
+        db.editCatVariant(1, 'Farms')
+        db.editConnection(1, rel_var_id = 0)
+        db.addNodeStyle('bold', font_set = ('Liberation Sans', 'Bold', 10, 'Black'))
+        db.editNodeStyle(1, background_color = 'Blue')
+        expChanges = [
+            #tableName, rowId, pathRev, operation
+            ('categories', 1, 1, 'add'), ('categories', 2, 1, 'add'),
+            ('catVariants', 1, 1, 'add'), ('catVariants', 2, 1, 'add'),
+            ('catNodes', 1, 1, 'add'), ('catNodes', 2, 1, 'add'),
+            ('relations', 1, 1, 'add'), ('relVariants', 1, 1, 'add'), ('catConnections', 1, 1, 'add'),
+            ('catNodes', 2, 2, 'edit'), ('categories', 2, 2, 'edit'), ('catVariants', 1, 2, 'edit'), ('catConnections', 1, 2, 'edit'),
+            ('fonts', 1, 2, 'add'), ('nodeStyles', 1, 2, 'add'), ('nodeStyles', 1, 2, 'edit'),
+        ]
+        self.compareTuples('changes', expChanges, self.getChanges(db), show)
+        changeSeqs = [change[0] for change in db.getChangesSince(0)]
+        self.assertEqual(list(range(1, len(expChanges) + 1)), changeSeqs)
+
+        # in batches
+        self.assertEqual(expChanges[:5], self.getChanges(db)[:5])
+        self.assertEqual(expChanges[5:10], [change[1:] for change in db.getChangesSince(5, limit = 5)])
+        self.assertEqual(expChanges[-1:], self.getChanges(db, len(expChanges) - 1))
+
+        # a rolled back batch leaves nothing in the changeLog
+        try:
+            with db.batch():
+                db.addCatNode(cat_var_name = 'Pig')
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertEqual([], db.getChangesSince(len(expChanges)))
+        db.addConnectionStyle('dotted', line_set = ('Dotted', 1, 'Black'))
+        self.assertEqual([('lines', 1, 2, 'add'), ('connectionStyles', 1, 2, 'add')], self.getChanges(db, len(expChanges)))
+        db.editConnectionStyle(1, head_id = 0)
+        self.assertEqual([('connectionStyles', 1, 2, 'edit')], self.getChanges(db, len(expChanges) + 2))
+
+    def test_01_readsOnlyTheChanges(self):
+        db = CategorizerData(self.path, self.lock, create_new_database = True)
+        db.addCatNodes([(None, f'Horse {idx}') for idx in range(100)])
+        cursor = db.dbCursor.execute(f'EXPLAIN QUERY PLAN {db.sqlDumps["changeLog"]} WHERE changeSeq > ? ORDER BY changeSeq LIMIT ?', (0, 10))
+        plan = ' '.join([row[-1] for row in cursor.fetchall()])
+        self.assertIn('INTEGER PRIMARY KEY', plan)
+        self.assertEqual(300, db.getChangesSince(0, limit = 1000)[-1][0])
+
+    def test_02_upgradeAddsChangeLog(self):
+        db = CategorizerData(self.path, self.lock, create_new_database = True)
+        db.addCatNode(cat_var_name = 'Horse')
+        # make the file look like it was made before there was a changeLog
+        db.dbCursor.execute('DROP TABLE changeLog')
+        db.dbCursor.execute('PRAGMA user_version = 2')
+        db.close()
+
+        db = CategorizerData(self.path, self.lock)
+        self.assertEqual([], db.getChangesSince(0))
+        db.addCatNode(cat_var_id = 1)
+        self.assertEqual([(1, 'catNodes', 2, 1, 'add')], db.getChangesSince(0))
+
+    def test_03_rolledBackWithTheChange(self):
+        db = CategorizerData(self.path, self.lock, create_new_database = True)
+        (farm, horse) = db.addCatNodes(((None, 'Farm'), (None, 'Horse')))
+        changeSeq = db.getLastChangeSeq()
+        catConnections = db.dumpTable('catConnections')
+        # the catConnection is written before its changeLog row, neither is kept when writing the changeLog fails
+        def failingLogChanges(table_name, row_ids, path_rev, operation):
+            raise ValueError('the changeLog could not be written')
+        db._logChanges = failingLogChanges
+        with self.assertRaises(ValueError):
+            db.addConnection(horse, farm)
+        del db._logChanges
+        self.assertEqual(catConnections, db.dumpTable('catConnections'))
+        self.assertEqual([], db.getChangesSince(changeSeq))
+        # the id of the rolled back catConnection is used again
+        self.assertEqual(1, db.addConnection(horse, farm))
+        self.assertEqual([('catConnections', 1, 1, 'add')], self.getChanges(db, changeSeq))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+'''
+history
+10/18/26 - created, covers the indexes made from CategorizerData.indexSpecs, adding them on upgrade, and that the finds use them
+'''
+import unittest
+import multiprocessing
+from context import CategorizerData
+from test_utils import TestUtils
+
+class DataStorageIndexTest(unittest.TestCase, TestUtils):
+    lock = multiprocessing.Lock()
+
+    def setUp(self):
+        self.setUpTest('index_test.db')
+
+
+    def getIndexNames(self, db):
+        cursor = db.dbCursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name NOT LIKE 'sqlite_autoindex_%'")
+        return sorted([row[0] for row in cursor.fetchall()])
+
+    def getExpIndexNames(self):
+        expIndexNames = []
+        for (tableName, indexSpecs) in CategorizerData.indexSpecs.items():
+            for indexSpec in indexSpecs:
+                expIndexNames.append(tableName + '_' + '_'.join([name.strip() for name in indexSpec.split(',')]))
+        return sorted(expIndexNames)
+
+    def test_00_createIndexes(self):
+        db = CategorizerData(self.path, self.lock, create_new_database = True)
+        self.assertEqual(self.getExpIndexNames(), self.getIndexNames(db))
+        (userVersion,) = db.dbCursor.execute('PRAGMA user_version').fetchone()
+        self.assertEqual(CategorizerData.schemaVersion, userVersion)
+
+    def test_01_upgradeAddsIndexes(self):
+        db = CategorizerData(self.path, self.lock, create_new_database = True)
+        db._addCategory('Horse')
+        # make the file look like it was made before there were indexes
+        for indexName in self.getIndexNames(db):
+            db.dbCursor.execute(f'DROP INDEX {indexName}')
+        db.dbCursor.execute('PRAGMA user_version = 0')
+        db.db.close()
+
+        db = CategorizerData(self.path, self.lock)
+        self.assertEqual(self.getExpIndexNames(), self.getIndexNames(db))
+        self.assertEqual((1,), db.findCategoryIds('horse'))
+
+    def test_02_findUsesIndex(self):
+        db = CategorizerData(self.path, self.lock, create_new_database = True)
+        cursor = db.dbCursor.execute('EXPLAIN QUERY PLAN SELECT catVarId FROM catVariants WHERE catId IN (1, 2) AND validForLatest = 1')
+        plan = ' '.join([row[-1] for row in cursor.fetchall()])
+        self.assertIn('catVariants_catId_validForLatest', plan)
+
+    def test_03_findInOneStatement(self):
+        db = CategorizerData(self.path, self.lock, create_new_database = True)
+        db.addCatNodes(((None, 'Horse'), (None, 'Pig'), (None, 'Hoarse')))
+        db._addCatVariant(2, 'Horsey')
+        statements = []
+        db.db.set_trace_callback(statements.append)
+        # the catVariants which sound like it, then all the catVariants of their categories and of the categories which sound like it
+        self.assertEqual((4, 1, 2, 4, 3), db.findCatVariantIds('horse'))
+        self.assertEqual((1, 3), db.findCategoryIds('horse'))
+        self.assertEqual((0,), db.findCatVariantIds('zebra'))
+        self.assertEqual((0,), db.findCategoryIds('zebra'))
+        self.assertEqual(4, len(statements))
+
+if __name__ == '__main__':
+    unittest.main()
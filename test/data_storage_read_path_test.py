@@ -0,0 +1,112 @@
+'''
+history
+10/18/26 - created, covers getGraphAtPathRev() snapshots, iterTable(), and findAncestors()/findDescendants() over many paths
+'''
+import unittest
+import multiprocessing
+import os
+from context import CategorizerData, CategoryGraph
+from test_utils import TestUtils
+
+class DataStorageReadPathTest(unittest.TestCase, TestUtils):
+    lock = multiprocessing.Lock()
+
+    def setUp(self):
+        '''
+        pathRev 1: Farm <-is-a- Horse
+        pathRev 2: Horse moved and renamed Pony, Pig added
+        pathRev 3: the connection now goes from Pig to Farm
+        '''
+        self.setUpTest('read_path_test.db')
+        db = CategorizerData(self.path, self.lock, create_new_database = True)
+        (farm, horse) = db.addCatNodes(((None, 'Farm'), (None, 'Horse', 10, 10)))
+        db.addConnection(horse, farm, rel_var_name = 'is-a')
+        db.addNote('note 1')
+        db.editCatNode(horse, dx = 20, dy = 30)
+        db.editCategory(2, 'Pony')
+        pig = db.addCatNode(cat_var_name = 'Pig')
+        db.addNote('note 2')
+        db.editConnection(1, cat_node_id = pig)
+        self.db = db
+
+
+    def test_00_getGraphAtPathRev(self):
+        show = False
+        expGraphs = {
+            1: {
+                #catNodeId, pathRev, catVarId, dx, dy, dz, nodeStyleId, validForLatest
+                'catNodes': [(0, 0, 0, None, None, None, 0, 0), (1, 1, 1, None, None, None, 0, 1), (2, 1, 2, 10, 10, None, 0, 1)],
+                #catConnId, pathRev, catNodeId, superCatNodeId, relVarId, connStyleId, validForLatest
+                'catConnections': [(0, 0, 0, 0, None, 0, 0), (1, 1, 2, 1, 1, 0, 1)],
+                #catId, pathRev, catName, dMetaName0, dMetaName1, validForLatest
+                'categories': [(0, 0, None, '', '', 0), (1, 1, 'Farm', 'FRM', '', 1), (2, 1, 'Horse', 'HRS', '', 1)],
+            },
+            2: {
+                'catNodes': [(0, 0, 0, None, None, None, 0, 0), (1, 1, 1, None, None, None, 0, 1), (2, 2, 2, 20, 30, None, 0, 1), (3, 2, 3, None, None, None, 0, 1)],
+                'catConnections': [(0, 0, 0, 0, None, 0, 0), (1, 1, 2, 1, 1, 0, 1)],
+                'categories': [(0, 0, None, '', '', 0), (1, 1, 'Farm', 'FRM', '', 1), (2, 2, 'Pony', 'PN', '', 1), (3, 2, 'Pig', 'PK', '', 1)],
+            },
+            3: {
+                'catConnections': [(0, 0, 0, 0, None, 0, 0), (1, 3, 3, 1, 1, 0, 1)],
+            },
+        }
+        for (pathRev, expTables) in expGraphs.items():
+            actGraph = self.db.getGraphAtPathRev(pathRev)
+            for (tableName, expRows) in expTables.items():
+                self.compareTuples(f'{tableName} at pathRev {pathRev}', expRows, actGraph[tableName], show)
+        self.assertEqual([(0, 1, 'default', 'TFLT', '', 0, 'White', 0, 1)], self.db.getGraphAtPathRev(1)['nodeStyles'])
+        # the version of each catNode at the pathRev is searched for in the primary key index
+        plan = [row[-1] for row in self.db.dbCursor.execute(f'EXPLAIN QUERY PLAN {self.db.sqlSnapshots["catNodes"]}', (1,)).fetchall()]
+        self.assertIn('SEARCH versions USING COVERING INDEX sqlite_autoindex_catNodes_1 (catNodeId=? AND pathRev<?)', plan)
+
+    def test_01_iterTable(self):
+        for tableName in ('catNodes', 'categories', 'catConnections', 'pathRevs'):
+            self.assertEqual(self.db.dumpTable(tableName), list(self.db.iterTable(tableName, array_size = 2)))
+        actCatNodes = list(self.db.iterTable('catNodes', min_path_rev = 1, max_path_rev = 1))
+        self.assertEqual([(1, 1, 1, None, None, None, 0, 1), (2, 1, 2, 10, 10, None, 0, 0)], actCatNodes)
+        actCatNodeIds = [row[0] for row in self.db.iterTable('catNodes', only_latest = True)]
+        self.assertEqual([1, 2, 3], actCatNodeIds)
+
+        # the database can be changed part way through iterating
+        expCategories = self.db.dumpTable('categories')
+        rows = self.db.iterTable('categories', array_size = 1)
+        actCategories = [next(rows)]
+        self.db.addCatNode(cat_var_name = 'Dog')
+        actCategories += list(rows)
+        self.assertEqual(expCategories, actCategories[:len(expCategories)])
+
+    def test_02_findAncestorsAndDescendants(self):
+        # catNodes: 1 Farm, 2 Pony, 3 Pig, 4 Dog, 5 Animal.  At pathRev 3, Pig -is-a-> Farm, at pathRev 1 and 2 it was Pony -is-a-> Farm
+        db = self.db
+        (dog, animal) = db.addCatNodes(((None, 'Dog'), (None, 'Animal')))
+        db.addConnections(( (1, animal, None, 'is-a'), (dog, 3, None, 'likes'), (animal, dog, None, 'likes') ))
+        # the 'likes' connections make a loop back to Pig
+        self.assertEqual((1, 5, 4), db.findAncestors(3))
+        self.assertEqual((1, 5), db.findAncestors(3, max_depth = 2))
+        self.assertEqual((1, 5), db.findAncestors(3, rel_var_ids = (1,)))
+        self.assertEqual((3, 4, 5), db.findDescendants(1))
+        self.assertEqual((1,), db.findAncestors(2, path_rev = 2))
+        self.assertEqual((), db.findAncestors(2))
+        self.assertEqual((2,), db.findDescendants(1, path_rev = 1))
+        self.assertEqual((), db.findDescendants(4, rel_var_ids = (1,)))
+
+    def test_03_manyPathsToTheSameCatNode(self):
+        # a chain where each catNode is-a the one before it and skips to the one before that, so there are more paths to
+        # each ancestor than there are catNodes
+        db = CategorizerData(os.path.join(self.tmpDir.name, 'chain.db'), self.lock, create_new_database = True)
+        catNodeIds = db.addCatNodes([(None, f'Level {idx}') for idx in range(1000)])
+        db.addConnections([(catNodeIds[idx], catNodeIds[idx - skip], None, 'is-a') for idx in range(1, 1000) for skip in (1, 2) if idx >= skip])
+        graph = CategoryGraph(db)
+        bottom = catNodeIds[-1]
+        ancestors = db.findAncestors(bottom)
+        self.assertEqual(catNodeIds[-2::-1], sorted(ancestors, reverse = True))
+        self.assertEqual(sorted(graph.findAncestors(bottom)), sorted(ancestors))
+        # nearest first, a catNode idx levels up is (idx + 1) // 2 connections away
+        depths = [(bottom - catNodeId + 1) // 2 for catNodeId in ancestors]
+        self.assertEqual(sorted(depths), depths)
+        self.assertEqual(sorted(graph.findDescendants(catNodeIds[0])), sorted(db.findDescendants(catNodeIds[0])))
+        self.assertEqual((bottom - 2, bottom - 1, bottom - 4, bottom - 3, bottom - 6, bottom - 5), db.findAncestors(bottom, max_depth = 3))
+        self.assertEqual(sorted(graph.findAncestors(bottom, max_depth = 3)), sorted(db.findAncestors(bottom, max_depth = 3)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+'''
+history
+10/18/26 - created, covers reads through the read only connections of the pool, reads inside a batch, parallel reads, and giving readers back
+'''
+import unittest
+import multiprocessing
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from context import CategorizerData
+from test_utils import TestUtils
+
+class DataStorageReaderPoolTest(unittest.TestCase, TestUtils):
+    lock = multiprocessing.Lock()
+
+    def setUp(self):
+        self.setUpTest('reader_pool_test.db')
+        self.db = CategorizerData(self.path, self.lock, create_new_database = True, reader_pool_size = 2)
+        (farm, horse, pig) = self.db.addCatNodes(((None, 'Farm'), (None, 'Horse'), (None, 'Pig')))
+        self.db.addConnections(((horse, farm, None, 'lives-on'), (pig, farm, None, 'lives-on')))
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_00_readsUseReaders(self):
+        db = self.db
+        statements = []
+        db.db.set_trace_callback(statements.append)
+        self.assertEqual((2,), db.findCatVariantIds('horse'))
+        self.assertEqual((2,), db.findCategoryIds('horse'))
+        self.assertEqual((2, 3), db.findDescendants(1))
+        self.assertEqual(4, len(db.dumpTable('catNodes')))
+        self.assertEqual(4, len(list(db.iterTable('categories'))))
+        self.assertEqual(4, len(db.getGraphAtPathRev(1)['catNodes']))
+        self.assertEqual([], statements)
+
+        reader = db.readers.get()
+        with self.assertRaises(sqlite3.OperationalError):
+            reader.execute('DELETE FROM catNodes')
+        db.readers.put(reader)
+
+    def test_01_readsInBatch(self):
+        db = self.db
+        with ThreadPoolExecutor(max_workers = 4) as executor:
+            with db.batch():
+                db.addCatNode(cat_var_name = 'Dog')
+                # the thread in the batch sees its own changes, the other threads only what was committed
+                self.assertEqual((4,), db.findCategoryIds('dog'))
+                self.assertEqual(5, len(db.dumpTable('catNodes')))
+                others = [executor.submit(db.findCategoryIds, 'dog') for x in range(8)]
+                self.assertEqual([(0,)] * 8, [other.result() for other in others])
+            others = [executor.submit(db.findCategoryIds, 'dog') for x in range(8)]
+            self.assertEqual([(4,)] * 8, [other.result() for other in others])
+
+    def test_02_parallelReads(self):
+        db = self.db
+        names = ('Farm', 'Horse', 'Pig') * 50
+        # more threads than readers, so they have to wait for each other
+        with ThreadPoolExecutor(max_workers = 6) as executor:
+            actCatVarIds = list(executor.map(db.findCatVariantIds, names))
+        self.assertEqual([(1,), (2,), (3,)] * 50, actCatVarIds)
+        self.assertEqual(2, db.readers.qsize())
+        actCatNodeIds = []
+        # the reads inside the loop use another reader than the one of iterTable()
+        for row in db.iterTable('catNodes', array_size = 1, only_latest = True):
+            actCatNodeIds.append( (row[0], db.findDescendants(row[0])) )
+        self.assertEqual([(1, (2, 3)), (2, ()), (3, ())], actCatNodeIds)
+        self.assertEqual(2, db.readers.qsize())
+
+    def test_03_unfinishedIterTable(self):
+        db = CategorizerData(self.path, self.lock, reader_pool_size = 2, reader_timeout = 0.1)
+        rows = [db.iterTable('catNodes') for x in range(2)]
+        self.assertEqual([(0, 0), (0, 0)], [next(generator)[:2] for generator in rows])
+        # both readers are held by the generators, the next read fails instead of waiting for ever
+        with self.assertRaises(AssertionError):
+            db.findCategoryIds('horse')
+        # a closed generator gives its reader back
+        rows[0].close()
+        self.assertEqual((2,), db.findCategoryIds('horse'))
+        self.assertEqual(1, db.readers.qsize())
+        rows[1].close()
+        db.close()
+
+    def test_04_textIndexWithReaders(self):
+        # the text index is added in __init__(), before the reader pool is made
+        db = CategorizerData(os.path.join(self.tmpDir.name, 'text_index.db'), self.lock, create_new_database = True, text_index = True, reader_pool_size = 1)
+        db.addCatNode(cat_var_name = 'Horse')
+        self.assertEqual(1, len(db.findByText('horse')))
+        db.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+'''
+history
+10/18/26 - created, covers findByText() over the optional text index, and that only the latest names are matched
+'''
+import unittest
+import multiprocessing
+from context import CategorizerData
+from test_utils import TestUtils
+
+class DataStorageTextIndexTest(unittest.TestCase, TestUtils):
+    lock = multiprocessing.Lock()
+
+    def setUp(self):
+        self.setUpTest('text_index_test.db')
+
+
+    def test_00_findByText(self):
+        db = CategorizerData(self.path, self.lock, create_new_database = True)
+        db.addCatNodes(((None, 'Elephant'), (None, 'Elephant Seal'), (None, 'Horse')))
+        # the names already in the database are added with the text index
+        db = CategorizerData(self.path, self.lock, text_index = True)
+        db._addCatVariant(3, 'Hippopotamus')
+        db.addConnection(1, 2, rel_var_name = 'is-related-to')
+        # misspelled
+        self.assertEqual((('categories', 1, 'Elephant'), ('categories', 2, 'Elephant Seal')), db.findByText('elefant'))
+        self.assertEqual((('categories', 1, 'Elephant'),), db.findByText('elefant', limit = 1))
+        # in the middle of the name
+        self.assertEqual((('catVariants', 4, 'Hippopotamus'),), db.findByText('POTAM'))
+        self.assertEqual((('catVariants', 4, 'Hippopotamus'),), db.findByText('ip'))
+        self.assertEqual((('relations', 1, 'is-related-to'),), db.findByText('related'))
+        self.assertEqual((), db.findByText('zebra'))
+
+        db = CategorizerData(self.path, self.lock, in_memory = True, create_new_database = True)
+        with self.assertRaises(AssertionError):
+            db.findByText('horse')
+
+    def test_01_onlyLatest(self):
+        db = CategorizerData(self.path, self.lock, create_new_database = True, text_index = True)
+        # the index is kept up to date by connections which did not ask for it
+        other = CategorizerData(self.path, self.lock)
+        other.addCatNode(cat_var_name = 'Horse')
+        db.editCategory(1, 'Horsey')
+        self.assertEqual((('categories', 1, 'Horsey'),), db.findByText('hors'))
+        other.addNote('note 1')
+        other.editCategory(1, 'Pony')
+        other.editCatVariant(1, 'Shetland pony')
+        self.assertEqual((), db.findByText('hors'))
+        self.assertEqual((('categories', 1, 'Horsey'),), db.findByText('hors', only_latest = False))
+        self.assertEqual((('categories', 1, 'Pony'), ('catVariants', 1, 'Shetland pony')), db.findByText('pony'))
+        # a rolled back batch takes its names out of the index too
+        try:
+            with db.batch():
+                db.addCatNodes(((None, 'Pony Cart'),))
+                self.assertEqual(3, len(db.findByText('pony')))
+                raise ValueError('undo the batch')
+        except ValueError:
+            pass
+        self.assertEqual(2, len(db.findByText('pony')))
+
+if __name__ == '__main__':
+    unittest.main()
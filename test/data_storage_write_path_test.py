@@ -0,0 +1,309 @@
+'''
+history
+10/18/26 - created, covers ids without MAX() queries, the cached pathRev, batch() and rollback, bulk adds, the name and dMeta caches, and the lock per thread
+'''
+import unittest
+import multiprocessing
+import os
+import threading
+from context import CategorizerData
+from test_utils import TestUtils
+
+class DataStorageWritePathTest(unittest.TestCase, TestUtils):
+    lock = multiprocessing.Lock()
+
+    def setUp(self):
+        self.setUpTest('write_path_test.db')
+
+
+    def traceSql(self, db):
+        statements = []
+        db.db.set_trace_callback(statements.append)
+        return statements
+
+    def test_00_idsWithoutMaxQueries(self):
+        db = CategorizerData(self.path, self.lock, create_new_database = True)
+        statements = self.traceSql(db)
+        catNodeIds = [db.addCatNode(cat_var_name = name) for name in ('Farm', 'Horse', 'Pig')]
+        self.assertEqual([1, 2, 3], catNodeIds)
+        self.assertEqual([], [sql for sql in statements if 'MAX(' in sql and 'pathRevs' not in sql])
+        # the other writers are looked for once per change, not once per id
+        del statements[:]
+        db.addCatNode(cat_var_name = 'Dog')
+        self.assertEqual(1, statements.count('PRAGMA data_version'))
+
+    def test_01_idsFromOtherWriter(self):
+        dbA = CategorizerData(self.path, self.lock, create_new_database = True)
+        dbB = CategorizerData(self.path, self.lock)
+        self.assertEqual(1, dbA.addCatNode(cat_var_name = 'Farm'))
+        self.assertEqual(2, dbB.addCatNode(cat_var_name = 'Horse'))
+        self.assertEqual(3, dbA.addCatNode(cat_var_name = 'Pig'))
+        actCatNodeIds = [row[0] for row in dbA.dumpTable('catNodes')]
+        self.assertEqual([0, 1, 2, 3], actCatNodeIds)
+
+    def test_02_cachedPathRev(self):
+        dbA = CategorizerData(self.path, self.lock, create_new_database = True)
+        dbB = CategorizerData(self.path, self.lock)
+        dbA.addCatNode(cat_var_name = 'Farm')
+        statements = self.traceSql(dbA)
+        dbA.addCatNode(cat_var_name = 'Horse')
+        self.assertEqual([], [sql for sql in statements if 'pathRevs' in sql])
+
+        # the pathRev is closed by another connection, so the next change must be in a new pathRev
+        dbB.addNote('note from B')
+        catNodeId = dbA.addCatNode(cat_var_name = 'Pig')
+        self.assertEqual((catNodeId, 2), dbA.dumpTable('catNodes')[-1][:2])
+
+        # after our own note, the change is also in a new pathRev
+        dbA.addNote('note from A')
+        catNodeId = dbA.addCatNode(cat_var_name = 'Dog')
+        self.assertEqual((catNodeId, 3), dbA.dumpTable('catNodes')[-1][:2])
+        self.assertEqual([(1, 0), (2, 0), (3, 1)], [(row[0], row[2]) for row in dbB.dumpTable('pathRevs')])
+
+    def test_03_batch(self):
+        db = CategorizerData(self.path, self.lock, create_new_database = True)
+        statements = self.traceSql(db)
+        with db.batch():
+            farmCatNodeId = db.addCatNode(cat_var_name = 'Farm')
+            for name in ('Horse', 'Pig', 'Dog'):
+                catNodeId = db.addCatNode(cat_var_name = name)
+                db.addConnection(catNodeId, farmCatNodeId, rel_var_name = 'is-a')
+        self.assertEqual(['BEGIN IMMEDIATE', 'COMMIT'], [sql for sql in statements if sql in ('BEGIN IMMEDIATE', 'COMMIT')])
+        self.assertEqual(5, len(db.dumpTable('catNodes')))
+        self.assertEqual(4, len(db.dumpTable('catConnections')))
+
+    def test_04_batchRollback(self):
+        db = CategorizerData(self.path, self.lock, create_new_database = True)
+        db.addCatNode(cat_var_name = 'Farm')
+        expCatNodes = db.dumpTable('catNodes')
+        expCategories = db.dumpTable('categories')
+        try:
+            with db.batch():
+                db.addCatNode(cat_var_name = 'Horse')
+                with db.batch():
+                    db.addCatNode(cat_var_name = 'Pig')
+                raise ValueError('undo the batch')
+        except ValueError:
+            pass
+        self.assertEqual(expCatNodes, db.dumpTable('catNodes'))
+        self.assertEqual(expCategories, db.dumpTable('categories'))
+        # the ids from the rolled back batch are used again and the lock was released
+        self.assertEqual(2, db.addCatNode(cat_var_name = 'Horse'))
+        self.assertTrue(self.lock.acquire(timeout = 1))
+        self.lock.release()
+
+    def test_05_bulkAdd(self):
+        show = False
+        db = CategorizerData(self.path, self.lock, create_new_database = True)
+        db._addRelation('hyper', 'is-a', 'out')
+        statements = self.traceSql(db)
+        catNodeIds = db.addCatNodes((
+            #cat_var_id, cat_var_name, dx, dy, dz, node_style_id
+            (None, 'Farm'),
+            (None, 'Horse', 10, 20),
+            (1, None),
+            (None, 'Horse', 30, 40, 50, 2),
+        ))
+        catConnIds = db.addConnections((
+            #cat_node_id, super_cat_node_id, rel_var_id, rel_var_name, conn_style_id
+            (2, 1, None, 'is-a'),
+            (4, 1, None, 'is-a'),
+            (3, 1, None, 'part-of', 1),
+            (4, 2),
+        ))
+        self.assertEqual([1, 2, 3, 4], catNodeIds)
+        self.assertEqual([1, 2, 3, 4], catConnIds)
+        self.assertEqual([], [sql for sql in statements if sql.startswith('SELECT') and 'pathRevs' not in sql and 'relVariants' not in sql and 'relations' not in sql])
+        expCategories = (
+            #catId, pathRev, catName, dMetaName0, dMetaName1, validForLatest
+            (0, 0, None, '', '', 0),
+            (1, 1, 'Farm', 'FRM', '', 1),
+            (2, 1, 'Horse', 'HRS', '', 1),
+            # like addCatNode(), each spec with a name makes its own category
+            (3, 1, 'Horse', 'HRS', '', 1),
+        )
+        expCatNodes = (
+            #catNodeId, pathRev, catVarId, dx, dy, dz, nodeStyleId, validForLatest
+            (0, 0, 0, None, None, None, 0, 0),
+            (1, 1, 1, None, None, None, 0, 1),
+            (2, 1, 2, 10, 20, None, 0, 1),
+            (3, 1, 1, None, None, None, 0, 1),
+            (4, 1, 3, 30, 40, 50, 2, 1),
+        )
+        expCatConns = (
+            #catConnId, pathRev, catNodeId, superCatNodeId, relVarId, connStyleId, validForLatest
+            (0, 0, 0, 0, None, 0, 0),
+            (1, 1, 2, 1, 1, 0, 1),
+            (2, 1, 4, 1, 1, 0, 1),
+            (3, 1, 3, 1, 2, 1, 1),
+            (4, 1, 4, 2, 0, 0, 1),
+        )
+        self.compareTuples('categories', expCategories, db.dumpTable('categories'), show)
+        self.compareTuples('catNodes', expCatNodes, db.dumpTable('catNodes'), show)
+        self.compareTuples('catConnections', expCatConns, db.dumpTable('catConnections'), show)
+
+    def test_06_quotedNames(self):
+        db = CategorizerData(self.path, self.lock, create_new_database = True)
+        db.addCatNode(cat_var_name = 'Horse')
+        db._addCatVariant(1, '"pony"')
+        db.editCategory(1, "Horse's")
+        db.addConnection(1, 1, rel_var_name = 'is "a"')
+        db.addConnection(1, 1, rel_var_name = 'is "a"')
+        db.addNodeStyle('quoted', font_set = CategorizerData.FontSet('"Sans"', 'Regular', 10, 'Black'))
+        db.addNodeStyle('quoted again', font_set = CategorizerData.FontSet('"Sans"', 'Regular', 10, 'Black'))
+        self.assertEqual("Horse's", db.dumpTable('categories')[-1][2])
+        self.assertEqual([1, 1], [row[4] for row in db.dumpTable('catConnections')[1:]])
+        self.assertEqual([1, 1], [row[5] for row in db.dumpTable('nodeStyles')[1:]])
+        self.assertEqual((1,), db.findCategoryIds("Horse's"))
+        # a match on the catVariant name finds the catVariant, then all the catVariants of its category
+        self.assertEqual((2, 1, 2), db.findCatVariantIds('"pony"'))
+
+    def test_07_connectionProfile(self):
+        writer = CategorizerData(self.path, self.lock, create_new_database = True)
+        (journalMode,) = writer.dbCursor.execute('PRAGMA journal_mode').fetchone()
+        self.assertEqual('wal', journalMode)
+        reader = CategorizerData(self.path, multiprocessing.Lock(), connection_profile = {'busy_timeout': 0})
+        (busyTimeout,) = reader.dbCursor.execute('PRAGMA busy_timeout').fetchone()
+        self.assertEqual(0, busyTimeout)
+        # the reader does not wait for the writer's transaction and sees what was committed before it
+        with writer.batch():
+            writer.addCatNode(cat_var_name = 'Horse')
+            self.assertEqual(1, len(reader.dumpTable('catNodes')))
+        self.assertEqual(2, len(reader.dumpTable('catNodes')))
+
+        legacy = CategorizerData(os.path.join(self.tmpDir.name, 'legacy.db'), self.lock, create_new_database = True, connection_profile = 'legacy')
+        (journalMode,) = legacy.dbCursor.execute('PRAGMA journal_mode').fetchone()
+        self.assertEqual('memory', journalMode)
+
+    def test_08_dMetaCache(self):
+        db = CategorizerData(self.path, self.lock, create_new_database = True, dmeta_cache_size = 2)
+        self.assertEqual(('TJ', 'TK'), db.getDMetaNames('doggie'))
+        self.assertEqual(('TJ', 'TK'), db.getDMetaNames('doggie'))
+        self.assertEqual(('HRS',), db.getDMetaNames('Horse', skip_blanks = True))
+        self.assertEqual({'doggie': ('TJ', 'TK'), 'Pig': ('PK', ''), None: ('', '')}, db.getDMetaNamesBulk(('doggie', 'Pig', 'Pig', None)))
+        # 'Horse' was the least recently used, so it was dropped to make room for 'Pig'
+        self.assertEqual(['doggie', 'Pig'], list(db.dMetaCache.keys()))
+        self.assertEqual({'hits': 2, 'misses': 3, 'size': 2, 'maxSize': 2}, db.getDMetaCacheStats())
+
+    def test_09_nameCaches(self):
+        dbA = CategorizerData(self.path, self.lock, create_new_database = True)
+        dbB = CategorizerData(self.path, self.lock)
+        (farm, horse) = dbA.addCatNodes(((None, 'Farm'), (None, 'Horse')))
+        dbA.addConnection(horse, farm, rel_var_name = 'lives-on')
+        self.assertEqual(2, dbA.getCatVarId('Horse'))
+        statements = self.traceSql(dbA)
+        for x in range(3):
+            dbA.addConnection(horse, farm, rel_var_name = 'lives-on')
+            self.assertEqual(2, dbA.getCatVarId('Horse'))
+        self.assertEqual([], [sql for sql in statements if sql.startswith('SELECT')])
+        self.assertEqual([1, 1, 1, 1], [row[4] for row in dbA.dumpTable('catConnections')[1:]])
+        # the cached names are found while another connection holds the lock
+        with dbB.batch():
+            self.assertEqual(2, dbA.getCatVarId('Horse'))
+            self.assertEqual(1, dbA._getRelVarId('lives-on'))
+            # a name which is not cached is looked up without the lock too
+            self.assertEqual(1, dbA.getCatVarId('Farm'))
+
+        # a variant with the name is found before the category or relation with it
+        dbA._addCatVariant(2, 'Horse')
+        self.assertEqual(3, dbA.getCatVarId('Horse'))
+        dbA._addRelVariant(1, rel_var_name = 'lives-on')
+        dbA.addConnection(horse, farm, rel_var_name = 'lives-on')
+        self.assertEqual(2, dbA.dumpTable('catConnections')[-1][4])
+
+        # another connection changes the names
+        dbB.editCatVariant(3, 'Pony')
+        self.assertEqual(2, dbA.getCatVarId('Horse'))
+        self.assertEqual(3, dbA.getCatVarId('Pony'))
+        self.assertEqual(0, dbA.getCatVarId('Pig'))
+
+        # the names added in a rolled back batch are forgotten
+        try:
+            with dbA.batch():
+                dbA.addConnection(horse, farm, rel_var_name = 'eats')
+                dbA._addCatVariant(1, 'Pig')
+                self.assertEqual(4, dbA.getCatVarId('Pig'))
+                raise ValueError('undo the batch')
+        except ValueError:
+            pass
+        self.assertEqual(0, dbA.getCatVarId('Pig'))
+        dbA.addConnection(horse, farm, rel_var_name = 'eats')
+        self.assertEqual([(1, 'lives-on'), (2, 'eats')], [(row[0], row[3]) for row in dbA.dumpTable('relations')[1:]])
+
+    def test_10_subTableRowIds(self):
+        dbA = CategorizerData(self.path, self.lock, create_new_database = True)
+        sansFont = CategorizerData.FontSet('Sans', 'Bold', 12, 'Blue')
+        dashedLine = CategorizerData.LineSet('Dashed', 1, 'Gray')
+        dbA.addNodeStyle('sans', font_set = sansFont)
+        dbB = CategorizerData(self.path, self.lock)
+        dbB.addConnectionStyle('dashed', line_set = dashedLine)
+        statements = self.traceSql(dbA)
+        for x in range(3):
+            dbA.addNodeStyle('sans', font_set = sansFont)
+            # the default font and head from the tableInits are found too
+            dbA.addConnectionStyle('plain', font_set = CategorizerData.FontSet('Liberation Sans', 'Regular', 10, 'Black'), head_set = CategorizerData.HeadSet('Filled', 4, 'Black'))
+        # dbA reloads its ids because dbB wrote, but does not look for the fonts, lines or heads
+        self.assertEqual([], [sql for sql in statements if sql.startswith('SELECT') and 'pathRevs' not in sql and 'MAX(' not in sql])
+        self.assertEqual([0, 1, 1, 1, 1], [row[5] for row in dbA.dumpTable('nodeStyles')])
+        # the connectionStyles rows are written as connStyleId, pathRev, styleName, dMetaName0, dMetaName1, fontId, lineId, headId, validForLatest
+        self.assertEqual([(0, 0), (0, 0), (0, 0)], [(row[5], row[7]) for row in dbA.dumpTable('connectionStyles')[2:]])
+
+        # dbB added the line after dbA read the lines, so dbA finds it in the table once
+        dbA.addConnectionStyle('dashed', line_set = dashedLine)
+        dbA.addConnectionStyle('dashed', line_set = dashedLine)
+        self.assertEqual([1, 1], [row[6] for row in dbA.dumpTable('connectionStyles')[-2:]])
+        self.assertEqual(2, len(dbA.dumpTable('lines')))
+
+        # the rows added in a rolled back batch are not reused
+        try:
+            with dbA.batch():
+                dbA.addNodeStyle('serif', font_set = CategorizerData.FontSet('Serif', 'Bold', 12, 'Blue'))
+                raise ValueError('undo the batch')
+        except ValueError:
+            pass
+        dbA.addNodeStyle('serif', font_set = CategorizerData.FontSet('Serif', 'Bold', 12, 'Blue'))
+        self.assertEqual([(0, 'Liberation Sans'), (1, 'Sans'), (2, 'Serif')], [row[0:3:2] for row in dbA.dumpTable('fonts')])
+
+    def test_11_idsFromConcurrentWriters(self):
+        CategorizerData(self.path, self.lock, create_new_database = True).close()
+        errors = []
+        def addCatNodes(prefix):
+            # each thread has its own CategorizerData on the same file, like the processes of the server do
+            db = CategorizerData(self.path, self.lock)
+            try:
+                for x in range(50):
+                    catNodeId = db.addCatNode(cat_var_name = f'{prefix} {x}')
+                    db.addConnection(catNodeId, catNodeId, rel_var_name = 'is-a')
+            except Exception as exception:
+                errors.append(exception)
+            db.close()
+        threads = [threading.Thread(target = addCatNodes, args = (prefix,)) for prefix in ('A', 'B')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([], errors)
+        db = CategorizerData(self.path, self.lock)
+        self.assertEqual(list(range(101)), [row[0] for row in db.dumpTable('catNodes')])
+        self.assertEqual(list(range(101)), [row[0] for row in db.dumpTable('catConnections')])
+        self.assertEqual(2, len(db.dumpTable('relations')))
+        # the ids are only handed out inside a batch(), which holds the lock until they are committed
+        with self.assertRaises(AssertionError):
+            db._getNextId('catNodes')
+
+    def test_12_lockPerThread(self):
+        db = CategorizerData(self.path, self.lock, create_new_database = True)
+        locked = threading.Event()
+        def holdLock():
+            with db._lockHeld():
+                locked.set()
+        with db.batch():
+            # another thread of the same CategorizerData waits for the batch to end
+            thread = threading.Thread(target = holdLock)
+            thread.start()
+            self.assertFalse(locked.wait(0.1))
+        thread.join()
+        self.assertTrue(locked.is_set())
+
+if __name__ == '__main__':
+    unittest.main()
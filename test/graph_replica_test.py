@@ -0,0 +1,87 @@
+'''
+history
+10/18/26 - created, covers GraphReplica.refresh() from the changeLog, directly and through a CategorizerServer socket
+'''
+import unittest
+import asyncio
+import multiprocessing
+import os
+from context import CategorizerData, CategorizerServer, GraphReplica, LocalBackend, SocketBackend
+from test_utils import TestUtils
+
+class CountingBackend(LocalBackend):
+    def __init__(self, categorizer_data):
+        LocalBackend.__init__(self, categorizer_data)
+        self.calls = []
+
+    def getChangesSince(self, change_seq, limit):
+        self.calls.append('getChangesSince')
+        return LocalBackend.getChangesSince(self, change_seq, limit)
+
+    def getLatestRows(self, table_name, row_ids = None):
+        self.calls.append(table_name)
+        return LocalBackend.getLatestRows(self, table_name, row_ids)
+
+class GraphReplicaTest(unittest.TestCase, TestUtils):
+    lock = multiprocessing.Lock()
+
+    def setUp(self):
+        self.setUpTest('replica_test.db')
+        db = CategorizerData(self.path, self.lock, create_new_database = True)
+        (farm, horse) = db.addCatNodes(((None, 'Farm'), (None, 'Horse')))
+        db.addConnection(horse, farm, rel_var_name = 'lives-on')
+        self.db = db
+
+
+    def checkReplica(self, replica):
+        for tableName in GraphReplica.tableNames:
+            self.assertEqual(self.db.getLatestRows(tableName), replica.getRows(tableName), tableName)
+
+    def test_00_refresh(self):
+        db = self.db
+        backend = CountingBackend(db)
+        replica = GraphReplica(backend, change_batch_size = 4)
+        self.checkReplica(replica)
+        self.assertEqual('Horse', replica.getCatNodeName(2))
+        self.assertEqual(0, replica.refresh())
+
+        db.addNote('note 1')
+        db.editCategory(2, 'Pony')
+        db.editCatNode(2, dx = 10)
+        pig = db.addCatNode(cat_var_name = 'Pig')
+        db.addConnection(pig, 1, rel_var_name = 'lives-on')
+        backend.calls = []
+        self.assertEqual(6, replica.refresh())
+        self.checkReplica(replica)
+        # only the tables which changed are read, in two batches of changes
+        self.assertEqual(['getChangesSince', 'categories', 'catNodes', 'catVariants', 'getChangesSince', 'catNodes', 'catConnections'], backend.calls)
+
+        # the reads never call the backend
+        replica.backend = None
+        self.assertEqual('Pony', replica.getCatNodeName(2))
+        self.assertEqual(10, replica.getRow('catNodes', 2)[3])
+        self.assertEqual(None, replica.getRow('catNodes', 5))
+        self.assertEqual([1, 2], [row[0] for row in replica.getRows('catConnections')])
+
+    def test_01_socketBackend(self):
+        self.db.close()
+
+        async def runReplica():
+            server = CategorizerServer(self.path, self.lock)
+            address = await server.start(unix_path = os.path.join(self.tmpDir.name, 'server.sock'))
+            backend = await asyncio.to_thread(SocketBackend, address)
+            replica = await asyncio.to_thread(GraphReplica, backend)
+            await server.call('editCatVariant', (1, 'Farms'))
+            await server.call('addNodeStyle', ('bold',))
+            changeCount = await asyncio.to_thread(replica.refresh)
+            backend.close()
+            await server.close()
+            return (replica, changeCount)
+        (replica, changeCount) = asyncio.run(runReplica())
+        self.assertEqual(2, changeCount)
+        self.db = CategorizerData(self.path, self.lock)
+        self.checkReplica(replica)
+        self.assertEqual('Farms', replica.getCatNodeName(1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+'''
+history
+10/18/26 - created, covers the call, statement and row counts of Instrumentation, with and without the reader pool
+'''
+import unittest
+import multiprocessing
+import threading
+from context import CategorizerData, Instrumentation
+from test_utils import TestUtils
+
+class InstrumentationTest(unittest.TestCase, TestUtils):
+    lock = multiprocessing.Lock()
+
+    def setUp(self):
+        self.setUpTest('instrumentation_test.db')
+
+
+    def test_00_counts(self):
+        db = CategorizerData(self.path, self.lock, create_new_database = True)
+        instrumentation = Instrumentation(db)
+        db.addCatNodes(((None, 'Farm'), (None, 'Horse')))
+        db.addConnection(2, 1, rel_var_name = 'is-a')
+        self.assertEqual((2,), db.findCatVariantIds('horse'))
+        self.assertEqual(3, len(list(db.iterTable('catNodes'))))
+        with self.assertRaises(AssertionError):
+            db.addCatNode()
+        snapshot = instrumentation.snapshot()
+        self.assertEqual({'addCatNodes', 'addConnection', 'findCatVariantIds', 'iterTable', 'addCatNode', 'getDMetaNamesBulk', 'getDMetaNames'}, set(snapshot.keys()))
+        find = snapshot['findCatVariantIds']
+        self.assertEqual((1, 0, 1, 1), (find['calls'], find['errors'], find['statements'], find['rows']))
+        self.assertEqual(1, sum(find['histogram'].values()))
+        self.assertEqual(3, snapshot['iterTable']['rows'])
+        self.assertEqual((1, 1), (snapshot['addCatNode']['calls'], snapshot['addCatNode']['errors']))
+        self.assertGreater(snapshot['addConnection']['statements'], 2)
+        self.assertGreater(snapshot['addCatNodes']['seconds'], 0)
+
+        instrumentation.reset()
+        self.assertEqual({}, instrumentation.snapshot())
+        db.findCategoryIds('farm')
+        self.assertEqual(1, instrumentation.snapshot()['findCategoryIds']['calls'])
+
+        # disabled, the methods are the ones of the class again
+        instrumentation.disable()
+        self.assertNotIn('findCategoryIds', db.__dict__)
+        db.findCategoryIds('farm')
+        self.assertEqual(1, instrumentation.snapshot()['findCategoryIds']['calls'])
+        instrumentation.enable()
+        db.findCategoryIds('farm')
+        self.assertEqual(2, instrumentation.snapshot()['findCategoryIds']['calls'])
+
+    def test_01_readerPool(self):
+        db = CategorizerData(self.path, self.lock, create_new_database = True, reader_pool_size = 2)
+        db.addCatNodes([(None, f'Horse {idx}') for idx in range(10)])
+        instrumentation = Instrumentation(db)
+        def findHorses():
+            for x in range(10):
+                db.findCatVariantIds('horse')
+        threads = [threading.Thread(target = findHorses) for x in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        find = instrumentation.snapshot()['findCatVariantIds']
+        # each find is one statement on a reader connection, counted in the thread which ran it
+        self.assertEqual((30, 30, 300), (find['calls'], find['statements'], find['rows']))
+        db.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+'''
+history
+10/18/26 - created, covers PhoneticSearchIndex: prefix and sound alike matches, limits and table filters, and following edits
+'''
+import unittest
+import multiprocessing
+from context import CategorizerData, PhoneticSearchIndex
+from test_utils import TestUtils
+
+class PhoneticSearchTest(unittest.TestCase, TestUtils):
+    lock = multiprocessing.Lock()
+
+    def setUp(self):
+        '''
+        catNodes: 1 Farm, 2 Horse, 3 Hoarse, 4 Pig.  The index is made before the rest is added, so it has to follow the changes.
+        '''
+        self.setUpTest()
+        self.db = CategorizerData(None, self.lock, in_memory = True, create_new_database = True)
+        self.db.addCatNodes(((None, 'Farm'), (None, 'Horse'), (None, 'Hoarse'), (None, 'Pig')))
+        self.index = PhoneticSearchIndex(self.db)
+        self.db._addCatVariant(2, 'Horsey')
+        self.db.addConnection(2, 1, rel_var_name = 'lives-on')
+
+    def test_00_search(self):
+        index = self.index
+        # the exact name first, then the longer names which start with it, then the names which only sound like it
+        expMatches = (('categories', 2, 'Horse'), ('catVariants', 5, 'Horsey'), ('categories', 3, 'Hoarse'))
+        self.assertEqual(expMatches, index.search('Horse'))
+        self.assertEqual(expMatches, index.search('hors'))
+        self.assertEqual((('categories', 3, 'Hoarse'), ('categories', 2, 'Horse')), index.search('hoarse', limit = 2))
+        self.assertEqual((('relations', 1, 'lives-on'),), index.search('liv'))
+        self.assertEqual((('catVariants', 5, 'Horsey'),), index.search('h', table_names = ('catVariants', 'relVariants')))
+        self.assertEqual((('categories', 1, 'Farm'),), index.search('Far'))
+        self.assertEqual((), index.search('Far', prefix = False))
+        self.assertEqual((), index.search(''))
+
+    def test_01_followsChanges(self):
+        db = self.db
+        index = self.index
+        db.editCategory(4, 'Piglet')
+        self.assertEqual((('categories', 4, 'Piglet'),), index.search('pig'))
+        self.assertEqual((), index.search('pig', prefix = False))
+        db.addNote('note 1')
+        # a new version of the row replaces the old one
+        db.editCategory(4, 'Hog')
+        self.assertEqual((('categories', 4, 'Hog'),), index.search('ho', limit = 1))
+        self.assertEqual((), index.search('pig'))
+        # a rolled back batch reloads the index
+        try:
+            with db.batch():
+                db.addCatNode(cat_var_name = 'Horse Cart')
+                self.assertEqual(4, len(index.search('horse')))
+                raise ValueError('undo the batch')
+        except ValueError:
+            pass
+        self.assertEqual(3, len(index.search('horse')))
+        index.close()
+        db.addCatNode(cat_var_name = 'Horse Cart')
+        self.assertEqual(3, len(index.search('horse')))
+
+if __name__ == '__main__':
+    unittest.main()
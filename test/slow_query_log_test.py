@@ -0,0 +1,89 @@
+'''
+history
+10/18/26 - created, covers SlowQueryLog: the ring buffer, the time threshold, and the rotating log file with parameters and plans
+'''
+import unittest
+import multiprocessing
+import os
+import json
+from context import CategorizerData, SlowQueryLog
+from test_utils import TestUtils
+
+class SlowQueryLogTest(unittest.TestCase, TestUtils):
+    lock = multiprocessing.Lock()
+
+    def setUp(self):
+        self.setUpTest('slow_query_log_test.db')
+
+
+    def findEntries(self, slow_query_log, sql_start):
+        return [entry for entry in slow_query_log.getEntries() if entry['sql'].startswith(sql_start)]
+
+    def test_00_ringBuffer(self):
+        # every statement is slow
+        slowQueryLog = SlowQueryLog(threshold_seconds = 0, ring_size = 50)
+        db = CategorizerData(self.path, self.lock, create_new_database = True, slow_query_log = slowQueryLog)
+        db.addCatNodes(((None, 'Farm'), (None, 'Horse')))
+        slowQueryLog.clear()
+        self.assertEqual((2,), db.findCatVariantIds('horse'))
+        self.assertEqual((1, 2), db._getMatchingRowIds('catNodes', (('nodeStyleId', 0),), only_valid_for_latest = False)[1:])
+
+        (find,) = self.findEntries(slowQueryLog, 'SELECT catVarId')
+        self.assertEqual(['HRS', 'HRS'], find['params'][:2])
+        self.assertEqual(1, find['count'])
+        self.assertGreaterEqual(find['seconds'], 0)
+        self.assertIn('SEARCH catVariants USING INDEX catVariants_dMetaName0_validForLatest (dMetaName0=? AND validForLatest=?)', find['plan'])
+        self.assertFalse([detail for detail in find['plan'] if detail.startswith('SCAN')])
+        # no index covers nodeStyleId, so the plan shows the whole table is read
+        (scan,) = self.findEntries(slowQueryLog, 'SELECT catNodeId FROM catNodes')
+        self.assertEqual([0], scan['params'])
+        self.assertEqual(['SCAN catNodes'], scan['plan'])
+
+        # the executemany() of addCatNodes() is one entry
+        slowQueryLog.clear()
+        db.addCatNodes([(None, f'Pig {idx}') for idx in range(5)])
+        (adds,) = self.findEntries(slowQueryLog, 'INSERT INTO catNodes')
+        self.assertEqual((5, 3), (adds['count'], adds['params'][0]))
+
+        # a single row read with fetchone() is recorded when it is read, not when the cursor runs its next statement
+        slowQueryLog.clear()
+        self.assertEqual(21, db.getLastChangeSeq())
+        self.assertEqual(1, len(self.findEntries(slowQueryLog, 'SELECT MAX(changeSeq)')))
+
+        # only the last ring_size are kept
+        for x in range(60):
+            db.findCategoryIds('farm')
+        self.assertEqual(50, len(slowQueryLog.getEntries()))
+        db.close()
+
+    def test_01_threshold(self):
+        slowQueryLog = SlowQueryLog(threshold_seconds = 10)
+        db = CategorizerData(self.path, self.lock, create_new_database = True, slow_query_log = slowQueryLog, reader_pool_size = 1)
+        db.addCatNodes([(None, f'Horse {idx}') for idx in range(10)])
+        self.assertEqual(10, len(db.findCatVariantIds('horse')))
+        self.assertEqual(11, len(list(db.iterTable('catNodes', array_size = 3))))
+        self.assertEqual([], slowQueryLog.getEntries())
+        # the readers time their statements too
+        slowQueryLog.thresholdSeconds = 0
+        list(db.iterTable('catNodes', array_size = 3))
+        (dump,) = self.findEntries(slowQueryLog, 'SELECT catNodeId')
+        self.assertEqual(['SCAN catNodes'], dump['plan'])
+        db.close()
+
+    def test_02_rotatingFile(self):
+        filePath = os.path.join(self.tmpDir.name, 'slow_queries.log')
+        slowQueryLog = SlowQueryLog(threshold_seconds = 0, file_path = filePath, max_bytes = 2000, backup_count = 2)
+        db = CategorizerData(self.path, self.lock, create_new_database = True, slow_query_log = slowQueryLog)
+        for idx in range(20):
+            db.addCatNode(cat_var_name = f'Horse {idx}')
+        db.close()
+        slowQueryLog.close()
+        self.assertTrue(os.path.exists(filePath + '.1'))
+        self.assertFalse(os.path.exists(filePath + '.3'))
+        with open(filePath) as logFile:
+            entries = [json.loads(line) for line in logFile]
+        self.assertTrue(entries)
+        self.assertEqual({'time', 'seconds', 'sql', 'params', 'count', 'plan'}, set(entries[0].keys()))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,27 @@
+import os
+import tempfile
 
 class TestUtils:
+    # the test classes whose name has been printed
+    printedClassNames = set()
+
+    def setUpTest(self, db_file_name = None):
+        '''
+        call from setUp().  Prints the name of the test, and of its class before its first test, like the older tests print
+        them by hand.
+        If db_file_name is given, self.path is a file of that name in a temporary directory self.tmpDir, which is removed
+        after tearDown().
+        '''
+        className = type(self).__name__
+        if className not in self.printedClassNames:
+            self.printedClassNames.add(className)
+            print(f'\n{className}')
+        print(f'  {self._testMethodName}')
+        if db_file_name != None:
+            self.tmpDir = tempfile.TemporaryDirectory()
+            self.addCleanup(self.tmpDir.cleanup)
+            self.path = os.path.join(self.tmpDir.name, db_file_name)
+
     def _addExpDataa(self, name, dataa):
         for data in dataa:
             dataIdx = data[0]